@@ -0,0 +1,467 @@
+"""
+Storage backends for the content of containers.
+
+A backend knows how to read, replace, reconnect and clear the content
+of a container. `managers.Manager` delegates to one of them.
+"""
+
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from copy import deepcopy
+from itertools import chain
+from typing import Dict, Hashable, Iterable, Iterator, Optional, Set, Tuple
+
+from . import structures
+from .converters import encode
+from .meta import entity_key
+from .structures import ID
+
+
+def content_stats(content: structures.Content) -> structures.Stats:
+    """Return size statistics of the content."""
+
+    degrees = Counter({vertex.uid: 0 for vertex in content.vertices})
+    owners = {uid: vertex.uid for vertex in content.vertices for uid in vertex.ports}
+
+    for edge in content.edges:
+        degrees[owners[edge.start]] += 1
+        degrees[owners[edge.end]] += 1
+
+    meta_size = sum(
+        len(encode(obj.meta))
+        for collection in (
+            content.vertices,
+            content.ports,
+            content.edges,
+            content.groups,
+        )
+        for obj in collection
+    )
+
+    return structures.Stats(
+        vertices=len(content.vertices),
+        ports=len(content.ports),
+        edges=len(content.edges),
+        groups=len(content.groups),
+        min_degree=min(degrees.values(), default=0),
+        max_degree=max(degrees.values(), default=0),
+        mean_degree=sum(degrees.values()) / len(degrees) if degrees else 0.0,
+        meta_size=meta_size,
+    )
+
+
+def concatenate(parts: Iterable[structures.Content]) -> structures.Content:
+    """Return the content made of all the parts."""
+
+    content = structures.Content(vertices=[], ports=[], edges=[], groups=[])
+
+    for part in parts:
+        content.vertices.extend(part.vertices)
+        content.ports.extend(part.ports)
+        content.edges.extend(part.edges)
+        content.groups.extend(part.groups)
+
+    return content
+
+
+class AbstractBackend(ABC):
+    """Storage backend interface.
+
+    Containers are identified by their `uid` attribute.
+    """
+
+    @abstractmethod
+    def read(self, container) -> structures.Content:
+        """Return the content of a given container."""
+
+    def iter_read(self, container, batch_size: int) -> Iterator[structures.Content]:
+        """Yield the content of a given container in parts of up to
+        `batch_size` entities each, for very large content.
+
+        Backends that keep the content in memory yield it at once.
+        """
+
+        yield self.read(container)
+
+    @abstractmethod
+    def replace(self, container, content: structures.Content, fingerprint: str = None):
+        """Replace the content of a given container.
+
+        The fingerprint of the new content is remembered, if given.
+        """
+
+    def replace_chunked(
+        self, container, content: structures.Content, fingerprint: str = None
+    ):
+        """Replace the content of a given container in a series of
+        transactions, for very large content.
+
+        Backends without transactions replace it at once.
+        """
+
+        self.replace(container, content, fingerprint)
+
+    def replace_stream(
+        self, container, parts: Iterable[structures.Content], fingerprint: str = None
+    ):
+        """Replace the content of a given container with a stream of
+        content parts, writing each part as it arrives.
+
+        Parts may refer to ports of vertices in earlier parts. Backends
+        without transactions collect the parts and replace at once.
+        """
+
+        self.replace(container, concatenate(parts), fingerprint)
+
+    @abstractmethod
+    def matches(self, container, fingerprint: str) -> bool:
+        """Whether the content of a given container has the fingerprint."""
+
+    def version(self, container) -> Optional[str]:
+        """Return a key that changes with the content of a given
+        container, or `None` if it is unknown.
+
+        Backends that do not track versions return `None`.
+        """
+
+        return None
+
+    def stats(self, container) -> structures.Stats:
+        """Return size statistics of the content of a given container.
+
+        Backends that keep the content in memory compute them from it.
+        """
+
+        return content_stats(self.read(container))
+
+    @abstractmethod
+    def iter_meta(self) -> Iterator[Tuple[str, object]]:
+        """Yield (entity key, metadata) pairs of all stored entities
+        that may refer to the side store of metadata, see
+        `meta.MetaCollector`.
+
+        Must not be called inside a transaction.
+        """
+
+    @abstractmethod
+    def reconnect(self, parent, child):
+        """Reconnect the content of a child container to parent."""
+
+    @abstractmethod
+    def clear(self, container):
+        """Delete the content (vertices and groups) of a given container."""
+
+
+class _Adjacency:
+    """Adjacency sets between keys, indexed in both directions."""
+
+    def __init__(self) -> None:
+        self._successors = defaultdict(set)
+        self._predecessors = defaultdict(set)
+
+    def add(self, src: Hashable, dst: Hashable):
+        self._successors[src].add(dst)
+        self._predecessors[dst].add(src)
+
+    def discard(self, src: Hashable, dst: Hashable):
+        self._successors.get(src, set()).discard(dst)
+        self._predecessors.get(dst, set()).discard(src)
+
+    def successors(self, src: Hashable) -> Set:
+        return self._successors.get(src, set())
+
+    def predecessors(self, dst: Hashable) -> Set:
+        return self._predecessors.get(dst, set())
+
+    def remove(self, key: Hashable):
+        """Remove all pairs where the key is either source or destination."""
+
+        for dst in self._successors.pop(key, set()):
+            self._predecessors[dst].discard(key)
+
+        for src in self._predecessors.pop(key, set()):
+            self._successors[src].discard(key)
+
+    def clear(self):
+        self._successors.clear()
+        self._predecessors.clear()
+
+
+class InMemoryBackend(AbstractBackend):
+    """Keeps the content in process memory.
+
+    Entities are stored in dictionaries indexed by uid. Container
+    membership, vertex ports and edges between ports are kept as
+    adjacency sets.
+
+    Mirrors the semantics of the Neo4j backend: deleting an entity
+    deletes it everywhere, deleting a vertex deletes its ports, and the
+    content of a container includes the content of its children.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._vertices: Dict[ID, structures.Vertex] = {}
+        self._ports: Dict[ID, structures.Port] = {}
+        self._groups: Dict[ID, structures.Group] = {}
+        self._edges: Dict[Tuple[ID, ID], structures.Edge] = {}
+        self._contains_vertex = _Adjacency()  # container uid -> vertex uid
+        self._contains_group = _Adjacency()  # container uid -> group uid
+        self._vertex_port = _Adjacency()  # vertex uid -> port uid
+        self._port_port = _Adjacency()  # output port uid -> input port uid
+        self._children = _Adjacency()  # parent container uid -> child uid
+        self._fingerprints: Dict[ID, str] = {}
+        self._snapshots: Dict[ID, Tuple[Optional[str], ...]] = {}
+
+    @staticmethod
+    def _copy(primitive, subclass):
+        return subclass(
+            uid=primitive.uid,
+            properties=deepcopy(primitive.properties),
+            meta=deepcopy(primitive.meta),
+        )
+
+    def _member_uids(self, container) -> Tuple[Set[ID], Set[ID]]:
+        """Return uids of vertices and groups of the container and its children."""
+
+        vertex_uids, group_uids = set(), set()
+
+        for uid in self._children.successors(container.uid) | {container.uid}:
+            vertex_uids.update(self._contains_vertex.successors(uid))
+            group_uids.update(self._contains_group.successors(uid))
+
+        return vertex_uids, group_uids
+
+    def _fragment_fingerprints(self, container) -> Tuple[Optional[str], ...]:
+        return tuple(
+            self._fingerprints.get(uid)
+            for uid in sorted(self._children.successors(container.uid))
+        )
+
+    def _invalidate_shared(self, container):
+        """Forget fingerprints of other containers sharing the content."""
+
+        vertex_uids, group_uids = self._member_uids(container)
+        others = set()
+
+        for uid in vertex_uids:
+            others.update(self._contains_vertex.predecessors(uid))
+
+        for uid in group_uids:
+            others.update(self._contains_group.predecessors(uid))
+
+        others -= self._children.predecessors(container.uid) | {container.uid}
+
+        for uid in others:
+            self._fingerprints[uid] = uuid.uuid4().hex
+
+    def _remember(self, container, fingerprint: Optional[str]):
+        self._fingerprints[container.uid] = fingerprint or uuid.uuid4().hex
+        self._snapshots[container.uid] = self._fragment_fingerprints(container)
+
+    def _port_uids(self, vertex_uids) -> Set[ID]:
+        result = set()
+
+        for uid in vertex_uids:
+            result.update(self._vertex_port.successors(uid))
+
+        return result
+
+    def _edge_uids(self, port_uids) -> Set[Tuple[ID, ID]]:
+        return set(
+            (start, end)
+            for start in port_uids
+            for end in self._port_port.successors(start)
+            if end in port_uids
+        )
+
+    def _delete_port(self, uid: ID):
+        for end in self._port_port.successors(uid):
+            self._edges.pop((uid, end), None)
+
+        for start in self._port_port.predecessors(uid):
+            self._edges.pop((start, uid), None)
+
+        self._port_port.remove(uid)
+        self._vertex_port.remove(uid)
+        self._ports.pop(uid, None)
+
+    def _delete_vertex(self, uid: ID):
+        for port_uid in list(self._vertex_port.successors(uid)):
+            self._delete_port(port_uid)
+
+        self._vertex_port.remove(uid)
+        self._contains_vertex.remove(uid)
+        self._vertices.pop(uid, None)
+
+    def _delete_group(self, uid: ID):
+        self._contains_group.remove(uid)
+        self._groups.pop(uid, None)
+
+    def _delete_edge(self, uid: Tuple[ID, ID]):
+        self._port_port.discard(*uid)
+        self._edges.pop(uid, None)
+
+    def _held_by_children(self, container) -> Tuple[Set[ID], Set[ID]]:
+        """Return uids of vertices and groups the children of the container hold."""
+
+        vertex_uids, group_uids = set(), set()
+
+        for uid in self._children.successors(container.uid):
+            vertex_uids.update(self._contains_vertex.successors(uid))
+            group_uids.update(self._contains_group.successors(uid))
+
+        return vertex_uids, group_uids
+
+    def _merge(self, container, content: structures.Content):
+        # a parent does not take entities its children already hold
+        held_vertices, held_groups = self._held_by_children(container)
+
+        for port in content.ports:
+            self._ports[port.uid] = self._copy(port, structures.Port)
+
+        for edge in content.edges:
+            self._port_port.add(edge.start, edge.end)
+            self._edges[edge.uid] = structures.Edge(
+                start=edge.start, end=edge.end, meta=deepcopy(edge.meta)
+            )
+
+        for vertex in content.vertices:
+            self._vertices[vertex.uid] = self._copy(vertex, structures.Vertex)
+
+            if vertex.uid not in held_vertices:
+                self._contains_vertex.add(container.uid, vertex.uid)
+
+            for port_uid in vertex.ports:
+                self._vertex_port.add(vertex.uid, port_uid)
+
+        for group in content.groups:
+            self._groups[group.uid] = self._copy(group, structures.Group)
+
+            if group.uid not in held_groups:
+                self._contains_group.add(container.uid, group.uid)
+
+    def read(self, container) -> structures.Content:
+        with self._lock:
+            vertex_uids, group_uids = self._member_uids(container)
+            port_uids = self._port_uids(vertex_uids)
+            edge_uids = self._edge_uids(port_uids)
+
+            vertices = []
+            for uid in vertex_uids:
+                vertex = self._copy(self._vertices[uid], structures.Vertex)
+                vertex.ports.update(self._vertex_port.successors(uid))
+                vertices.append(vertex)
+
+            ports = [self._copy(self._ports[uid], structures.Port) for uid in port_uids]
+            edges = [
+                structures.Edge(
+                    start=start, end=end, meta=deepcopy(self._edges[start, end].meta)
+                )
+                for start, end in edge_uids
+            ]
+            groups = [
+                self._copy(self._groups[uid], structures.Group) for uid in group_uids
+            ]
+
+        return structures.Content(
+            vertices=vertices,
+            ports=ports,
+            edges=edges,
+            groups=groups,
+        )
+
+    def replace(self, container, content: structures.Content, fingerprint: str = None):
+        with self._lock:
+            self._invalidate_shared(container)
+
+            # delete deprecated vertices, ports and groups
+            vertex_uids, group_uids = self._member_uids(container)
+            port_uids = self._port_uids(vertex_uids)
+            edge_uids = self._edge_uids(port_uids)
+
+            for uid in vertex_uids - set(v.uid for v in content.vertices):
+                self._delete_vertex(uid)
+
+            for uid in port_uids - set(p.uid for p in content.ports):
+                self._delete_port(uid)
+
+            for uid in group_uids - set(g.uid for g in content.groups):
+                self._delete_group(uid)
+
+            # delete deprecated edges
+            for uid in edge_uids - set(e.uid for e in content.edges):
+                self._delete_edge(uid)
+
+            self._merge(container, content)
+            self._invalidate_shared(container)
+            self._remember(container, fingerprint)
+
+    def matches(self, container, fingerprint: str) -> bool:
+        with self._lock:
+            return self._fingerprints.get(
+                container.uid
+            ) == fingerprint and self._snapshots.get(
+                container.uid
+            ) == self._fragment_fingerprints(
+                container
+            )
+
+    def version(self, container) -> Optional[str]:
+        with self._lock:
+            fingerprints = (self._fingerprints.get(container.uid),)
+            fingerprints += self._fragment_fingerprints(container)
+
+        if None in fingerprints:
+            return None
+
+        return ":".join(fingerprints)
+
+    def iter_meta(self) -> Iterator[Tuple[str, object]]:
+        with self._lock:
+            result = [
+                (entity_key(item), item.meta)
+                for item in chain(
+                    self._vertices.values(),
+                    self._ports.values(),
+                    self._edges.values(),
+                    self._groups.values(),
+                )
+            ]
+
+        yield from result
+
+    def reconnect(self, parent, child):
+        with self._lock:
+            self._children.add(parent.uid, child.uid)
+
+    def clear(self, container):
+        with self._lock:
+            self._invalidate_shared(container)
+            vertex_uids, group_uids = self._member_uids(container)
+
+            for uid in vertex_uids:
+                self._delete_vertex(uid)
+
+            for uid in group_uids:
+                self._delete_group(uid)
+
+            self._remember(container, None)
+
+    def flush(self):
+        """Delete everything from the storage."""
+
+        with self._lock:
+            self._vertices.clear()
+            self._ports.clear()
+            self._groups.clear()
+            self._edges.clear()
+            self._contains_vertex.clear()
+            self._contains_group.clear()
+            self._vertex_port.clear()
+            self._port_port.clear()
+            self._children.clear()
+            self._fingerprints.clear()
+            self._snapshots.clear()
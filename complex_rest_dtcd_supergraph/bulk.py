@@ -0,0 +1,368 @@
+"""
+Bulk import of graph files straight into Neo4j.
+
+The regular write path (serializer, converter, per-entity merges) holds
+the whole graph in memory and issues statements entity by entity. Bulk
+import streams a graph file instead:
+
+1. the first pass validates each object and collects IDs,
+2. the second pass checks references between objects against the IDs,
+3. then objects are converted to rows in batches, in parallel worker
+   processes, and written with `UNWIND` statements, each batch in its
+   own transaction: nodes and groups first, then edges between the
+   ports that now exist.
+
+Only IDs are kept in memory. Content is merged into the container:
+entities missing from the file are kept. History, change feed and
+notifications are not recorded.
+"""
+
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+import neomodel
+from rest_framework.exceptions import ValidationError
+
+from . import models, queries, settings
+from .converters import GraphDataConverter
+from .fields import EdgeField, GroupField, VertexField
+from .managers import get_offloader, get_templates, prepare_content
+from .models.properties import MetaProperty
+from .settings import KEYS
+from .streams import COLLECTIONS
+from .transactions import atomic
+
+
+Item = Tuple[str, dict]  # (collection, object)
+
+FIELDS = {
+    KEYS.nodes: VertexField(),
+    KEYS.edges: EdgeField(),
+    KEYS.groups: GroupField(),
+}
+
+
+class InvalidGraph(ValueError):
+    """Graph data failed validation."""
+
+
+class Validator:
+    """Validates graph data in two passes over a stream of objects.
+
+    The same rules as `serializers.ContentSerializer` apply, but only
+    IDs are kept between the passes.
+    """
+
+    def __init__(self) -> None:
+        self.node_ids = set()
+        self.port_ids = set()
+        self.group_ids = set()
+        self.edge_ids = set()
+        self.counts = Counter()
+
+    @staticmethod
+    def _fail(collection: str, index: int, message):
+        raise InvalidGraph(f"{collection}[{index}]: {message}")
+
+    def _add(self, collection: str, obj: dict) -> int:
+        """Validate an object, remember its IDs; return its index."""
+
+        index = self.counts[collection]
+        self.counts[collection] += 1
+
+        try:
+            FIELDS[collection].run_validation(obj)
+        except ValidationError as e:
+            self._fail(collection, index, e.detail)
+
+        if collection == KEYS.edges:
+            key = tuple(obj[k] for k in EdgeField.keys)
+            ids = self.edge_ids
+        else:
+            key = obj[KEYS.yfiles_id]
+            ids = self.node_ids if collection == KEYS.nodes else self.group_ids
+
+        if key in ids:
+            self._fail(collection, index, "Data contains duplicated IDs.")
+
+        ids.add(key)
+
+        for port in obj.get(KEYS.init_ports, []):
+            if not isinstance(port, dict) or KEYS.yfiles_id not in port:
+                self._fail(collection, index, "A port has no ID.")
+
+            self.port_ids.add(port[KEYS.yfiles_id])
+
+        return index
+
+    def _check(self, collection: str, index: int, obj: dict):
+        """Check that nodes, ports and groups the object refers to exist."""
+
+        if collection == KEYS.edges:
+            references = chain(
+                ((obj[k], self.node_ids) for k in EdgeField.keys[:2]),
+                ((obj[k], self.port_ids) for k in EdgeField.keys[2:]),
+            )
+        else:
+            parent_id = obj.get(KEYS.parent_id)
+
+            if collection == KEYS.groups and parent_id == obj[KEYS.yfiles_id]:
+                self._fail(collection, index, "A group refers to itself.")
+
+            references = [] if parent_id is None else [(parent_id, self.group_ids)]
+
+        for id_, ids in references:
+            if id_ not in ids:
+                self._fail(collection, index, f"[{id_}] does not exist.")
+
+    def collect(self, items: Iterable[Item]):
+        """First pass: validate objects one by one, collect unique IDs."""
+
+        for collection, obj in items:
+            self._add(collection, obj)
+
+        self.edge_ids.clear()  # no longer needed
+
+    def check(self, items: Iterable[Item]):
+        """Second pass: check that referred nodes, ports and groups exist."""
+
+        counts = Counter()
+
+        for collection, obj in items:
+            self._check(collection, counts[collection], obj)
+            counts[collection] += 1
+
+    def stream(self, items: Iterable[Item]) -> Iterator[Item]:
+        """Validate objects in a single pass, yield the valid ones.
+
+        Objects must come after the ones they refer to: nodes and
+        groups after their parent groups, edges after their nodes.
+        """
+
+        for collection, obj in items:
+            self._check(collection, self._add(collection, obj), obj)
+
+            yield collection, obj
+
+
+def batches(items: Iterable[Item], size: int) -> Iterator[Tuple[str, List[dict]]]:
+    """Group consecutive objects of the same collection in lists of
+    at most `size`."""
+
+    collection, batch = None, []
+
+    for item_collection, obj in items:
+        if batch and (item_collection != collection or len(batch) >= size):
+            yield collection, batch
+            batch = []
+
+        collection = item_collection
+        batch.append(obj)
+
+    if batch:
+        yield collection, batch
+
+
+@lru_cache
+def _get_meta() -> tuple:
+    # templates and offloader of a worker process, created once
+    return get_templates(), get_offloader()
+
+
+def _properties(primitive) -> dict:
+    # FIXME possible clash between user-defined property name and uid/meta_ key
+    return dict(
+        primitive.properties,
+        uid=primitive.uid,
+        meta_=MetaProperty().deflate(primitive.meta),
+    )
+
+
+def prepare(collection: str, objects: List[dict], passthrough: bool) -> dict:
+    """Convert a batch of objects to parameters of bulk statements.
+
+    Metadata goes through templates and offloading, if enabled, like
+    in `Manager.replace`. Runs in worker processes.
+    """
+
+    data = {key: [] for key in COLLECTIONS}
+    data[collection] = objects
+    content = GraphDataConverter(passthrough=passthrough).to_content(data)
+    content = prepare_content(content, *_get_meta())
+    rows = {}
+
+    if collection == KEYS.nodes:
+        rows["ports"] = [
+            {"uid": port.uid, "properties": _properties(port)} for port in content.ports
+        ]
+        rows["vertices"] = [
+            {
+                "uid": vertex.uid,
+                "properties": _properties(vertex),
+                "ports": sorted(vertex.ports),
+            }
+            for vertex in content.vertices
+        ]
+    elif collection == KEYS.edges:
+        rows["edges"] = [
+            {
+                "start": edge.start,
+                "end": edge.end,
+                "meta": MetaProperty().deflate(edge.meta),
+            }
+            for edge in content.edges
+        ]
+    else:
+        rows["groups"] = [
+            {"uid": group.uid, "properties": _properties(group)}
+            for group in content.groups
+        ]
+
+    return rows
+
+
+STATEMENTS = {
+    "ports": queries.BULK_MERGE_PORTS,
+    "vertices": queries.BULK_MERGE_VERTICES,
+    "edges": queries.BULK_MERGE_EDGES,
+    "groups": queries.BULK_MERGE_GROUPS,
+}
+
+
+@dataclass
+class Stats:
+    """Counters and timings of an import."""
+
+    counts: Dict[str, int] = field(default_factory=Counter)
+    batches: int = 0
+    validation_time: float = 0
+    write_time: float = 0
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def rate(self) -> float:
+        """Written objects per second."""
+
+        return self.total / self.write_time if self.write_time else 0
+
+    def summary(self) -> str:
+        counts = ", ".join(f"{self.counts[key]} {key}" for key in COLLECTIONS)
+
+        return (
+            f"Imported {counts} in {self.batches} batches; "
+            f"validated in {self.validation_time:.1f}s, "
+            f"written in {self.write_time:.1f}s ({self.rate:.0f} objects/s)."
+        )
+
+
+class BulkImporter:
+    """Imports graph data into a container.
+
+    `open_items` returns a new stream of (collection, object) pairs on
+    every call, e.g. by re-opening a file. Batches are prepared in
+    `workers` processes, or in this one if there are none. `progress`
+    is called with the stats after each written batch.
+    """
+
+    def __init__(
+        self,
+        container: models.Container,
+        batch_size: int = 5000,
+        workers: int = 0,
+        passthrough: bool = settings.META_PASSTHROUGH,
+        progress: Callable[[Stats], None] = None,
+    ) -> None:
+        self.container = container
+        self.batch_size = batch_size
+        self.workers = workers
+        self.passthrough = passthrough
+        self.progress = progress
+        self.stats = Stats()
+
+    def validate(self, open_items: Callable[[], Iterable[Item]]) -> Validator:
+        """Validate the data in two passes, raise `InvalidGraph` if it is
+        not valid."""
+
+        start = time.monotonic()
+        validator = Validator()
+        validator.collect(open_items())
+        validator.check(open_items())
+        self.stats.validation_time = time.monotonic() - start
+
+        return validator
+
+    def _prepared(self, batches: Iterable[Tuple[str, List[dict]]]) -> Iterator[Item]:
+        """Yield (collection, rows) of prepared batches in order."""
+
+        if not self.workers:
+            for collection, objects in batches:
+                yield collection, prepare(collection, objects, self.passthrough)
+
+            return
+
+        # at most a couple of batches per worker are in memory at once
+        with ProcessPoolExecutor(self.workers) as executor:
+            pending = deque()
+
+            for collection, objects in batches:
+                future = executor.submit(prepare, collection, objects, self.passthrough)
+                pending.append((collection, future))
+
+                if len(pending) >= 2 * self.workers:
+                    collection, future = pending.popleft()
+                    yield collection, future.result()
+
+            while pending:
+                collection, future = pending.popleft()
+                yield collection, future.result()
+
+    def _write_batch(self, rows: dict):
+        params = {"uid": self.container.uid}
+
+        for key, statement in STATEMENTS.items():
+            if rows.get(key):
+                neomodel.db.cypher_query(statement, dict(params, rows=rows[key]))
+
+    def write(self, items: Iterable[Item]):
+        """Write prepared batches of objects, each in a transaction."""
+
+        start = time.monotonic() - self.stats.write_time
+
+        for collection, rows in self._prepared(batches(items, self.batch_size)):
+            atomic(self._write_batch)(rows)
+            self.stats.counts[collection] += sum(
+                len(rows[key]) for key in ("vertices", "edges", "groups") if key in rows
+            )
+            self.stats.batches += 1
+            self.stats.write_time = time.monotonic() - start
+
+            if self.progress is not None:
+                self.progress(self.stats)
+
+    def _invalidate(self):
+        # the content no longer matches the last written fingerprint
+        params = {"uid": self.container.uid}
+        neomodel.db.cypher_query(queries.INVALIDATE_SHARED, params)
+        neomodel.db.cypher_query(
+            queries.WRITE_FINGERPRINT, dict(params, hash=None, fragments=None)
+        )
+
+    def run(self, open_items: Callable[[], Iterable[Item]]) -> Stats:
+        """Validate and import the data, return the stats."""
+
+        self.validate(open_items)
+        nodes_and_groups = (item for item in open_items() if item[0] != KEYS.edges)
+        self.write(nodes_and_groups)
+        edges = (item for item in open_items() if item[0] == KEYS.edges)
+        self.write(edges)
+        atomic(self._invalidate)()
+
+        return self.stats
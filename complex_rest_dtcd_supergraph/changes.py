@@ -0,0 +1,152 @@
+"""
+Change feed of container content.
+
+Every write of the content is compared with the previous one at the
+level of exchange format objects (nodes with their ports, edges and
+groups), and only added, changed or removed objects go to the log.
+Clients sync incrementally by asking for changes since the last
+sequence number they have seen.
+"""
+
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from .converters import GraphDataConverter
+from .settings import KEYS
+from .stores import ChangeStore
+from .structures import Content, RawJSON
+
+
+def _dumps(value) -> str:
+    return value if isinstance(value, RawJSON) else json.dumps(value, sort_keys=True)
+
+
+def _edge_id(edge) -> str:
+    return json.dumps([edge[KEYS.source_port], edge[KEYS.target_port]])
+
+
+def encode(data: dict) -> Dict[str, str]:
+    """Encode graph data as a mapping of object keys to JSON text."""
+
+    result = {}
+
+    for collection in (KEYS.nodes, KEYS.groups):
+        for item in data[collection]:
+            if isinstance(item, RawJSON):
+                uid = json.loads(item)[KEYS.yfiles_id]
+            else:
+                uid = item[KEYS.yfiles_id]
+
+            result[collection + ":" + json.dumps(uid)] = _dumps(item)
+
+    for item in data[KEYS.edges]:
+        edge = json.loads(item) if isinstance(item, RawJSON) else item
+        result[KEYS.edges + ":" + _edge_id(edge)] = _dumps(item)
+
+    return result
+
+
+def decode_key(key: str) -> Tuple[str, object]:
+    """Return a collection name and an object id from a key."""
+
+    collection, uid = key.split(":", 1)
+
+    return collection, json.loads(uid)
+
+
+def group_ids(keys: Iterable[str]) -> Dict[str, List]:
+    """Group object ids from keys by collection."""
+
+    result = {KEYS.nodes: [], KEYS.edges: [], KEYS.groups: []}
+
+    for key in keys:
+        collection, uid = decode_key(key)
+        result[collection].append(uid)
+
+    return result
+
+
+class ChangeLog:
+    """Records entity-level changes of containers to a store.
+
+    Tombstones of removed objects are kept for `tombstone_ttl` seconds;
+    clients that are further behind have to re-read the whole graph.
+    """
+
+    converter = GraphDataConverter()
+
+    def __init__(self, store: ChangeStore, tombstone_ttl: float) -> None:
+        self.store = store
+        self.tombstone_ttl = tombstone_ttl
+
+    def record(self, container: str, content: Content) -> Tuple[int, List[str]]:
+        """Save changes of the container's content since the last record.
+
+        Returns the last sequence number of the container and the keys
+        of changed objects.
+
+        Concurrent records take turns: changes are computed against the
+        last record and appended in a single store transaction. Records
+        follow the order of the calls, which for concurrent writes to
+        one container may differ from the order Neo4j committed them
+        in; the feed then ends with the content recorded last.
+        """
+
+        new = encode(self.converter.to_data(content))
+        hashes = {
+            key: hashlib.sha256(data.encode()).hexdigest() for key, data in new.items()
+        }
+
+        with self.store.immediate():
+            old = self.store.hashes(container)
+            changes = [
+                (key, hash_, new[key])
+                for key, hash_ in hashes.items()
+                if old.get(key) != hash_
+            ]
+
+            for key in old.keys() - new.keys():
+                if old[key] is not None:
+                    changes.append((key, None, None))
+
+            seq = self.store.append(container, changes)
+            self.store.purge(container, before=time.time() - self.tombstone_ttl)
+
+        return seq, [key for key, _, _ in changes]
+
+    def link(self, feed: str, container: str):
+        """Include changes of a container into the feed of another one."""
+
+        self.store.link(feed, container)
+
+    def since(self, feed: str, seq: int, limit: int) -> dict:
+        """Return changes of the feed after a given sequence number.
+
+        Raises `LookupError` if some of the changes since then were
+        compacted away.
+        """
+
+        if 0 < seq < self.store.horizon(feed):
+            raise LookupError(seq)
+
+        rows = self.store.since(feed, seq, limit + 1)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        changes = []
+
+        for change_seq, key, data in rows:
+            collection, uid = decode_key(key)
+            changes.append(
+                {
+                    "seq": change_seq,
+                    "collection": collection,
+                    "id": uid,
+                    "data": RawJSON(data) if data is not None else None,
+                }
+            )
+
+        last = rows[-1][0] if more else max(seq, self.store.last())
+
+        return {"changes": changes, "last": last, "more": more}
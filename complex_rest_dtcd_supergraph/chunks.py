@@ -0,0 +1,79 @@
+"""
+Splitting of large content into chunks for separate transactions.
+
+Each chunk is self-contained: vertices come with their ports, edges
+with the ports at both ends. The size of the next chunk is adapted to
+the observed latency of the previous ones.
+"""
+
+from typing import Iterator
+
+from .structures import Content
+
+
+class ChunkSizer:
+    """Adapts the number of entities per chunk to a target latency.
+
+    After each chunk the size is scaled by the ratio of the target to
+    the observed latency, but at most halved or doubled at a time and
+    kept between `min_size` and `max_size`.
+    """
+
+    def __init__(
+        self, size: int, min_size: int, max_size: int, target_latency: float
+    ) -> None:
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.size = self._clamp(size)
+
+    def _clamp(self, size: float) -> int:
+        return max(self.min_size, min(self.max_size, int(size)))
+
+    def observe(self, count: int, elapsed: float):
+        """Adjust the size after writing `count` entities in `elapsed` seconds."""
+
+        if count < self.size:
+            return  # the last, incomplete chunk tells little
+
+        ratio = self.target_latency / elapsed if elapsed > 0 else 2
+        self.size = self._clamp(self.size * max(0.5, min(2, ratio)))
+
+
+def split(content: Content, sizer: ChunkSizer) -> Iterator[Content]:
+    """Yield parts of the content with about `sizer.size` entities each.
+
+    The size is looked up before each chunk, so the sizer may be
+    adjusted between them.
+    """
+
+    uid2port = {port.uid: port for port in content.ports}
+    chunk = Content(vertices=[], ports=[], edges=[], groups=[])
+
+    # vertices with their ports
+    for vertex in content.vertices:
+        chunk.vertices.append(vertex)
+        chunk.ports.extend(uid2port[uid] for uid in vertex.ports)
+
+        if chunk.size >= sizer.size:
+            yield chunk
+            chunk = Content(vertices=[], ports=[], edges=[], groups=[])
+
+    # edges with ports at both ends, and groups
+    for edge in content.edges:
+        chunk.edges.append(edge)
+        chunk.ports.extend((uid2port[edge.start], uid2port[edge.end]))
+
+        if chunk.size >= sizer.size:
+            yield chunk
+            chunk = Content(vertices=[], ports=[], edges=[], groups=[])
+
+    for group in content.groups:
+        chunk.groups.append(group)
+
+        if chunk.size >= sizer.size:
+            yield chunk
+            chunk = Content(vertices=[], ports=[], edges=[], groups=[])
+
+    if chunk.size:
+        yield chunk
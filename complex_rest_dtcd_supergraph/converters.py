@@ -2,17 +2,78 @@
 This module contains converter classes.
 """
 
+import json
 from copy import deepcopy
 from operator import itemgetter
 from typing import Iterable, Dict
 
 from .settings import KEYS
-from .structures import Content, Edge, Group, Port, Vertex
+from .structures import Content, Edge, Group, Port, RawJSON, Vertex
 from .utils import savable_as_property
 
 
+def encode(value) -> str:
+    """Encode a value to JSON, keep pre-encoded values as is.
+
+    Pre-encoded values may be nested in lists, but not in dictionaries.
+    """
+
+    if isinstance(value, RawJSON):
+        return value
+
+    if isinstance(value, list):
+        return "[" + ",".join(map(encode, value)) + "]"
+
+    return json.dumps(value)
+
+
+def splice(raw: RawJSON, data: dict) -> RawJSON:
+    """Add keys and values from the data to pre-encoded JSON object.
+
+    Keys must not exist in the object.
+    """
+
+    head = raw.strip()[:-1].rstrip()  # without closing brace
+    items = ",".join(json.dumps(key) + ":" + encode(val) for key, val in data.items())
+
+    if head == "{" or not items:
+        return RawJSON(head + items + "}")
+
+    return RawJSON(head + "," + items + "}")
+
+
 class GraphDataConverter:
-    """Supports conversion between front-end data and internal classes."""
+    """Supports conversion between front-end data and internal classes.
+
+    In pass-through mode metadata is stored as pre-encoded JSON text
+    (`RawJSON`). On output, it is spliced together with IDs and ports
+    without decoding, unless we need to restore user-defined properties.
+    """
+
+    def __init__(self, passthrough: bool = False) -> None:
+        self.passthrough = passthrough
+
+    def _copy(self, data: dict) -> dict:
+        if not self.passthrough:
+            return deepcopy(data)
+
+        # meta will be encoded right away, copy only what we change
+        data = dict(data)
+
+        if KEYS.properties in data:
+            data[KEYS.properties] = {
+                name: dict(value) if isinstance(value, dict) else value
+                for name, value in data[KEYS.properties].items()
+            }
+
+        return data
+
+    def _dump(self, meta: dict):
+        return RawJSON(json.dumps(meta)) if self.passthrough else meta
+
+    @staticmethod
+    def _load(meta) -> dict:
+        return json.loads(meta) if isinstance(meta, RawJSON) else deepcopy(meta)
 
     @staticmethod
     def _extract_savable_properties(properties: Dict[str, dict]):
@@ -40,37 +101,47 @@ class GraphDataConverter:
                 yield port
 
     def _to_vertex(self, data: dict):
-        meta = deepcopy(data)
+        meta = self._copy(data)
         uid = meta.pop(KEYS.yfiles_id)
         properties = self._extract_savable_properties(meta.get(KEYS.properties, {}))
         ports = meta.pop(KEYS.init_ports, [])  #  save only ids
         port_ids = set(map(itemgetter(KEYS.yfiles_id), ports))
+        meta = self._dump(meta)
 
         return Vertex(uid=uid, properties=properties, meta=meta, ports=port_ids)
 
     def _from_vertex(self, vertex: Vertex, id2port: dict):
-        data = deepcopy(vertex.meta)
-        data[KEYS.yfiles_id] = vertex.uid
+        extra = {KEYS.yfiles_id: vertex.uid}
+        ports = [id2port[port_id] for port_id in vertex.ports]
+        if ports:
+            extra[KEYS.init_ports] = ports
+
+        if isinstance(vertex.meta, RawJSON) and not vertex.properties:
+            return splice(vertex.meta, extra)
+
+        data = self._load(vertex.meta)
 
         # FIXME workaround to handle stale properties on nodes; find better way
         if KEYS.properties in data:
             self._restore_properties(data[KEYS.properties], vertex.properties)
 
-        ports = [id2port[port_id] for port_id in vertex.ports]
-        if ports:
-            data[KEYS.init_ports] = ports
+        data.update(extra)
 
         return data
 
     def _to_port(self, data: dict):
-        meta = deepcopy(data)
+        meta = self._copy(data)
         uid = meta.pop(KEYS.yfiles_id)
         properties = self._extract_savable_properties(meta.get(KEYS.properties, {}))
+        meta = self._dump(meta)
 
         return Port(uid=uid, properties=properties, meta=meta)
 
     def _from_port(self, port: Port):
-        data = deepcopy(port.meta)
+        if isinstance(port.meta, RawJSON) and not port.properties:
+            return splice(port.meta, {KEYS.yfiles_id: port.uid})
+
+        data = self._load(port.meta)
         data[KEYS.yfiles_id] = port.uid
 
         # FIXME workaround to handle stale properties on nodes; find better way
@@ -79,39 +150,42 @@ class GraphDataConverter:
 
         return data
 
-    @staticmethod
-    def _to_edge(data: dict):
-        meta = deepcopy(data)
+    def _to_edge(self, data: dict):
+        meta = dict(data) if self.passthrough else deepcopy(data)
         start = meta.pop(KEYS.source_port)
         end = meta.pop(KEYS.target_port)
 
-        return Edge(start=start, end=end, meta=meta)
+        return Edge(start=start, end=end, meta=self._dump(meta))
+
+    def _from_edge(self, edge: Edge):
+        extra = {KEYS.source_port: edge.start, KEYS.target_port: edge.end}
+
+        if isinstance(edge.meta, RawJSON):
+            return splice(edge.meta, extra)
 
-    @staticmethod
-    def _from_edge(edge: Edge):
         data = deepcopy(edge.meta)
-        data[KEYS.source_port] = edge.start
-        data[KEYS.target_port] = edge.end
+        data.update(extra)
 
         return data
 
-    @staticmethod
-    def _to_group(data: dict):
-        meta = deepcopy(data)
+    def _to_group(self, data: dict):
+        meta = dict(data) if self.passthrough else deepcopy(data)
         uid = meta.pop(KEYS.yfiles_id)
 
-        return Group(uid=uid, meta=meta)
+        return Group(uid=uid, meta=self._dump(meta))
+
+    def _from_group(self, group: Group):
+        if isinstance(group.meta, RawJSON):
+            return splice(group.meta, {KEYS.yfiles_id: group.uid})
 
-    @staticmethod
-    def _from_group(group: Group):
         data = deepcopy(group.meta)
         data[KEYS.yfiles_id] = group.uid
 
         return data
 
     def _from_vertices_and_ports(self, content: Content):
-        ports = list(map(self._from_port, content.ports))
-        id2port = {p[KEYS.yfiles_id]: p for p in ports}
+        ports = map(self._from_port, content.ports)
+        id2port = {port.uid: data for port, data in zip(content.ports, ports)}
         nodes = [self._from_vertex(v, id2port) for v in content.vertices]
 
         return nodes
@@ -0,0 +1,175 @@
+"""
+Cascade deletion of containers in background.
+
+Deleting a large root node by node takes a long time and a lot of
+transaction memory. Instead, a deleted container is hidden from reads
+at once: it loses its `Container` labels and becomes `PendingDeletion`.
+Its content is then deleted by a background job in batches, each in
+a transaction of its own. Pending deletions survive restarts of the
+server and are resumed by the first job of the process-wide write
+queue, see `resume_later`.
+"""
+
+import logging
+from functools import lru_cache
+from typing import List
+
+import neomodel
+
+from . import jobs, models, queries, settings
+from .jobs import Job, WriteQueue, get_write_queue
+from .transactions import atomic, on_commit
+from .utils import delete_in_batches
+
+
+logger = logging.getLogger("supergraph")
+
+
+class Deleter:
+    """Deletes containers with their content in batches of `batch_size`.
+
+    Jobs run in a given write queue.
+    """
+
+    def __init__(self, writer: WriteQueue, batch_size: int) -> None:
+        self.writer = writer
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _key(uid: str) -> str:
+        # deletions must not coalesce with writes to the same container
+        return "delete:" + uid
+
+    def delete_later(self, container: models.Container) -> Job:
+        """Hide the container with its fragments now, delete them with
+        the content in background, return the job.
+
+        Must be called inside a transaction: the job is queued once it
+        commits.
+        """
+
+        neomodel.db.cypher_query(queries.HIDE_CONTAINER, {"uid": container.uid})
+        job = self._job(container.uid)
+        on_commit(lambda: self._submit(container.uid, job))
+
+        return job
+
+    def delete_all_later(self) -> List[Job]:
+        """Hide all containers now, delete them with the content in
+        background, return the jobs.
+
+        Must be called inside a transaction.
+        """
+
+        # fragments are hidden with their roots
+        result = [self.delete_later(root) for root in list(models.Root.nodes)]
+        others = list(models.Container.nodes)
+        result.extend(self.delete_later(other) for other in others)
+
+        return result
+
+    @staticmethod
+    def _job(uid: str) -> Job:
+        # a hidden container cannot be brought back, the deletion must
+        # run to the end
+        return Job(container=uid, kind="delete", cancellable=False)
+
+    def _submit(self, uid: str, job: Job = None) -> Job:
+        return self.writer.submit(
+            self._key(uid),
+            lambda: self.delete(uid),
+            transaction=False,
+            job=job or self._job(uid),
+        )
+
+    def delete(self, uid: str) -> int:
+        """Delete the content of a pending container, then the container.
+
+        The last deletion, once no containers are left, also deletes
+        vertices, ports and groups that nothing holds. A collection of
+        unreferenced metadata is queued afterwards. Progress is
+        reported to the current job. Returns the number of deleted
+        nodes.
+        """
+
+        total = 0
+
+        def run(func):
+            nonlocal total
+
+            results = atomic(func)()
+            total += results[0][0][0]
+            jobs.report(deleted=total)
+
+            return results
+
+        params = {"uid": uid}
+
+        for query in (queries.DELETE_PENDING_VERTICES, queries.DELETE_PENDING_GROUPS):
+            delete_in_batches(query, params, self.batch_size, run)
+
+        run(lambda: neomodel.db.cypher_query(queries.DELETE_PENDING, params))
+
+        if not atomic(self._containers_left)():
+            # e.g. after a reset: nothing can hold the remaining entities
+            for query in (
+                queries.SWEEP_VERTICES,
+                queries.SWEEP_GROUPS,
+                queries.SWEEP_PORTS,
+            ):
+                delete_in_batches(query, {}, self.batch_size, run)
+
+        logger.info(f"Deleted container {uid} with {total} nodes")
+
+        # managers imports this module
+        from .managers import Manager
+
+        # the deleted content may leave offloaded metadata behind
+        Manager().collect_later()
+
+        return total
+
+    @staticmethod
+    def _containers_left() -> bool:
+        return bool(len(models.Container.nodes) or len(models.PendingDeletion.nodes))
+
+    def resume(self) -> List[Job]:
+        """Queue deletions left unfinished, e.g. by a restart.
+
+        Must not be called inside a transaction.
+        """
+
+        uids = atomic(lambda: [node.uid for node in models.PendingDeletion.nodes])()
+
+        return [self._submit(uid) for uid in uids]
+
+
+@lru_cache
+def get_deleter() -> Deleter:
+    """Return the process-wide deleter."""
+
+    return Deleter(get_write_queue(), batch_size=settings.DELETION_BATCH_SIZE)
+
+
+def resume_later(writer: WriteQueue) -> Job:
+    """Queue a job that queues deletions left unfinished by a previous
+    process, return it.
+
+    Submitted once, when the process-wide write queue is created, see
+    `jobs.get_write_queue`.
+    """
+
+    deleter = Deleter(writer, batch_size=settings.DELETION_BATCH_SIZE)
+
+    def resume():
+        resumed = deleter.resume()
+
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} pending deletions")
+
+    return writer.submit(
+        "resume",
+        resume,
+        transaction=False,
+        job=Job(container="", kind="resume", cancellable=False),
+    )
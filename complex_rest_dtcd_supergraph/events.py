@@ -0,0 +1,104 @@
+"""
+In-process broker of change notifications.
+
+Writes publish compact notifications to channels named by container
+uid; subscribers (e.g. Server-Sent Events streams) receive them from
+their own queues. Channels may be linked, so that notifications of a
+fragment also reach subscribers of its root.
+
+The broker lives in the memory of a single process: with several
+worker processes a subscriber only sees writes made by its own process.
+"""
+
+import itertools
+import queue
+import threading
+from collections import defaultdict
+from typing import Iterable, Optional
+
+
+class Subscription:
+    """A queue of notifications from a set of channels."""
+
+    def __init__(self, broker: "Broker", channels: Iterable[str], maxsize: int):
+        self.broker = broker
+        self.channels = set(channels)
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, event: dict):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            pass  # slow subscriber, drop notifications
+
+    def get(self, timeout: float = None) -> Optional[dict]:
+        """Return the next notification, or `None` on timeout."""
+
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Broker:
+    """Delivers notifications published to channels to their subscribers.
+
+    Every notification gets an `id` from a process-wide counter.
+    """
+
+    def __init__(self, maxsize: int = 1000) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # channel -> subscriptions
+        self._links = defaultdict(set)  # child channel -> parent channels
+        self._ids = itertools.count(1)
+
+    def link(self, parent: str, child: str):
+        """Deliver notifications of the child channel to the parent's subscribers."""
+
+        with self._lock:
+            self._links[child].add(parent)
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        subscription = Subscription(self, channels, self.maxsize)
+
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].discard(subscription)
+
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def publish(self, channel: str, event: dict) -> dict:
+        """Send a notification to subscribers of the channel and linked ones.
+
+        Returns the notification with its `id`.
+        """
+
+        with self._lock:
+            event = {"id": next(self._ids), **event}
+            subscribers = set(self._subscribers.get(channel, ()))
+
+            for parent in self._links.get(channel, ()):
+                subscribers.update(self._subscribers.get(parent, ()))
+
+        for subscription in subscribers:
+            subscription.put(event)
+
+        return event
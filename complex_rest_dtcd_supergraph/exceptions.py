@@ -13,6 +13,46 @@ class LoadingError(APIException):
     default_code = "error"
 
 
+class ChangesExpired(APIException):
+    """Requested changes were compacted away."""
+
+    status_code = 410
+    default_detail = "Changes since this sequence number are no longer available."
+    default_code = "gone"
+
+
+class JobNotCancellable(APIException):
+    """The job is finished or cannot be stopped halfway."""
+
+    status_code = 409
+    default_detail = "The job cannot be cancelled."
+    default_code = "conflict"
+
+
+class ChunkTooLarge(APIException):
+    """An upload chunk exceeds the configured size."""
+
+    status_code = 413
+    default_detail = "The chunk is too large."
+    default_code = "too_large"
+
+
+class UploadInProgress(APIException):
+    """The upload is being committed and cannot change."""
+
+    status_code = 409
+    default_detail = "The upload is being committed."
+    default_code = "conflict"
+
+
+class ServiceBusy(APIException):
+    """Transient database errors persisted after retries."""
+
+    status_code = 503
+    default_detail = "Database is busy, try again later."
+    default_code = "busy"
+
+
 class ManagerError(APIException):
     status_code = 400
     default_detail = "Manager error."
@@ -0,0 +1,65 @@
+"""
+Helper script to export graph content of a root or a fragment as NDJSON.
+
+Content is streamed from server-side cursors with constant memory, one
+node (with ports), edge or group per line, see `docs/Format.md`. The
+output can be loaded back with `import_graph`. Run it with plugin's
+virtual environment from the directory above the plugin:
+
+    python -m complex_rest_dtcd_supergraph.export_graph --root <uid> -o graph.ndjson
+"""
+
+import argparse
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+
+import neomodel
+
+from . import settings
+from .converters import GraphDataConverter
+from .import_graph import get_container
+from .managers import Manager
+from .streams import to_ndjson
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Export graph content of a root or a fragment as NDJSON.
+
+        Reads database credentials from plugin's configuration file.
+        """
+    )
+
+    parser.add_argument("--root", required=True, help="uid of the root")
+    parser.add_argument("--fragment", help="uid of root's fragment to export")
+    parser.add_argument(
+        "-o", "--output", type=Path, help="path to the output file, stdout by default"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="records fetched at a time"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        container = get_container(args.root, args.fragment)
+    except (ValueError, neomodel.DoesNotExist):
+        parser.error("no such root or fragment")
+
+    converter = GraphDataConverter(passthrough=settings.META_PASSTHROUGH)
+    parts = Manager().iter_read(container, args.batch_size)
+    output = nullcontext(sys.stdout) if args.output is None else open(args.output, "w")
+    count = 0
+
+    with output as f:
+        for line in to_ndjson(parts, converter):
+            f.write(line)
+            count += 1
+
+    print(f"Exported {count} objects.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Versioned snapshots of container content.
+
+Each version is stored as a delta of entity records against the
+previous version, with a full checkpoint every few versions. A version
+is reconstructed from the last checkpoint before it and the deltas
+after, so the cost is bounded by the checkpoint interval.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from .stores import HistoryStore
+from .structures import Content, Edge, Group, Port, RawJSON, Vertex
+
+
+Records = Dict[str, str]
+
+
+def _meta(meta):
+    return json.loads(meta) if isinstance(meta, RawJSON) else meta
+
+
+def encode(content: Content) -> Records:
+    """Encode the content as a mapping of entity keys to JSON records."""
+
+    result = {}
+
+    for vertex in content.vertices:
+        result["vertex:" + vertex.uid] = json.dumps(
+            {
+                "properties": vertex.properties,
+                "meta": _meta(vertex.meta),
+                "ports": sorted(vertex.ports),
+            },
+            sort_keys=True,
+        )
+
+    for kind, items in (("port", content.ports), ("group", content.groups)):
+        for item in items:
+            result[kind + ":" + item.uid] = json.dumps(
+                {"properties": item.properties, "meta": _meta(item.meta)},
+                sort_keys=True,
+            )
+
+    for edge in content.edges:
+        result["edge:" + json.dumps(edge.uid)] = json.dumps(
+            {"meta": _meta(edge.meta)}, sort_keys=True
+        )
+
+    return result
+
+
+def fingerprint(content: Content) -> str:
+    """Return a hash of the content that does not depend on entity order."""
+
+    digest = hashlib.sha256()
+
+    for key, data in sorted(encode(content).items()):
+        digest.update(key.encode())
+        digest.update(b"\0")
+        digest.update(data.encode())
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def decode(records: Records) -> Content:
+    """Decode the mapping of entity keys to JSON records into content."""
+
+    content = Content(vertices=[], ports=[], edges=[], groups=[])
+
+    for key, data in records.items():
+        kind, uid = key.split(":", 1)
+        record = json.loads(data)
+
+        if kind == "vertex":
+            content.vertices.append(
+                Vertex(
+                    uid=uid,
+                    properties=record["properties"],
+                    meta=record["meta"],
+                    ports=set(record["ports"]),
+                )
+            )
+        elif kind == "port":
+            content.ports.append(Port(uid, record["properties"], record["meta"]))
+        elif kind == "group":
+            content.groups.append(Group(uid, record["properties"], record["meta"]))
+        elif kind == "edge":
+            start, end = json.loads(uid)
+            content.edges.append(Edge(start=start, end=end, meta=record["meta"]))
+
+    return content
+
+
+class History:
+    """Keeps versions of container content in a store.
+
+    A full checkpoint is written every `checkpoint_interval` versions,
+    the versions in between keep only changed records.
+    """
+
+    def __init__(self, store: HistoryStore, checkpoint_interval: int) -> None:
+        self.store = store
+        self.checkpoint_interval = checkpoint_interval
+
+    def _records(self, container: str, version: int) -> Records:
+        checkpoint = self.store.last_checkpoint(container, version)
+
+        if checkpoint is None:
+            raise KeyError(version)
+
+        result = {}
+
+        for _, key, data in self.store.records(container, checkpoint, version):
+            if data is None:
+                result.pop(key, None)
+            else:
+                result[key] = data
+
+        return result
+
+    def record(self, container: str, content: Content) -> Optional[int]:
+        """Save the content as a new version of the container.
+
+        Returns the number of the new version, or `None` if nothing
+        has changed since the last one. Concurrent records take turns:
+        the new version is numbered and compared with the last one in
+        a single store transaction.
+        """
+
+        new = encode(content)
+
+        with self.store.immediate():
+            last = self.store.last_version(container)
+
+            if last is None:
+                self.store.add_version(container, 1, True, new)
+                return 1
+
+            old = self._records(container, last)
+            delta = {key: data for key, data in new.items() if old.get(key) != data}
+            delta.update((key, None) for key in old.keys() - new.keys())
+
+            if not delta:
+                return None
+
+            version = last + 1
+            checkpoint = version - self.store.last_checkpoint(container, last)
+
+            if checkpoint >= self.checkpoint_interval:
+                self.store.add_version(container, version, True, new)
+            else:
+                self.store.add_version(container, version, False, delta)
+
+        return version
+
+    def versions(self, container: str) -> List[dict]:
+        """Return descriptions of all versions of the container."""
+
+        return [
+            {
+                "version": version,
+                "created": datetime.fromtimestamp(created, tz=timezone.utc),
+                "checkpoint": checkpoint,
+                "changes": changes,
+            }
+            for version, created, checkpoint, changes in self.store.versions(container)
+        ]
+
+    def content(self, container: str, version: int) -> Content:
+        """Return the content of a given version of the container.
+
+        Raises `KeyError` if there is no such version.
+        """
+
+        if not 1 <= version <= (self.store.last_version(container) or 0):
+            raise KeyError(version)
+
+        return decode(self._records(container, version))
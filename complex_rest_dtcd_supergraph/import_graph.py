@@ -0,0 +1,115 @@
+"""
+Helper script to import a large graph file straight into Neo4j.
+
+Streams a JSON or NDJSON graph file, validates it with bounded memory
+and merges it into the content of a root or a fragment with batched
+statements, see `bulk` module. Run it with plugin's virtual
+environment from the directory above the plugin:
+
+    python -m complex_rest_dtcd_supergraph.import_graph graph.json --root <uid>
+"""
+
+import argparse
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import neomodel
+
+from .bulk import BulkImporter, InvalidGraph, Stats
+from .models import Container, Root
+from .streams import FORMATS, StreamError
+
+
+def open_items(path: Path, format_: str):
+    """Return a function that opens a new stream of the file's objects."""
+
+    reader = FORMATS[format_]
+
+    def items():
+        with open(path, encoding="utf-8") as f:
+            yield from reader(f)
+
+    return items
+
+
+def get_container(root_uid: str, fragment_uid: str = None) -> Container:
+    """Return the root or its fragment, uids may be in either UUID form."""
+
+    root = Root.nodes.get(uid=uuid.UUID(root_uid).hex)
+
+    if fragment_uid is None:
+        return root
+
+    return root.fragments.get(uid=uuid.UUID(fragment_uid).hex)
+
+
+def print_progress(stats: Stats):
+    print(
+        f"\r{stats.total} objects in {stats.batches} batches, "
+        f"{stats.rate:.0f} objects/s",
+        end="",
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Import a graph file into the content of a root or a fragment.
+        Entities missing from the file are kept. The import is not
+        recorded in history, change feed or notifications.
+
+        Reads database credentials from plugin's configuration file.
+        """
+    )
+
+    parser.add_argument("path", type=Path, help="path to a graph file")
+    parser.add_argument("--root", required=True, help="uid of the root")
+    parser.add_argument("--fragment", help="uid of root's fragment to import into")
+    parser.add_argument(
+        "--format",
+        choices=sorted(FORMATS),
+        help="format of the file, by default from its extension",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=5000, help="objects per transaction"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="processes preparing batches, 0 to prepare in this one",
+    )
+
+    args = parser.parse_args()
+    format_ = args.format or args.path.suffix.lstrip(".").lower()
+
+    if format_ not in FORMATS:
+        parser.error(f"unknown format {format_!r}, use --format")
+
+    try:
+        container = get_container(args.root, args.fragment)
+    except (ValueError, neomodel.DoesNotExist):
+        parser.error("no such root or fragment")
+
+    importer = BulkImporter(
+        container,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        progress=print_progress,
+    )
+
+    try:
+        stats = importer.run(open_items(args.path, format_))
+    except (InvalidGraph, StreamError) as e:
+        print(f"\nInvalid graph: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print()
+    print(stats.summary())
+
+
+if __name__ == "__main__":
+    main()
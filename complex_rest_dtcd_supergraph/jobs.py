@@ -0,0 +1,419 @@
+"""
+Background jobs.
+
+Long operations (writes, deletions) are accepted as jobs and run by
+a pool of worker threads, each job in its own transaction unless it
+manages transactions itself. Jobs of the same container run one at
+a time, in order. Queued writes to the same container are coalesced:
+a newer write supersedes the one that has not started yet, so only the
+latest content is written.
+
+Jobs report progress with `report`, which is also the point where
+a running job is cancelled. Records of jobs are optionally kept in
+a local SQLite store, so that their status outlives the process.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from . import settings
+from .stores import JobStore
+from .transactions import atomic
+
+
+logger = logging.getLogger("supergraph")
+
+_local = threading.local()
+
+# process that owns the jobs it runs
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SUPERSEDED = "superseded"
+CANCELLED = "cancelled"
+
+
+def _now() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+class Cancelled(Exception):
+    """The current job was cancelled."""
+
+
+@dataclass
+class Job:
+    """An operation on a container."""
+
+    container: str
+    kind: str = "replace"
+    uid: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    created: datetime = field(default_factory=_now)
+    started: Optional[datetime] = None
+    finished: Optional[datetime] = None
+    error: Optional[str] = None
+    superseded_by: Optional[str] = None
+    progress: dict = field(default_factory=dict)
+    cancellable: bool = True
+    interruptible: bool = True  # stops at progress reports while running
+    cancel_requested: bool = False
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status not in (QUEUED, RUNNING)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            self.to_dict(), default=lambda value: value.isoformat(), sort_keys=True
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "Job":
+        kwargs = json.loads(data)
+
+        for f in fields(cls):
+            if f.type is datetime or f.type == Optional[datetime]:
+                value = kwargs.get(f.name)
+                kwargs[f.name] = value and datetime.fromisoformat(value)
+
+        return cls(**kwargs)
+
+
+def _is_alive(owner: str) -> bool:
+    """Whether the process owning a job may still be running it."""
+
+    host, _, pid = owner.rpartition(":")
+
+    if host != socket.gethostname():
+        return True  # cannot tell
+
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+class WriteQueue:
+    """Runs jobs on containers in a pool of `workers` background threads.
+
+    Up to `history_size` jobs are kept for status requests, in memory
+    and in the `store`, if given.
+    """
+
+    def __init__(
+        self, history_size: int = 1000, workers: int = 1, store: JobStore = None
+    ) -> None:
+        self.history_size = history_size
+        self.workers = workers
+        self.store = store
+        self._condition = threading.Condition()
+        self._order = deque()  # containers with a pending job
+        self._pending = {}  # container -> (job, func)
+        self._active = set()  # containers with a running job
+        self._jobs = OrderedDict()  # uid -> job
+        self._running = 0
+        self._threads = []
+
+        if store is not None:
+            self._interrupt()
+
+    def _interrupt(self):
+        """Mark unfinished jobs of processes that are gone as failed."""
+
+        for uid, owner, data in self.store.unfinished():
+            if not _is_alive(owner):
+                job = Job.from_json(data)
+                job.status, job.error = FAILED, "Interrupted by a restart."
+                job.finished = _now()
+                self.store.put(uid, owner, job.status, job.to_json())
+
+    def _save(self, job: Job):
+        if self.store is not None:
+            self.store.put(job.uid, OWNER, job.status, job.to_json())
+
+    def _remember(self, job: Job):
+        self._jobs[job.uid] = job
+
+        while len(self._jobs) > self.history_size:
+            self._jobs.popitem(last=False)
+
+        if self.store is not None:
+            self._save(job)
+            self.store.trim(self.history_size)
+
+    def _start(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+
+        # running jobs occupy their threads
+        needed = min(self.workers, self._running + len(self._order))
+
+        while len(self._threads) < needed:
+            thread = threading.Thread(
+                target=self._work,
+                name=f"supergraph-worker-{len(self._threads)}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(
+        self,
+        container: str,
+        func: Callable[[], None],
+        transaction: bool = True,
+        job: Job = None,
+    ) -> Job:
+        """Queue a job on the container.
+
+        A queued job on the same container that has not started yet
+        is superseded by this one. Without `transaction` the function
+        manages transactions itself. A job may be created in advance,
+        e.g. to report it before the submission.
+        """
+
+        if job is None:
+            job = Job(container=container)
+
+        with self._condition:
+            previous = self._pending.get(container)
+
+            if previous is None:
+                self._order.append(container)
+            else:
+                previous_job, _ = previous
+                previous_job.status = SUPERSEDED
+                previous_job.superseded_by = job.uid
+                previous_job.finished = _now()
+                self._save(previous_job)
+
+            if transaction:
+                func = atomic(func)
+
+            self._pending[container] = (job, func)
+            self._remember(job)
+            self._start()
+            self._condition.notify_all()
+
+        return job
+
+    def get(self, uid: str) -> Optional[Job]:
+        """Return a job by its uid, if known."""
+
+        with self._condition:
+            job = self._jobs.get(uid)
+
+        if job is None and self.store is not None:
+            record = self.store.get(uid)
+
+            if record is not None:
+                data, cancel = record
+                job = Job.from_json(data)
+                job.cancel_requested |= cancel
+
+        return job
+
+    def list(self, status: str = None, limit: int = 100) -> List[Job]:
+        """Return the latest jobs, newest first, optionally by status."""
+
+        if self.store is not None:
+            jobs = []
+
+            for data, cancel in self.store.list(status, limit):
+                job = Job.from_json(data)
+                job.cancel_requested |= cancel
+                jobs.append(self._jobs.get(job.uid, job))
+
+            return jobs
+
+        with self._condition:
+            jobs = [
+                job
+                for job in reversed(self._jobs.values())
+                if status is None or job.status == status
+            ]
+
+        return jobs[:limit]
+
+    def cancel(self, uid: str) -> bool:
+        """Cancel a job.
+
+        A queued job is cancelled at once, a running one at its next
+        progress report. Returns `False` if the job is unknown, finished
+        or cannot be cancelled, e.g. it is running and never reports
+        progress.
+        """
+
+        with self._condition:
+            job = self._jobs.get(uid)
+
+            if job is None:
+                # may be owned by another process
+                job = self.get(uid)
+
+                if job is None or not self._can_cancel(job):
+                    return False
+
+                return self.store.request_cancel(uid)
+
+            if job.is_finished or not self._can_cancel(job):
+                return False
+
+            job.cancel_requested = True
+            key = next((k for k, (j, _) in self._pending.items() if j is job), None)
+
+            if key is not None:
+                del self._pending[key]
+                self._order.remove(key)
+                job.status, job.finished = CANCELLED, _now()
+                self._condition.notify_all()
+
+            self._save(job)
+
+        return True
+
+    @staticmethod
+    def _can_cancel(job: Job) -> bool:
+        if job.status == RUNNING and not job.interruptible:
+            return False
+
+        return job.cancellable
+
+    def _is_cancelled(self, job: Job) -> bool:
+        if not job.cancellable:
+            return False
+
+        if not job.cancel_requested and self.store is not None:
+            job.cancel_requested = self.store.cancel_requested(job.uid)
+
+        return job.cancel_requested
+
+    def update(self, job: Job, progress: dict):
+        """Update the progress of a running job.
+
+        Raises `Cancelled` if the job was asked to cancel.
+        """
+
+        with self._condition:
+            job.progress.update(progress)
+            self._save(job)
+
+        if self._is_cancelled(job):
+            raise Cancelled
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until all queued jobs are done.
+
+        Returns `False` on timeout.
+        """
+
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._order and not self._running, timeout
+            )
+
+    def _ready(self) -> Optional[str]:
+        """Return the first container with a pending job and no running one."""
+
+        return next((c for c in self._order if c not in self._active), None)
+
+    def _next(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._ready() is not None)
+            container = self._ready()
+            self._order.remove(container)
+            job, func = self._pending.pop(container)
+            job.status = RUNNING
+            job.started = _now()
+            self._active.add(container)
+            self._running += 1
+            self._save(job)
+
+        return container, job, func
+
+    def _work(self):
+        while True:
+            container, job, func = self._next()
+            _local.job, _local.queue = job, self
+
+            try:
+                if self._is_cancelled(job):
+                    raise Cancelled
+
+                func()
+            except Cancelled:
+                logger.info(f"Job {job.uid} cancelled")
+                job.status = CANCELLED
+            except Exception as e:
+                logger.exception(f"Job {job.uid} failed")
+                job.status, job.error = FAILED, str(e)
+            else:
+                job.status = DONE
+
+            _local.job = _local.queue = None
+
+            with self._condition:
+                job.finished = _now()
+                self._active.discard(container)
+                self._running -= 1
+                self._save(job)
+                self._condition.notify_all()
+
+
+def current() -> Optional[Job]:
+    """Return the job being run in the current thread, if any."""
+
+    return getattr(_local, "job", None)
+
+
+def report(**progress):
+    """Update the progress of the current job, if any.
+
+    Raises `Cancelled` if the job was asked to cancel, so long jobs
+    should report between their transactions.
+    """
+
+    job = current()
+
+    if job is not None:
+        _local.queue.update(job, progress)
+
+
+@lru_cache
+def get_write_queue() -> WriteQueue:
+    """Return the process-wide job queue, created on first use.
+
+    Its first job resumes deletions left unfinished by a previous
+    process.
+    """
+
+    # deletion jobs run in this queue
+    from .deletion import resume_later
+
+    queue = WriteQueue(
+        history_size=settings.JOBS_HISTORY_SIZE,
+        workers=settings.JOBS_WORKERS,
+        store=JobStore(settings.JOBS_STORE_PATH),
+    )
+    resume_later(queue)
+
+    return queue
@@ -0,0 +1,29 @@
+"""
+Management command to migrate root membership of fragment content.
+
+Earlier versions connected every entity of a fragment to its root as
+well. Run it once after upgrading:
+
+    python manage.py unlink_fragment_content
+"""
+
+from django.core.management.base import BaseCommand
+
+from ... import settings
+from ...managers import unlink_fragment_content
+
+
+class Command(BaseCommand):
+    help = "Remove relationships from roots to the content of their fragments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.DELETION_BATCH_SIZE,
+            help="relationships removed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        unlinked = unlink_fragment_content(options["batch_size"])
+        self.stdout.write(f"Unlinked {unlinked} fragment entities from roots.")
@@ -5,83 +5,167 @@ These help us abstract management operations for graphs, fragments, etc.
 and isolate details and complexity.
 """
 
-from collections import defaultdict
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
 from itertools import chain
-from typing import Iterable, List, Mapping, Sequence
+from types import SimpleNamespace
+from typing import Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
 
 import neomodel
 
+from . import history
+from . import jobs
+from . import metrics
 from . import models
+from . import queries
+from . import settings
 from . import structures
-from .models.relations import RELATION_TYPES
-from .utils import connect_if_not_connected, free_properties
-
-
-def reconnect_to_container(
+from .backends import AbstractBackend, InMemoryBackend, concatenate, content_stats
+from .changes import ChangeLog, group_ids
+from .chunks import ChunkSizer, split
+from .deletion import get_deleter
+from .events import Broker
+from .history import History
+from .jobs import Job
+from .meta import (
+    REFERENCE_PREFIX,
+    MetaCollector,
+    MetaOffloader,
+    MetaTemplates,
+    entities,
+    entity_key,
+)
+from .stores import ChangeStore, HistoryStore, MetaStore, StagingStore
+from .transactions import atomic, on_commit
+from .utils import (
+    batched,
+    call,
+    connect_if_not_connected,
+    delete_in_batches,
+    read_session,
+)
+
+
+logger = logging.getLogger("supergraph")
+
+
+def connect_to_container(
     container: models.Container,
-    vertices: Iterable[models.Vertex],
-    groups: Iterable[models.Group],
+    vertices: Iterable[structures.ID],
+    groups: Iterable[structures.ID],
 ):
-    """Reconnect merged entities to parent container."""
+    """Connect vertices and groups with given uids to the container."""
 
-    for vertex in vertices:
-        connect_if_not_connected(container.vertices, vertex)
+    for query, uids in (
+        (queries.CONNECT_VERTICES, vertices),
+        (queries.CONNECT_GROUPS, groups),
+    ):
+        neomodel.db.cypher_query(query, {"uid": container.uid, "uids": list(uids)})
 
-    for group in groups:
-        connect_if_not_connected(container.groups, group)
 
+def unlink_fragment_content(batch_size: int = 1000) -> int:
+    """Remove relationships from roots to the content of their fragments.
 
-class _Reader:
-    """Read operations on a container."""
+    Earlier versions wrote them on every fragment save; now that root
+    membership is derived, they would keep entities in the root after
+    they leave the fragment. Each batch runs in a transaction of its
+    own. Returns the number of removed relationships.
+    """
 
-    def __init__(self) -> None:
-        self._foreign_key_mapping = defaultdict(set)  # parent:children uid pairs
+    uids = atomic(lambda: [root.uid for root in models.Root.nodes])()
 
-    def _query_ports(self, vertices: Iterable[models.Vertex]):
-        ports: List[models.Port] = []
+    return sum(
+        delete_in_batches(
+            queries.UNLINK_FRAGMENT_CONTENT,
+            {"uid": uid},
+            batch_size,
+            run=lambda func: atomic(func)(),
+        )
+        for uid in uids
+    )
 
-        for vertex in vertices:
-            for port in vertex.ports.all():
-                ports.append(port)
-                self._foreign_key_mapping[vertex.uid].add(port.uid)
 
-        return ports
+class _Reader:
+    """Read operations on a container.
+
+    Queries raw records (properties maps) and builds `structures`
+    objects from them directly, without inflating neomodel nodes.
+
+    In pass-through mode metadata is not decoded, we keep it as `RawJSON`.
+    """
+
+    def __init__(self, passthrough: bool = False) -> None:
+        self.passthrough = passthrough
+        # properties defined on models, the rest are user-defined
+        self._defined = {
+            subclass: set(model.defined_properties(aliases=False, rels=False))
+            for subclass, model in (
+                (structures.Vertex, models.Vertex),
+                (structures.Port, models.Port),
+                (structures.Group, models.Group),
+            )
+        }
 
-    @staticmethod
-    def _to_primitive(node, subclass):
-        uid = node.uid
-        properties = free_properties(node)
-        meta = node.meta_
+    def _load_meta(self, value):
+        if value is None:
+            value = "{}"
+
+        return structures.RawJSON(value) if self.passthrough else json.loads(value)
+
+    def _to_primitive(self, properties: dict, subclass):
+        uid = properties["uid"]
+        meta = self._load_meta(properties.get("meta_"))
+        defined = self._defined[subclass]
+        properties = {
+            key: value for key, value in properties.items() if key not in defined
+        }
 
         return subclass(uid=uid, properties=properties, meta=meta)
 
-    def _to_vertex(self, node: models.Vertex):
-        vertex = self._to_primitive(node, subclass=structures.Vertex)
+    def _to_vertices(
+        self, rows
+    ) -> Tuple[List[structures.Vertex], List[structures.Port]]:
+        vertices = []
+        ports = []
 
-        # populate ports mappings
-        for child_id in self._foreign_key_mapping.get(vertex.uid, []):
-            vertex.ports.add(child_id)
+        for vertex_properties, port_properties in rows:
+            vertex = self._to_primitive(vertex_properties, structures.Vertex)
 
-        return vertex
+            for properties in port_properties:
+                port = self._to_primitive(properties, structures.Port)
+                vertex.ports.add(port.uid)
+                ports.append(port)
 
-    def read(self, container: models.Container) -> structures.Content:
-        self._foreign_key_mapping.clear()
-
-        # step 1 - get the insides
-        vertices = container.vertices.all()
-        ports = self._query_ports(vertices)
-        edges = container.edges
-        groups = container.groups.all()
-
-        # step 2 - map to content
-        vertices = [self._to_vertex(node) for node in vertices]
-        ports = [self._to_primitive(node, structures.Port) for node in ports]
-        edges = [
-            structures.Edge(start=start.uid, end=end.uid, meta=edge.meta_)
-            for (start, edge, end) in edges
+            vertices.append(vertex)
+
+        return vertices, ports
+
+    def _to_edges(self, rows) -> List[structures.Edge]:
+        return [
+            structures.Edge(start=start, end=end, meta=self._load_meta(meta))
+            for start, end, meta in rows
         ]
-        groups = [self._to_primitive(node, structures.Group) for node in groups]
+
+    def _to_groups(self, rows) -> List[structures.Group]:
+        return [
+            self._to_primitive(properties, structures.Group) for (properties,) in rows
+        ]
+
+    def read(self, container: models.Container) -> structures.Content:
+        params = {"uid": container.uid}
+
+        rows, _ = neomodel.db.cypher_query(queries.READ_VERTICES, params)
+        vertices, ports = self._to_vertices(rows)
+        rows, _ = neomodel.db.cypher_query(queries.READ_EDGES, params)
+        edges = self._to_edges(rows)
+        rows, _ = neomodel.db.cypher_query(queries.READ_GROUPS, params)
+        groups = self._to_groups(rows)
 
         return structures.Content(
             vertices=vertices,
@@ -90,9 +174,95 @@ class _Reader:
             groups=groups,
         )
 
+    def iter_read(
+        self, container: models.Container, batch_size: int
+    ) -> Iterator[structures.Content]:
+        """Yield the content in parts of up to `batch_size` records.
+
+        Records are pulled from server-side cursors in a read transaction
+        of its own, so memory use does not depend on the size of the
+        content. Must not be called inside a transaction.
+        """
+
+        params = {"uid": container.uid}
+        empty = dict(vertices=[], ports=[], edges=[], groups=[])
+
+        with read_session(fetch_size=batch_size) as session:
+            with session.begin_transaction() as tx:
+                result = tx.run(queries.READ_VERTICES, params)
+
+                for rows in batched(result, batch_size):
+                    vertices, ports = self._to_vertices(rows)
+                    yield structures.Content(
+                        **dict(empty, vertices=vertices, ports=ports)
+                    )
+
+                result = tx.run(queries.READ_EDGES, params)
+
+                for rows in batched(result, batch_size):
+                    yield structures.Content(**dict(empty, edges=self._to_edges(rows)))
+
+                result = tx.run(queries.READ_GROUPS, params)
+
+                for rows in batched(result, batch_size):
+                    yield structures.Content(
+                        **dict(empty, groups=self._to_groups(rows))
+                    )
+
 
 class _Deprecator:
-    """Deletes deprecated content of a container."""
+    """Deletes deprecated content of a container.
+
+    In `cypher` mode the set difference for vertices, ports and groups
+    is computed by Neo4j: we send new uids and delete the rest in
+    batches. In `python` mode we query the nodes and delete them one by
+    one.
+    """
+
+    MODES = ("cypher", "python")
+
+    def __init__(self, mode: str = "cypher", batch_size: int = 1000) -> None:
+        if mode not in self.MODES:
+            raise ValueError(
+                f"Unknown deprecation mode '{mode}'. "
+                f"Choose one of: {', '.join(self.MODES)}."
+            )
+
+        self.mode = mode
+        self.batch_size = batch_size
+
+    def _delete_in_batches(self, query: str, params: dict, run=call) -> int:
+        """Run deletion query until it deletes less than a batch."""
+
+        return delete_in_batches(query, params, self.batch_size, run)
+
+    def _delete_deprecated_vertices_groups_ports_in_db(
+        self, container: models.Container, content: structures.Content, run=call
+    ) -> int:
+        """Delete vertices, groups and ports from the container not in
+        the content with a few batched queries.
+
+        Returns the number of deleted nodes.
+        """
+
+        new_uids = [
+            item.uid
+            for item in chain(
+                content.vertices,
+                content.ports,
+                content.groups,
+            )
+        ]
+        params = {"uid": container.uid, "uids": new_uids}
+
+        return sum(
+            self._delete_in_batches(query, params, run)
+            for query in (
+                queries.DELETE_DEPRECATED_VERTICES,
+                queries.DELETE_DEPRECATED_PORTS,
+                queries.DELETE_DEPRECATED_GROUPS,
+            )
+        )
 
     @staticmethod
     def _delete_deprecated_vertices_groups_ports(
@@ -101,16 +271,22 @@ class _Deprecator:
         """Delete vertices, groups and ports from the container not in the content."""
 
         # query uids of primitive nodes (vertices, groups, ports) in the container
+        # and, for a root, in its fragments
         uid2node = {}
+        containers = [container]
+
+        if isinstance(container, models.Root):
+            containers.extend(container.fragments.all())
 
-        for vertex in container.vertices.all():
-            uid2node[vertex.uid] = vertex
+        for member in containers:
+            for vertex in member.vertices.all():
+                uid2node[vertex.uid] = vertex
 
-            for port in vertex.ports.all():
-                uid2node[port.uid] = port
+                for port in vertex.ports.all():
+                    uid2node[port.uid] = port
 
-        for group in container.groups.all():
-            uid2node[group.uid] = group
+            for group in member.groups.all():
+                uid2node[group.uid] = group
 
         new_uids = set(
             item.uid
@@ -127,36 +303,50 @@ class _Deprecator:
 
         return deprecated_uids
 
-    @staticmethod
     def _delete_deprecated_edges(
-        container: models.Container, content: structures.Content
+        self, container: models.Container, content: structures.Content, run=call
     ):
         """Delete edges from the container not in the content."""
 
         current_uids = set((op.uid, ip.uid) for op, _, ip in container.edges)
         new_uids = set(edge.uid for edge in content.edges)
         deprecated_uids = current_uids - new_uids
+        pairs = list(map(list, deprecated_uids))
 
-        neomodel.db.cypher_query(
-            query=(
-                "UNWIND $list AS pair "
-                "MATCH ({uid: pair[0]}) "
-                f" -[r:{RELATION_TYPES.edge}]-> "
-                "({uid: pair[1]}) "
-                "DELETE r"
-            ),
-            params={"list": list(map(list, deprecated_uids))},
-        )
+        for i in range(0, len(pairs), self.batch_size):
+            params = {"uid": container.uid, "pairs": pairs[i : i + self.batch_size]}
+            run(lambda: neomodel.db.cypher_query(queries.DELETE_EDGES, params))
 
         return deprecated_uids
 
     def delete_difference(
-        self, container: models.Container, content: structures.Content
+        self, container: models.Container, content: structures.Content, run=call
     ):
-        """Delete entities from the container that are not in the content."""
+        """Delete entities from the container that are not in the content.
+
+        In `cypher` mode each batch is run through `run`.
+        """
 
-        self._delete_deprecated_vertices_groups_ports(container, content)
-        self._delete_deprecated_edges(container, content)
+        if self.mode == "cypher":
+            self._delete_deprecated_vertices_groups_ports_in_db(container, content, run)
+        else:
+            self._delete_deprecated_vertices_groups_ports(container, content)
+
+        self._delete_deprecated_edges(container, content, run)
+
+    def clear(self, container: models.Container, run=call) -> int:
+        """Delete all vertices, their ports and groups of the container.
+
+        Each batch is run through `run`. Returns the number of deleted
+        vertices and groups.
+        """
+
+        params = {"uid": container.uid}
+
+        return sum(
+            self._delete_in_batches(query, params, run)
+            for query in (queries.CLEAR_VERTICES, queries.CLEAR_GROUPS)
+        )
 
 
 class _Merger:
@@ -231,6 +421,15 @@ class _Merger:
 
         ports = self._merge_ports(content.ports)
         uid2port = {port.uid: port for port in ports}
+
+        # edges may connect ports merged earlier, e.g. by a streamed replace
+        missing = {uid for edge in content.edges for uid in edge.uid} - set(uid2port)
+
+        if missing:
+            uid2port.update(
+                (port.uid, port)
+                for port in models.Port.nodes.filter(uid__in=list(missing))
+            )
         edges = self._merge_edges(content.edges, uid2port)
         vertices = self._merge_vertices(content.vertices, uid2port)
         groups = self._merge_groups(content.groups)
@@ -243,30 +442,775 @@ class _Merger:
         )
 
 
-class Manager:
-    """Handles read and write operations on the container's content."""
+class Neo4jBackend(AbstractBackend):
+    """Stores the content in Neo4j database via neomodel models."""
 
     def __init__(self) -> None:
-        self._reader = _Reader()
-        self._deprecator = _Deprecator()
+        self._reader = _Reader(passthrough=settings.META_PASSTHROUGH)
+        self._deprecator = _Deprecator(
+            mode=settings.DEPRECATION_MODE,
+            batch_size=settings.DELETION_BATCH_SIZE,
+        )
         self._merger = _Merger()
+        self._staging = (
+            StagingStore(settings.CHUNK_STORE_PATH)
+            if settings.CHUNK_THRESHOLD
+            else None
+        )
+
+    def _read_staged(self, container: models.Container):
+        """Return the snapshot of a container flagged as staging, if any."""
+
+        rows, _ = neomodel.db.cypher_query(queries.READ_STAGING, {"uid": container.uid})
+        token = rows[0][0] if rows else None
+
+        if token is None:
+            return None
+
+        records = self._staging.get(token, container.uid)
+
+        if records is None:
+            return None
+
+        content = history.decode(records)
+
+        if self._reader.passthrough:
+            for item in chain(
+                content.vertices, content.ports, content.edges, content.groups
+            ):
+                item.meta = structures.RawJSON(json.dumps(item.meta))
+
+        return content
 
     def read(self, container: models.Container):
-        """Return the content of a given container."""
+        if self._staging is not None:
+            content = self._read_staged(container)
+
+            if content is not None:
+                return content
 
         return self._reader.read(container)
 
-    def replace(self, container: models.Container, content: structures.Content):
-        """Replace the content of a given container."""
+    def iter_read(self, container: models.Container, batch_size: int):
+        if self._staging is not None:
+            content = atomic(self._read_staged)(container)
+
+            if content is not None:
+                yield content
+                return
+
+        yield from self._reader.iter_read(container, batch_size)
+
+    def version(self, container: models.Container) -> Optional[str]:
+        content_hash, _, fragments = self._read_fingerprints(container)
+
+        # unknown after a bulk import, until the next write
+        if content_hash is None or "" in fragments:
+            return None
+
+        return ":".join([content_hash, *fragments])
+
+    def stats(self, container: models.Container) -> structures.Stats:
+        if self._staging is not None:
+            content = self._read_staged(container)
+
+            if content is not None:
+                return content_stats(content)
+
+        rows, _ = neomodel.db.cypher_query(
+            queries.CONTAINER_STATS, {"uid": container.uid}
+        )
+        values = [value or 0 for value in rows[0]]
+
+        return structures.Stats(*values[:6], float(values[6]), values[7])
+
+    @staticmethod
+    def _invalidate_shared(container: models.Container):
+        neomodel.db.cypher_query(queries.INVALIDATE_SHARED, {"uid": container.uid})
+
+    @staticmethod
+    def _read_fingerprints(container: models.Container):
+        rows, _ = neomodel.db.cypher_query(
+            queries.READ_FINGERPRINT, {"uid": container.uid}
+        )
+        content_hash, snapshot, fragments = rows[0]
+        # arrays in Neo4j cannot hold nulls
+        fragments = [fingerprint or "" for fingerprint in fragments]
+
+        return content_hash, snapshot or [], fragments
+
+    def _lift(self, container: models.Container):
+        """Lift staging flags set together with the container's one."""
+
+        if self._staging is None:
+            return
+
+        rows, _ = neomodel.db.cypher_query(queries.READ_STAGING, {"uid": container.uid})
+        token = rows[0][0] if rows else None
+
+        if token is not None:
+            uids = set(self._staging.containers(token)) | {container.uid}
+            neomodel.db.cypher_query(
+                queries.LIFT_STAGING, {"uids": list(uids), "token": token}
+            )
+            on_commit(lambda: self._staging.drop(token))
+
+    def _remember(self, container: models.Container, fingerprint: Optional[str]):
+        self._lift(container)
+        _, _, fragments = self._read_fingerprints(container)
+        neomodel.db.cypher_query(
+            queries.WRITE_FINGERPRINT,
+            {
+                "uid": container.uid,
+                "hash": fingerprint or uuid.uuid4().hex,
+                "fragments": fragments,
+            },
+        )
 
+    def replace(
+        self,
+        container: models.Container,
+        content: structures.Content,
+        fingerprint: str = None,
+    ):
         # content pre-conditions (referential integrity within the content):
         # - for each edge, start (output) & end (input) ports exist in content
         # - for each vertex, all ports exist in content
+        self._invalidate_shared(container)
         self._deprecator.delete_difference(container, content)
-        result = self._merger.merge(content)  # TODO does not replace old properties
-        reconnect_to_container(container, result.vertices, result.groups)
+        self._merger.merge(content)  # TODO does not replace old properties
+        connect_to_container(
+            container,
+            vertices=(vertex.uid for vertex in content.vertices),
+            groups=(group.uid for group in content.groups),
+        )
+        self._invalidate_shared(container)
+        self._remember(container, fingerprint)
+
+    def matches(self, container: models.Container, fingerprint: str) -> bool:
+        content_hash, snapshot, fragments = self._read_fingerprints(container)
+
+        return content_hash == fingerprint and snapshot == fragments
+
+    def _stage(self, container: models.Container, token: str) -> Set[str]:
+        """Save snapshots of containers the write may change, flag them.
+
+        Returns uids of flagged containers.
+        """
+
+        params = {"uid": container.uid}
+        uids = {container.uid}
+
+        for query in (queries.PARENT_CONTAINERS, queries.SHARING_CONTAINERS):
+            rows, _ = neomodel.db.cypher_query(query, params)
+            uids.update(uid for (uid,) in rows)
+
+        for uid in uids:
+            member = SimpleNamespace(uid=uid)
+            self._lift(member)  # left by a failed chunked replace
+            self._staging.put(token, uid, history.encode(self._reader.read(member)))
+
+        neomodel.db.cypher_query(
+            queries.FLAG_STAGING, {"uids": list(uids), "token": token}
+        )
+        self._invalidate_shared(container)
+
+        return uids
+
+    def _merge_chunk(self, container: models.Container, chunk: structures.Content):
+        self._merger.merge(chunk)
+        connect_to_container(
+            container,
+            vertices=(vertex.uid for vertex in chunk.vertices),
+            groups=(group.uid for group in chunk.groups),
+        )
+
+    def _swap(self, container: models.Container, fingerprint: Optional[str]):
+        self._invalidate_shared(container)
+        self._remember(container, fingerprint)  # lifts the flags
+
+    def replace_chunked(
+        self,
+        container: models.Container,
+        content: structures.Content,
+        fingerprint: str = None,
+    ):
+        """Replace the content of a given container in a series of
+        transactions of adaptive size.
+
+        Containers the write may change are flagged first, and their
+        reads are served from snapshots taken at that moment until the
+        last transaction lifts the flags, so readers never see a
+        half-written graph. If the replace fails midway, the flags stay
+        until the next successful write of any of these containers.
+
+        The number of written objects is reported to the current job
+        after each chunk; a cancelled job stops there, like a failed one.
+
+        Must not be called inside a transaction.
+        """
+
+        if self._staging is None:
+            return atomic(self.replace)(container, content, fingerprint)
+
+        token = uuid.uuid4().hex
+        atomic(self._stage)(container, token)
+        self._deprecator.delete_difference(
+            container, content, run=lambda func: atomic(func)()
+        )
+
+        sizer = ChunkSizer(
+            size=settings.CHUNK_SIZE,
+            min_size=settings.CHUNK_MIN_SIZE,
+            max_size=settings.CHUNK_MAX_SIZE,
+            target_latency=settings.CHUNK_TARGET_LATENCY,
+        )
+
+        # ports are repeated across chunks, count the other objects
+        total = len(content.vertices) + len(content.edges) + len(content.groups)
+        written = 0
+
+        for chunk in split(content, sizer):
+            start = time.monotonic()
+            atomic(self._merge_chunk)(container, chunk)
+            sizer.observe(chunk.size, time.monotonic() - start)
+            logger.debug(f"Wrote a chunk of {chunk.size} entities")
+            written += len(chunk.vertices) + len(chunk.edges) + len(chunk.groups)
+            jobs.report(written=written, total=total)
+
+        atomic(self._swap)(container, fingerprint)
+
+    def _restore(self, container: models.Container, token: str):
+        """Replace the content with the snapshot taken when staging."""
+
+        records = self._staging.get(token, container.uid)
+        self.replace(container, history.decode(records))  # lifts the flags
+
+    def replace_stream(
+        self,
+        container: models.Container,
+        parts: Iterable[structures.Content],
+        fingerprint: str = None,
+    ):
+        """Replace the content of a given container with a stream of
+        content parts, each merged in its own transaction as it arrives.
+
+        Readers are served snapshots until the swap, like with
+        `replace_chunked`. Only uids of the written entities are kept to
+        delete the rest of the old content at the end. If the stream
+        fails midway, the old content is written back and the error is
+        re-raised.
+
+        Must not be called inside a transaction.
+        """
+
+        if self._staging is None:
+            # collect first, a retried transaction cannot re-read the stream
+            content = concatenate(parts)
+
+            return atomic(self.replace)(container, content, fingerprint)
+
+        token = uuid.uuid4().hex
+        atomic(self._stage)(container, token)
+        # uids of the new content
+        outline = structures.Content(vertices=[], ports=[], edges=[], groups=[])
+
+        try:
+            for part in parts:
+                atomic(self._merge_chunk)(container, part)
+                logger.debug(f"Wrote a part of {part.size} entities")
+                outline.vertices.extend(structures.Vertex(v.uid) for v in part.vertices)
+                outline.ports.extend(structures.Port(p.uid) for p in part.ports)
+                outline.edges.extend(
+                    structures.Edge(e.start, e.end) for e in part.edges
+                )
+                outline.groups.extend(structures.Group(g.uid) for g in part.groups)
+        except Exception:
+            atomic(self._restore)(container, token)
+            raise
+
+        self._deprecator.delete_difference(
+            container, outline, run=lambda func: atomic(func)()
+        )
+        atomic(self._swap)(container, fingerprint)
+
+    def iter_meta(self) -> Iterator[Tuple[str, object]]:
+        params = {"prefix": REFERENCE_PREFIX}
+
+        with read_session() as session:
+            with session.begin_transaction() as tx:
+                for key, meta in tx.run(queries.SCAN_META, params):
+                    yield key, structures.RawJSON(meta)
+
+                for start, end, meta in tx.run(queries.SCAN_EDGE_META, params):
+                    yield json.dumps([start, end]), structures.RawJSON(meta)
+
+        # snapshots of chunked writes in progress refer to the old content
+        if self._staging is not None:
+            for records in self._staging.snapshots():
+                for item in entities(history.decode(records)):
+                    yield entity_key(item), item.meta
+
+    def reconnect(self, parent: models.Container, child: models.Container):
+        # membership of fragment content in the root is derived at read
+        # time, nothing to write
+        pass
+
+    def clear(self, container: models.Container):
+        """Delete the content in batches, each in a transaction of its own.
+
+        The number of deleted vertices and groups is reported to the
+        current job after each batch; a cancelled job stops there.
+        Readers may see part of the content until the last batch.
+        Inside a transaction, all batches run in it.
+        """
+
+        # the old fingerprint must not match a partially cleared container
+        atomic(self._swap)(container, None)
+        deleted = 0
+
+        def run(func):
+            nonlocal deleted
+
+            results = atomic(func)()
+            deleted += results[0][0][0]
+            jobs.report(deleted=deleted)
+
+            return results
+
+        self._deprecator.clear(container, run)
+        atomic(self._remember)(container, None)
+
+
+BACKENDS = {
+    "memory": InMemoryBackend,
+    "neo4j": Neo4jBackend,
+}
+
+
+def prepare_content(
+    content: structures.Content,
+    templates: Optional[MetaTemplates] = None,
+    offloader: Optional[MetaOffloader] = None,
+) -> structures.Content:
+    """Return the content in the form it is stored in.
+
+    Metadata is split into templates and large values are offloaded,
+    if `templates` and `offloader` are given. Needs no `Manager`, so
+    worker processes of bulk import do not open history, change feed
+    and job stores.
+    """
+
+    if templates is not None:
+        content = templates.split(content)
+
+    if offloader is not None:
+        content = offloader.offload(content)
+
+    return content
+
+
+@lru_cache(maxsize=None)
+def get_backend(name: str) -> AbstractBackend:
+    """Return a shared instance of the storage backend with a given name."""
+
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown storage backend '{name}'. "
+            f"Choose one of: {', '.join(sorted(BACKENDS))}."
+        )
+
+    return backend_class()
+
+
+def get_offloader() -> Optional[MetaOffloader]:
+    """Return metadata offloader according to settings, if enabled."""
+
+    if not settings.META_OFFLOAD_THRESHOLD:
+        return None
+
+    store = MetaStore(settings.META_STORE_PATH)
+
+    return MetaOffloader(store, threshold=settings.META_OFFLOAD_THRESHOLD)
+
+
+def get_templates() -> Optional[MetaTemplates]:
+    """Return metadata templates according to settings, if enabled."""
+
+    if not settings.META_TEMPLATE_KEYS:
+        return None
+
+    store = MetaStore(settings.META_STORE_PATH)
+
+    return MetaTemplates(store, keys=settings.META_TEMPLATE_KEYS)
+
+
+@lru_cache
+def get_collector() -> Optional[MetaCollector]:
+    """Return the process-wide collector of unreferenced metadata, if
+    the side store of metadata is in use."""
+
+    if not settings.META_OFFLOAD_THRESHOLD and not settings.META_TEMPLATE_KEYS:
+        return None
+
+    store = MetaStore(settings.META_STORE_PATH)
+
+    return MetaCollector(
+        store, grace=settings.META_GC_GRACE, interval=settings.META_GC_INTERVAL
+    )
+
+
+def get_history() -> Optional[History]:
+    """Return content history according to settings, if enabled."""
+
+    if not settings.HISTORY_ENABLED:
+        return None
+
+    store = HistoryStore(settings.HISTORY_STORE_PATH)
+
+    return History(store, checkpoint_interval=settings.HISTORY_CHECKPOINT_INTERVAL)
+
+
+def get_changelog() -> Optional[ChangeLog]:
+    """Return change log according to settings, if enabled."""
+
+    if not settings.CHANGES_ENABLED:
+        return None
+
+    store = ChangeStore(settings.CHANGES_STORE_PATH)
+
+    return ChangeLog(store, tombstone_ttl=settings.CHANGES_TOMBSTONE_TTL)
+
+
+@lru_cache
+def get_broker() -> Optional[Broker]:
+    """Return the process-wide notification broker, if enabled."""
+
+    if not settings.EVENTS_ENABLED:
+        return None
+
+    return Broker()
+
+
+class StatsCache:
+    """Keeps statistics of recent content versions in process memory.
+
+    Keys include the version of the content, so entries never go stale;
+    the least recently used ones are dropped beyond `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = 1000) -> None:
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[structures.Stats]:
+        with self._lock:
+            stats = self._items.get(key)
+
+            if stats is not None:
+                self._items.move_to_end(key)
+
+            return stats
+
+    def put(self, key: Tuple[str, str], stats: structures.Stats):
+        with self._lock:
+            self._items[key] = stats
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+@lru_cache
+def get_stats_cache() -> StatsCache:
+    """Return the process-wide cache of content statistics."""
+
+    return StatsCache()
+
+
+class Manager:
+    """Handles read and write operations on the container's content.
+
+    The actual work is delegated to a storage backend. By default, the
+    backend is selected with `backend` option in `storage` section of
+    the configuration file.
+
+    Large metadata may be offloaded to a side store, see `offload_threshold`
+    option in `meta` section. Common parts of metadata may be shared
+    between entities as templates, see `template_keys` option. Blobs and
+    templates nothing refers to any more are collected in background
+    after writes, see `gc_interval` option.
+
+    With `history` section enabled, each replace of the content is saved
+    as a new version of the container. With `changes` section enabled,
+    entity-level changes go to the change feed. With `events` section
+    enabled, subscribers are notified of committed writes.
+    """
+
+    def __init__(
+        self,
+        backend: AbstractBackend = None,
+        offloader: MetaOffloader = None,
+        templates: MetaTemplates = None,
+        collector: MetaCollector = None,
+        history: History = None,
+        changelog: ChangeLog = None,
+        broker: Broker = None,
+        stats_cache: StatsCache = None,
+    ) -> None:
+        if backend is None:
+            backend = get_backend(settings.STORAGE_BACKEND)
+
+        if offloader is None:
+            offloader = get_offloader()
+
+        if templates is None:
+            templates = get_templates()
+
+        if collector is None:
+            collector = get_collector()
+
+        if history is None:
+            history = get_history()
+
+        if changelog is None:
+            changelog = get_changelog()
+
+        if broker is None:
+            broker = get_broker()
+
+        self.backend = backend
+        self.offloader = offloader
+        self.templates = templates
+        self.collector = collector
+        self.history = history
+        self.changelog = changelog
+        self.broker = broker
+        self.stats_cache = get_stats_cache() if stats_cache is None else stats_cache
+
+    def read(self, container: models.Container):
+        """Return the content of a given container."""
+
+        content = self.backend.read(container)
+
+        if self.offloader is not None:
+            self.offloader.restore(content)
+
+        if self.templates is not None:
+            self.templates.expand(content)
+
+        return content
+
+    def iter_read(
+        self, container: models.Container, batch_size: int = 1000
+    ) -> Iterator[structures.Content]:
+        """Yield the content of a given container in parts, see
+        `AbstractBackend.iter_read`.
+
+        Must not be called inside a transaction.
+        """
+
+        for content in self.backend.iter_read(container, batch_size):
+            if self.offloader is not None:
+                self.offloader.restore(content)
+
+            if self.templates is not None:
+                self.templates.expand(content)
+
+            yield content
+
+    def stats(self, container: models.Container) -> structures.Stats:
+        """Return size statistics of the content of a given container.
+
+        Statistics are cached against the version of the content, see
+        `AbstractBackend.version`, so they are computed again only after
+        a write.
+        """
+
+        version = self.backend.version(container)
+        key = (container.uid, version)
+
+        if version is not None:
+            stats = self.stats_cache.get(key)
+
+            if stats is not None:
+                metrics.increment("stats.cached")
+                return stats
+
+        stats = self.backend.stats(container)
+
+        if version is not None:
+            self.stats_cache.put(key, stats)
+
+        return stats
+
+    def replace(self, container: models.Container, content: structures.Content):
+        """Replace the content of a given container.
+
+        Does nothing if the content is the same as the last written one.
+        """
+
+        hash_ = history.fingerprint(content)
+
+        if self.backend.matches(container, hash_):
+            metrics.increment("replace.skipped")
+            logger.info(f"Content of {container.uid} is unchanged, skip replace")
+            return
+
+        self.backend.replace(container, self._prepare(content), hash_)
+        on_commit(lambda: self._record(container, content))
+        on_commit(self.collect_later)
+
+    def replace_chunked(self, container: models.Container, content: structures.Content):
+        """Replace the content of a given container in a series of
+        transactions, see `Neo4jBackend.replace_chunked`.
+
+        Must not be called inside a transaction.
+        """
+
+        hash_ = history.fingerprint(content)
+
+        if atomic(self.backend.matches)(container, hash_):
+            metrics.increment("replace.skipped")
+            logger.info(f"Content of {container.uid} is unchanged, skip replace")
+            return
+
+        self.backend.replace_chunked(container, self._prepare(content), hash_)
+        metrics.increment("replace.chunked")
+        self._record(container, content)
+        self.collect_later()
+
+    def replace_stream(
+        self, container: models.Container, parts: Iterable[structures.Content]
+    ):
+        """Replace the content of a given container with a stream of
+        content parts, see `Neo4jBackend.replace_stream`.
+
+        Unlike other writes, the new content is not fingerprinted, so
+        the next replace is never skipped. The number of streamed
+        entities is reported to the current job after each part.
+
+        Must not be called inside a transaction.
+        """
+
+        def report(parts):
+            streamed = 0
+
+            for part in parts:
+                yield part
+                streamed += part.size
+                jobs.report(streamed=streamed)
+
+        self.backend.replace_stream(container, report(map(self._prepare, parts)))
+        metrics.increment("replace.streamed")
+
+        if any(
+            side is not None for side in (self.history, self.changelog, self.broker)
+        ):
+            self._record(container, atomic(self.read)(container))
+
+        self.collect_later()
+
+    def _prepare(self, content: structures.Content) -> structures.Content:
+        """Return the content in the form it is stored in."""
+
+        return prepare_content(content, self.templates, self.offloader)
 
     def reconnect(self, parent: models.Container, child: models.Container):
         """Reconnect the content of a child container to parent."""
 
-        reconnect_to_container(parent, child.vertices, child.groups)
+        self.backend.reconnect(parent, child)
+
+        if self.changelog is not None:
+            self.changelog.link(parent.uid, child.uid)
+
+        if self.broker is not None:
+            self.broker.link(parent.uid, child.uid)
+
+    def clear(self, container: models.Container):
+        """Delete the content of a given container.
+
+        Should not be called inside a transaction, so that large content
+        is deleted in a series of transactions, see `Neo4jBackend.clear`.
+        """
+
+        self.backend.clear(container)
+
+        empty = structures.Content(vertices=[], ports=[], edges=[], groups=[])
+        on_commit(lambda: self._record(container, empty))
+        on_commit(self.collect_later)
+
+    def delete(self, container: models.Container) -> Job:
+        """Delete a container with its content, return the deletion job.
+
+        The container is hidden at once, the content is deleted in
+        background, see `deletion.Deleter`.
+        """
+
+        job = get_deleter().delete_later(container)
+
+        empty = structures.Content(vertices=[], ports=[], edges=[], groups=[])
+        on_commit(lambda: self._record(container, empty))
+
+        return job
+
+    def collect_meta(self) -> Tuple[int, int]:
+        """Delete blobs and templates of metadata nothing refers to any
+        more, return their numbers, see `meta.MetaCollector`.
+
+        Must not be called inside a transaction.
+        """
+
+        if self.collector is None:
+            return 0, 0
+
+        blobs, templates = self.collector.collect(self.backend.iter_meta())
+        logger.info(f"Collected {blobs} blobs and {templates} templates of metadata")
+
+        return blobs, templates
+
+    def collect_later(self):
+        """Queue a collection of unreferenced metadata, if it is due."""
+
+        if self.collector is None or not self.collector.due():
+            return
+
+        jobs.get_write_queue().submit(
+            "collect:meta",
+            self.collect_meta,
+            transaction=False,
+            job=Job(container="", kind="collect", cancellable=False),
+        )
+
+    def _record(self, container: models.Container, content: structures.Content):
+        """Save new content to history and change feed, notify subscribers.
+
+        Called once the transaction commits: errors are logged, since
+        the write itself has succeeded.
+        """
+
+        event = {"container": container.uid}
+        changed = True
+
+        if self.history is not None:
+            try:
+                event["version"] = self.history.record(container.uid, content)
+            except Exception:
+                logger.exception(f"Could not record history of {container.uid}")
+            else:
+                changed = event["version"] is not None
+
+        if self.changelog is not None:
+            try:
+                event["seq"], keys = self.changelog.record(container.uid, content)
+            except Exception:
+                logger.exception(f"Could not record changes of {container.uid}")
+            else:
+                event["changed"] = group_ids(keys)
+                changed = bool(keys)
+
+        if self.broker is not None and changed:
+            self.broker.publish(container.uid, event)
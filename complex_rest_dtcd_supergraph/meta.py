@@ -0,0 +1,317 @@
+"""
+Storage transformations of entity metadata.
+
+Transformations here are applied by `managers.Manager` to the content
+before it goes to the storage backend, and reversed after reading.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import replace
+from itertools import chain
+from typing import Dict, Iterable, List, Tuple
+
+from .stores import MetaStore
+from .structures import Content, Edge, RawJSON
+
+
+BLOB_KEY = "$blob"
+BLOB_PATTERN = re.compile(r'^\{"\$blob": "([0-9a-f]{64})"\}$')
+TEMPLATE_KEY = "$template"
+TEMPLATE_PATTERN = re.compile(r'^\{"\$template": "([0-9a-f]{64})"(, )?')
+# metadata JSON with a reference starts with it
+REFERENCE_PREFIX = '{"$'
+
+
+def entity_key(item) -> str:
+    """Return a string key of an entity: uid or encoded pair for edges."""
+
+    if isinstance(item, Edge):
+        return json.dumps(item.uid)
+
+    return item.uid
+
+
+def entities(content: Content):
+    """Iterate over all entities with metadata in the content."""
+
+    return chain(content.vertices, content.ports, content.edges, content.groups)
+
+
+class MetaOffloader:
+    """Offloads large metadata to a side store.
+
+    Metadata which takes more than `threshold` characters as JSON is
+    saved to the store, keyed by entity and content hash. Only a small
+    reference `{"$blob": <hash>}` stays in the main storage.
+    """
+
+    def __init__(self, store: MetaStore, threshold: int) -> None:
+        self.store = store
+        self.threshold = threshold
+
+    @staticmethod
+    def _reference(meta) -> str:
+        """Return blob hash if the metadata is a reference, else `None`."""
+
+        if isinstance(meta, RawJSON):
+            match = BLOB_PATTERN.match(meta)
+            return match.group(1) if match else None
+
+        if isinstance(meta, dict) and len(meta) == 1:
+            return meta.get(BLOB_KEY)
+
+        return None
+
+    def _offload_items(self, items: list, blobs: List[Tuple[str, str, str]]):
+        result = []
+
+        for item in items:
+            data = (
+                item.meta if isinstance(item.meta, RawJSON) else json.dumps(item.meta)
+            )
+
+            if len(data) > self.threshold:
+                hash_ = hashlib.sha256(data.encode()).hexdigest()
+                blobs.append((entity_key(item), hash_, data))
+                reference = {BLOB_KEY: hash_}
+
+                if isinstance(item.meta, RawJSON):
+                    reference = RawJSON(json.dumps(reference))
+
+                item = replace(item, meta=reference)
+
+            result.append(item)
+
+        return result
+
+    def offload(self, content: Content) -> Content:
+        """Save large metadata to the store.
+
+        Returns new content where large metadata is replaced with
+        references.
+        """
+
+        blobs = []
+        result = Content(
+            vertices=self._offload_items(content.vertices, blobs),
+            ports=self._offload_items(content.ports, blobs),
+            edges=self._offload_items(content.edges, blobs),
+            groups=self._offload_items(content.groups, blobs),
+        )
+        self.store.put_many(blobs)
+
+        return result
+
+    def restore(self, content: Content) -> Content:
+        """Replace references with metadata from the store in-place."""
+
+        references = []
+
+        for item in entities(content):
+            hash_ = self._reference(item.meta)
+
+            if hash_ is not None:
+                references.append((item, (entity_key(item), hash_)))
+
+        if not references:
+            return content
+
+        blobs = self.store.get_many(key for _, key in references)
+
+        for item, key in references:
+            data = blobs[key]
+            item.meta = (
+                RawJSON(data) if isinstance(item.meta, RawJSON) else json.loads(data)
+            )
+
+        return content
+
+
+class MetaTemplates:
+    """Dictionary encoding of metadata with shared templates.
+
+    Values of template `keys` form a shared template, which is stored
+    once in the store, keyed by content hash. The rest of metadata is a
+    per-entity override with a reference `"$template": <hash>`.
+    """
+
+    def __init__(self, store: MetaStore, keys: Iterable[str]) -> None:
+        self.store = store
+        self.keys = tuple(keys)
+
+    @staticmethod
+    def _reference(meta) -> str:
+        """Return template hash if the metadata has a reference, else `None`."""
+
+        if isinstance(meta, RawJSON):
+            match = TEMPLATE_PATTERN.match(meta)
+            return match.group(1) if match else None
+
+        if isinstance(meta, dict):
+            return meta.get(TEMPLATE_KEY)
+
+        return None
+
+    def _split_items(self, items: list, templates: Dict[str, str]):
+        result = []
+
+        for item in items:
+            raw = isinstance(item.meta, RawJSON)
+            meta = json.loads(item.meta) if raw else item.meta
+            template = {key: meta[key] for key in self.keys if key in meta}
+
+            if template:
+                data = json.dumps(template)
+                hash_ = hashlib.sha256(data.encode()).hexdigest()
+                templates[hash_] = data
+                override = {TEMPLATE_KEY: hash_}
+                override.update(
+                    (key, value) for key, value in meta.items() if key not in template
+                )
+
+                if raw:
+                    override = RawJSON(json.dumps(override))
+
+                item = replace(item, meta=override)
+
+            result.append(item)
+
+        return result
+
+    def split(self, content: Content) -> Content:
+        """Save shared templates to the store.
+
+        Returns new content where metadata is replaced with overrides.
+        """
+
+        templates = {}
+        result = Content(
+            vertices=self._split_items(content.vertices, templates),
+            ports=self._split_items(content.ports, templates),
+            edges=self._split_items(content.edges, templates),
+            groups=self._split_items(content.groups, templates),
+        )
+        self.store.put_templates(templates.items())
+
+        return result
+
+    @staticmethod
+    def _expand_raw(override: RawJSON, template: str) -> RawJSON:
+        # override looks like {"$template": "<hash>", <rest>}
+        rest = TEMPLATE_PATTERN.sub("", override, count=1).rstrip()[:-1].rstrip()
+        head = template.rstrip()[:-1].rstrip()
+
+        if not rest:
+            return RawJSON(head + "}")
+
+        return RawJSON(head + ", " + rest + "}")
+
+    def expand(self, content: Content) -> Content:
+        """Merge overrides with templates from the store in-place."""
+
+        references = []
+
+        for item in entities(content):
+            hash_ = self._reference(item.meta)
+
+            if hash_ is not None:
+                references.append((item, hash_))
+
+        if not references:
+            return content
+
+        templates = self.store.get_templates(set(hash_ for _, hash_ in references))
+        decoded = {}
+
+        for item, hash_ in references:
+            if isinstance(item.meta, RawJSON):
+                item.meta = self._expand_raw(item.meta, templates[hash_])
+                continue
+
+            if hash_ not in decoded:
+                decoded[hash_] = json.loads(templates[hash_])
+
+            meta = dict(decoded[hash_])
+            meta.update(
+                (key, value) for key, value in item.meta.items() if key != TEMPLATE_KEY
+            )
+            item.meta = meta
+
+        return content
+
+
+class MetaCollector:
+    """Deletes blobs and templates no stored entity refers to.
+
+    References are marked in the metadata of all stored entities, then
+    the rest of the store is swept. Offloaded metadata may itself refer
+    to a template, so referenced blobs are read during the mark. Rows
+    saved less than `grace` seconds before the mark started are spared,
+    since writes in progress may refer to them before they commit.
+
+    A full mark is costly, so collections are due at most once in
+    `interval` seconds.
+    """
+
+    def __init__(self, store: MetaStore, grace: float, interval: float) -> None:
+        self.store = store
+        self.grace = grace
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last = None
+
+    def due(self) -> bool:
+        """Whether it is time for the next collection."""
+
+        with self._lock:
+            return self._last is None or time.monotonic() - self._last >= self.interval
+
+    def _mark(self, metas: Iterable[Tuple[str, object]]):
+        blobs, templates = set(), set()
+
+        for key, meta in metas:
+            hash_ = MetaOffloader._reference(meta)
+
+            if hash_ is not None:
+                blobs.add((key, hash_))
+                continue
+
+            hash_ = MetaTemplates._reference(meta)
+
+            if hash_ is not None:
+                templates.add(hash_)
+
+        keys = list(blobs)
+
+        for i in range(0, len(keys), self.store.batch_size):
+            batch = keys[i : i + self.store.batch_size]
+
+            for data in self.store.get_many(batch).values():
+                hash_ = MetaTemplates._reference(RawJSON(data))
+
+                if hash_ is not None:
+                    templates.add(hash_)
+
+        return blobs, templates
+
+    def collect(self, metas: Iterable[Tuple[str, object]]) -> Tuple[int, int]:
+        """Delete unreferenced blobs and templates, return their numbers.
+
+        `metas` are (entity key, metadata) pairs of all stored entities,
+        see `entity_key`.
+        """
+
+        with self._lock:
+            self._last = time.monotonic()
+
+        before = time.time() - self.grace
+        blobs, templates = self._mark(metas)
+
+        return (
+            self.store.delete_blobs(blobs, before=before),
+            self.store.delete_templates(templates, before=before),
+        )
@@ -0,0 +1,32 @@
+"""
+Process-wide counters for monitoring.
+"""
+
+import threading
+from collections import Counter
+from typing import Dict
+
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def increment(name: str, value: int = 1):
+    """Add a value to a named counter."""
+
+    with _lock:
+        _counters[name] += value
+
+
+def snapshot() -> Dict[str, int]:
+    """Return current values of all counters."""
+
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    """Set all counters to zero."""
+
+    with _lock:
+        _counters.clear()
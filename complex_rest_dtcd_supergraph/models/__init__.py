@@ -2,6 +2,7 @@ from .nodes import (
     Container,
     Fragment,
     Group,
+    PendingDeletion,
     Port,
     Root,
     Vertex,
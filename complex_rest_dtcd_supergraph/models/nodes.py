@@ -8,7 +8,6 @@ from typing import List, Tuple
 
 from neomodel import (
     db,
-    JSONProperty,
     Relationship,
     RelationshipTo,
     StringProperty,
@@ -17,7 +16,10 @@ from neomodel import (
 )
 from neomodel.contrib import SemiStructuredNode
 
+from .properties import MetaProperty
 from .relations import EdgeRel, RELATION_TYPES
+from .. import queries, settings
+from ..utils import call, delete_in_batches
 
 
 # type aliases
@@ -37,7 +39,7 @@ class AbstractPrimitive(SemiStructuredNode):
     __abstract_node__ = True
 
     uid = CustomUniqueIdProperty(unique_index=True, required=True)
-    meta_ = JSONProperty()
+    meta_ = MetaProperty()
 
 
 class Port(AbstractPrimitive):
@@ -72,8 +74,7 @@ class Vertex(AbstractPrimitive):
     def clear(self):
         """Delete all connected ports."""
 
-        for port in self.ports.all():
-            port.delete()
+        db.cypher_query(queries.DELETE_VERTEX_PORTS, {"uid": self.uid})
 
 
 class Group(AbstractPrimitive):
@@ -90,44 +91,45 @@ class Container(StructuredNode):
     """
 
     uid = UniqueIdProperty()
-    name = StringProperty(max_length=255, required=True)  # TODO settings
+    # indexed for sorted listings
+    name = StringProperty(max_length=255, required=True, index=True)  # TODO settings
 
     vertices = RelationshipTo(Vertex, RELATION_TYPES.contains)
     groups = RelationshipTo(Group, RELATION_TYPES.contains)
 
-    def delete(self, cascade=True):
+    def delete(self, cascade=True, run=call):
         """Delete this container.
 
         If cascade is enabled, delete all related vertices and groups in
-        a cascading fashion.
+        a cascading fashion, see `clear`.
         """
 
         if cascade:
-            self.clear()
+            self.clear(run=run)
 
         return super().delete()
 
-    def clear(self):
-        """Delete all related vertices and groups in a cascading fashion."""
+    def clear(self, run=call):
+        """Delete all related vertices and groups in a cascading fashion.
 
-        for vertex in self.vertices.all():
-            vertex.delete(cascade=True)
+        Nodes are deleted in batches of `DELETION_BATCH_SIZE`, each run
+        through `run`. By default all batches run in the current
+        transaction; pass e.g. `lambda func: atomic(func)()` to give
+        each batch a transaction of its own.
+        """
 
-        for group in self.groups.all():
-            group.delete()
+        for query in (queries.CLEAR_VERTICES, queries.CLEAR_GROUPS):
+            delete_in_batches(
+                query, {"uid": self.uid}, settings.DELETION_BATCH_SIZE, run
+            )
 
     @property
     def edges(self) -> List[Tuple[Port, EdgeRel, Port]]:
         """Return a list of tuples (start, edge, end) inside this container."""
 
-        q = (
-            f"MATCH (this) WHERE id(this)={self.id} "
-            "MATCH (this) -- (:Vertex) "
-            f"  -- (src:Port) -[r:{RELATION_TYPES.edge}]-> (dst:Port) "
-            "MATCH (dst)  -- (:Vertex) -- (this) "
-            "RETURN src, r, dst"
+        results, _ = db.cypher_query(
+            queries.CONTAINER_EDGES, {"uid": self.uid}, resolve_objects=True
         )
-        results, _ = db.cypher_query(q, resolve_objects=True)
 
         return [(r[0], r[1], r[2]) for r in results]
 
@@ -148,7 +150,58 @@ class Root(Container):
 
     fragments = RelationshipTo(Fragment, RELATION_TYPES.contains)
 
-    def delete(self, cascade=True):
+    # sort orders of listings: (name of the statement in `queries`, key of
+    # the cursor); names are resolved on use, `queries` imports this module
+    SORTS = {
+        "name": ("LIST_ROOTS_BY_NAME", "name"),
+        "-name": ("LIST_ROOTS_BY_NAME_DESC", "name"),
+        "id": ("LIST_ROOTS_BY_ID", "uid"),
+        "-id": ("LIST_ROOTS_BY_ID_DESC", "uid"),
+    }
+
+    @classmethod
+    def page(
+        cls,
+        sort: str = "name",
+        after: list = None,
+        limit: int = 100,
+        counts: bool = False,
+    ) -> List[dict]:
+        """Return a page of roots with their fragments in one query.
+
+        Roots come in a given `sort` order after the `after` cursor,
+        see `cursor`. With `counts`, roots and fragments include the
+        numbers of their vertices and groups.
+        """
+
+        name, _ = cls.SORTS[sort]
+        rows, _ = db.cypher_query(
+            getattr(queries, name), {"after": after, "limit": limit, "counts": counts}
+        )
+        roots = []
+
+        for uid, name, fragments, vertices, groups in rows:
+            root = {"uid": uid, "name": name, "fragments": fragments}
+
+            if counts:
+                root.update(vertices=vertices, groups=groups)
+            else:
+                for fragment in fragments:
+                    del fragment["vertices"], fragment["groups"]
+
+            roots.append(root)
+
+        return roots
+
+    @classmethod
+    def cursor(cls, sort: str, root: dict) -> list:
+        """Return the cursor of the page after a given root."""
+
+        _, key = cls.SORTS[sort]
+
+        return [root[key], root["uid"]]
+
+    def delete(self, cascade=True, run=call):
         """Delete this root.
 
         Deletes all related fragments, vertices and groups in a cascading
@@ -156,21 +209,33 @@ class Root(Container):
         """
 
         if cascade:
-            self.clear()
+            self.clear(run=run)
 
         return super().delete(cascade=False)
 
-    def clear(self, content_only=False):
+    def clear(self, content_only=False, run=call):
         """Delete all related fragments, vertices and groups in a cascading fashion.
 
         If `content_only` is True, then only delete the content:
-        vertices and groups.
+        vertices and groups. Batches of nodes are run through `run`, see
+        `Container.clear`.
         """
 
-        super().clear()
-
-        if content_only:
-            return
+        super().clear(run=run)
 
         for fragment in self.fragments.all():
-            fragment.delete(cascade=False)  # already cleared related content
+            if content_only:
+                fragment.clear(run=run)
+            else:
+                fragment.delete(run=run)
+
+
+class PendingDeletion(StructuredNode):
+    """A deleted container whose content is yet to be deleted.
+
+    A root or a fragment becomes one at once on deletion, which hides it
+    from reads; its content is then deleted in background.
+    """
+
+    uid = UniqueIdProperty()
+    name = StringProperty()
@@ -0,0 +1,20 @@
+"""
+Custom properties for neomodel.
+"""
+
+from neomodel import JSONProperty
+
+from ..structures import RawJSON
+
+
+class MetaProperty(JSONProperty):
+    """Stores metadata as JSON.
+
+    Pre-encoded JSON text (`RawJSON`) is stored as is.
+    """
+
+    def deflate(self, value):
+        if isinstance(value, RawJSON):
+            return str(value)
+
+        return super().deflate(value)
@@ -4,7 +4,9 @@ Relationship classes for neomodel.
 
 from types import SimpleNamespace
 
-from neomodel import JSONProperty, StructuredRel
+from neomodel import StructuredRel
+
+from .properties import MetaProperty
 
 
 # settings
@@ -18,4 +20,4 @@ class EdgeRel(StructuredRel):
     """An edge between the ports of vertices."""
 
     # TODO this must be semi-structured too
-    meta_ = JSONProperty()
+    meta_ = MetaProperty()
@@ -0,0 +1,394 @@
+"""
+Cypher statements issued by the plugin.
+
+All statements here are constant strings: values are passed as
+parameters, so Neo4j can re-use cached query plans. Patterns are
+directed and labelled, and lookups are anchored on unique `uid`
+indexes of containers and primitives.
+"""
+
+from .models.relations import RELATION_TYPES
+
+
+CONTAINS = RELATION_TYPES.contains
+CONN = RELATION_TYPES.default
+EDGE = RELATION_TYPES.edge
+
+
+# content of a container: vertices and groups it contains directly, and
+# for a root also the ones its fragments contain; membership of fragment
+# content in the root is derived at read time, so writes to a fragment
+# never touch the root node
+MEMBER = f"-[:{CONTAINS}*1..2]->"
+
+
+# read
+# raw records: properties maps include uid and meta_ as stored
+READ_VERTICES = (
+    f"MATCH (:Container {{uid: $uid}}) {MEMBER} (v:Vertex) "
+    "WITH DISTINCT v "
+    f"OPTIONAL MATCH (v) -[:{CONN}]-> (p:Port) "
+    "RETURN properties(v), collect(properties(p))"
+)
+READ_EDGES = (
+    f"MATCH (c:Container {{uid: $uid}}) {MEMBER} (v:Vertex) "
+    "WITH DISTINCT c, v "
+    f"MATCH (v) -[:{CONN}]-> (src:Port) -[r:{EDGE}]-> (dst:Port) "
+    f"  <-[:{CONN}]- (w:Vertex) "
+    f"WHERE (c) {MEMBER} (w) "
+    "RETURN src.uid, dst.uid, r.meta_"
+)
+READ_GROUPS = (
+    f"MATCH (:Container {{uid: $uid}}) {MEMBER} (g:Group) "
+    "WITH DISTINCT g "
+    "RETURN properties(g)"
+)
+CONTAINER_EDGES = (
+    f"MATCH (c:Container {{uid: $uid}}) {MEMBER} (v:Vertex) "
+    "WITH DISTINCT c, v "
+    f"MATCH (v) -[:{CONN}]-> (src:Port) -[r:{EDGE}]-> (dst:Port) "
+    f"  <-[:{CONN}]- (w:Vertex) "
+    f"WHERE (c) {MEMBER} (w) "
+    "RETURN src, r, dst"
+)
+
+# edges are matched by uids of their ports, which lets Neo4j use Port.uid
+# index; start port must belong to a vertex of the container
+DELETE_EDGES = (
+    "UNWIND $pairs AS pair "
+    f"MATCH (src:Port {{uid: pair[0]}}) -[r:{EDGE}]-> (:Port {{uid: pair[1]}}) "
+    f"MATCH (:Container {{uid: $uid}}) {MEMBER} (:Vertex) -[:{CONN}]-> (src) "
+    "WITH DISTINCT r "
+    "DELETE r"
+)
+
+# nodes are deleted in batches of `$limit`, each statement returns the
+# number of deleted nodes; deleted vertices take their ports with them
+DELETE_DEPRECATED_VERTICES = (
+    f"MATCH (:Container {{uid: $uid}}) {MEMBER} (v:Vertex) "
+    "WHERE NOT v.uid IN $uids "
+    "WITH DISTINCT v LIMIT $limit "
+    f"OPTIONAL MATCH (v) -[:{CONN}]-> (p:Port) "
+    "DETACH DELETE v, p "
+    "RETURN count(DISTINCT v)"
+)
+DELETE_DEPRECATED_PORTS = (
+    f"MATCH (:Container {{uid: $uid}}) {MEMBER} (:Vertex) "
+    f"  -[:{CONN}]-> (p:Port) "
+    "WHERE NOT p.uid IN $uids "
+    "WITH DISTINCT p LIMIT $limit "
+    "DETACH DELETE p "
+    "RETURN count(p)"
+)
+DELETE_DEPRECATED_GROUPS = (
+    f"MATCH (:Container {{uid: $uid}}) {MEMBER} (g:Group) "
+    "WHERE NOT g.uid IN $uids "
+    "WITH DISTINCT g LIMIT $limit "
+    "DETACH DELETE g "
+    "RETURN count(g)"
+)
+CLEAR_VERTICES = (
+    f"MATCH (:Container {{uid: $uid}}) {MEMBER} (v:Vertex) "
+    "WITH DISTINCT v LIMIT $limit "
+    f"OPTIONAL MATCH (v) -[:{CONN}]-> (p:Port) "
+    "DETACH DELETE v, p "
+    "RETURN count(DISTINCT v)"
+)
+CLEAR_GROUPS = (
+    f"MATCH (:Container {{uid: $uid}}) {MEMBER} (g:Group) "
+    "WITH DISTINCT g LIMIT $limit "
+    "DETACH DELETE g "
+    "RETURN count(g)"
+)
+
+# container membership; a root does not take entities its fragments
+# already hold, e.g. when a client writes back the root content it read
+CONNECT_VERTICES = (
+    "MATCH (c:Container {uid: $uid}) "
+    "UNWIND $uids AS uid "
+    "MATCH (v:Vertex {uid: uid}) "
+    f"WHERE NOT (c) -[:{CONTAINS}]-> (:Container) -[:{CONTAINS}]-> (v) "
+    f"MERGE (c) -[:{CONTAINS}]-> (v)"
+)
+CONNECT_GROUPS = (
+    "MATCH (c:Container {uid: $uid}) "
+    "UNWIND $uids AS uid "
+    "MATCH (g:Group {uid: uid}) "
+    f"WHERE NOT (c) -[:{CONTAINS}]-> (:Container) -[:{CONTAINS}]-> (g) "
+    f"MERGE (c) -[:{CONTAINS}]-> (g)"
+)
+# migration: earlier versions also connected fragment content to the
+# root; such relationships keep entities in the root after they leave
+# the fragment, they are removed in batches of `$limit`
+UNLINK_FRAGMENT_CONTENT = (
+    f"MATCH (r:Container {{uid: $uid}}) -[c:{CONTAINS}]-> (n) "
+    f"WHERE (n:Vertex OR n:Group) AND (r) -[:{CONTAINS}]-> (:Container) "
+    f"  -[:{CONTAINS}]-> (n) "
+    "WITH c LIMIT $limit "
+    "DELETE c "
+    "RETURN count(c)"
+)
+
+
+# bulk import: rows of a batch are merged with one statement per kind
+# of entity; properties replace the stored ones
+BULK_MERGE_PORTS = (
+    "UNWIND $rows AS row MERGE (p:Port {uid: row.uid}) SET p = row.properties"
+)
+BULK_MERGE_VERTICES = (
+    "MATCH (c:Container {uid: $uid}) "
+    "UNWIND $rows AS row "
+    "MERGE (v:Vertex {uid: row.uid}) "
+    "SET v = row.properties "
+    f"MERGE (c) -[:{CONTAINS}]-> (v) "
+    "WITH v, row "
+    "UNWIND row.ports AS port "
+    "MATCH (p:Port {uid: port}) "
+    f"MERGE (v) -[:{CONN}]-> (p)"
+)
+BULK_MERGE_EDGES = (
+    "UNWIND $rows AS row "
+    "MATCH (src:Port {uid: row.start}) "
+    "MATCH (dst:Port {uid: row.end}) "
+    f"MERGE (src) -[r:{EDGE}]-> (dst) "
+    "SET r.meta_ = row.meta"
+)
+BULK_MERGE_GROUPS = (
+    "MATCH (c:Container {uid: $uid}) "
+    "UNWIND $rows AS row "
+    "MERGE (g:Group {uid: row.uid}) "
+    "SET g = row.properties "
+    f"MERGE (c) -[:{CONTAINS}]-> (g)"
+)
+
+
+# fingerprints of the content; they are kept in properties of container
+# nodes that models do not declare, so that saving a model does not
+# overwrite them; a root also keeps a snapshot of fingerprints of its
+# fragments, since its content includes theirs
+READ_FINGERPRINT = (
+    "MATCH (c:Container {uid: $uid}) "
+    f"OPTIONAL MATCH (c) -[:{CONTAINS}]-> (f:Container) "
+    "WITH c, f ORDER BY f.uid "
+    "RETURN c.content_hash, c.fragment_hashes, "
+    "  [f IN collect(f) | f.content_hash]"
+)
+WRITE_FINGERPRINT = (
+    "MATCH (c:Container {uid: $uid}) "
+    "SET c.content_hash = $hash, c.fragment_hashes = $fragments"
+)
+
+# a write to a container also changes the content of other containers
+# that share its entities; their fingerprints are replaced with random
+# ones, except for the parents, which compare fragment fingerprints
+INVALIDATE_SHARED = (
+    f"MATCH (c:Container {{uid: $uid}}) {MEMBER} (n) "
+    "WHERE n:Vertex OR n:Group "
+    "WITH DISTINCT c, n "
+    f"MATCH (other:Container) -[:{CONTAINS}]-> (n) "
+    f"WHERE other <> c AND NOT (other) -[:{CONTAINS}]-> (c) "
+    "WITH DISTINCT other "
+    "SET other.content_hash = randomUUID()"
+)
+
+
+# chunked replace: containers whose content the write may change are
+# flagged with a staging token, reads of them are served from snapshots
+# until the flags are lifted
+PARENT_CONTAINERS = (
+    f"MATCH (p:Container) -[:{CONTAINS}]-> (:Container {{uid: $uid}}) RETURN p.uid"
+)
+SHARING_CONTAINERS = (
+    f"MATCH (c:Container {{uid: $uid}}) {MEMBER} (n) "
+    "WHERE n:Vertex OR n:Group "
+    "WITH DISTINCT c, n "
+    f"MATCH (other:Container) -[:{CONTAINS}]-> (n) "
+    "WHERE other <> c "
+    "RETURN DISTINCT other.uid"
+)
+READ_STAGING = "MATCH (c:Container {uid: $uid}) RETURN c.staging"
+FLAG_STAGING = (
+    "UNWIND $uids AS uid MATCH (c:Container {uid: uid}) SET c.staging = $token"
+)
+LIFT_STAGING = (
+    "UNWIND $uids AS uid "
+    "MATCH (c:Container {uid: uid}) "
+    "WHERE c.staging = $token "
+    "REMOVE c.staging"
+)
+
+
+# cascade deletion: a container is hidden at once by swapping its labels
+# (and those of its fragments) for `PendingDeletion` and detaching it
+# from its parent; then its content is deleted in batches, except for
+# entities other containers still hold
+DELETE_VERTEX_PORTS = (
+    f"MATCH (:Vertex {{uid: $uid}}) -[:{CONN}]-> (p:Port) DETACH DELETE p"
+)
+HIDE_CONTAINER = (
+    "MATCH (c:Container {uid: $uid}) "
+    f"OPTIONAL MATCH (c) -[:{CONTAINS}]-> (f:Container) "
+    "WITH c, collect(f) AS fragments "
+    f"OPTIONAL MATCH (:Container) -[r:{CONTAINS}]-> (c) "
+    "DELETE r "
+    "WITH DISTINCT c, fragments "
+    "UNWIND [c] + fragments AS d "
+    "REMOVE d:Container:Root:Fragment "
+    "SET d:PendingDeletion "
+    "RETURN count(d)"
+)
+DELETE_PENDING_VERTICES = (
+    f"MATCH (:PendingDeletion {{uid: $uid}}) {MEMBER} (v:Vertex) "
+    f"WHERE NOT (:Container) -[:{CONTAINS}]-> (v) "
+    "WITH DISTINCT v LIMIT $limit "
+    f"OPTIONAL MATCH (v) -[:{CONN}]-> (p:Port) "
+    "DETACH DELETE v, p "
+    "RETURN count(DISTINCT v)"
+)
+DELETE_PENDING_GROUPS = (
+    f"MATCH (:PendingDeletion {{uid: $uid}}) {MEMBER} (g:Group) "
+    f"WHERE NOT (:Container) -[:{CONTAINS}]-> (g) "
+    "WITH DISTINCT g LIMIT $limit "
+    "DETACH DELETE g "
+    "RETURN count(g)"
+)
+DELETE_PENDING = (
+    "MATCH (d:PendingDeletion {uid: $uid}) "
+    f"OPTIONAL MATCH (d) -[:{CONTAINS}]-> (f:PendingDeletion) "
+    "DETACH DELETE d, f "
+    "RETURN count(DISTINCT d) + count(DISTINCT f)"
+)
+# sweep: once no containers are left, e.g. after a reset, entities no
+# container holds are deleted too, such as leftovers of failed writes;
+# these statements scan a label by design
+SWEEP_VERTICES = (
+    "MATCH (v:Vertex) "
+    f"WHERE NOT (:Container) -[:{CONTAINS}]-> (v) "
+    f"  AND NOT (:PendingDeletion) -[:{CONTAINS}]-> (v) "
+    "WITH v LIMIT $limit "
+    f"OPTIONAL MATCH (v) -[:{CONN}]-> (p:Port) "
+    "DETACH DELETE v, p "
+    "RETURN count(DISTINCT v)"
+)
+SWEEP_GROUPS = (
+    "MATCH (g:Group) "
+    f"WHERE NOT (:Container) -[:{CONTAINS}]-> (g) "
+    f"  AND NOT (:PendingDeletion) -[:{CONTAINS}]-> (g) "
+    "WITH g LIMIT $limit "
+    "DETACH DELETE g "
+    "RETURN count(g)"
+)
+SWEEP_PORTS = (
+    "MATCH (p:Port) "
+    f"WHERE NOT (:Vertex) -[:{CONN}]-> (p) "
+    "WITH p LIMIT $limit "
+    "DETACH DELETE p "
+    "RETURN count(p)"
+)
+
+
+# scans of all metadata with references to the side store, streamed from
+# a server-side cursor by the collection of unreferenced metadata
+SCAN_META = (
+    "MATCH (v:Vertex) WHERE v.meta_ STARTS WITH $prefix "
+    "RETURN v.uid AS key, v.meta_ AS meta "
+    "UNION ALL "
+    "MATCH (p:Port) WHERE p.meta_ STARTS WITH $prefix "
+    "RETURN p.uid AS key, p.meta_ AS meta "
+    "UNION ALL "
+    "MATCH (g:Group) WHERE g.meta_ STARTS WITH $prefix "
+    "RETURN g.uid AS key, g.meta_ AS meta"
+)
+SCAN_EDGE_META = (
+    f"MATCH (src:Port) -[r:{EDGE}]-> (dst:Port) "
+    "WHERE r.meta_ STARTS WITH $prefix "
+    "RETURN src.uid, dst.uid, r.meta_"
+)
+
+# listing of roots: a page of roots after the `$after` cursor, a pair of
+# the sort key and uid of the last root of the previous page, with their
+# fragments and, if `$counts` is true, the numbers of vertices and
+# groups; one statement per sort order, since the order cannot be a
+# parameter
+
+
+def _list_roots(key: str, descending: bool = False) -> str:
+    order, after = ("DESC", "<") if descending else ("", ">")
+
+    return (
+        "MATCH (r:Root) "
+        f"WHERE $after IS NULL OR r.{key} {after} $after[0] "
+        f"  OR (r.{key} = $after[0] AND r.uid {after} $after[1]) "
+        f"WITH r ORDER BY r.{key} {order}, r.uid {order} LIMIT $limit "
+        f"OPTIONAL MATCH (r) -[:{CONTAINS}]-> (f:Fragment) "
+        "WITH r, f ORDER BY f.name, f.uid "
+        "WITH r, collect(f {"
+        "  .uid, .name, "
+        "  vertices: CASE WHEN $counts "
+        f"    THEN size([(f) -[:{CONTAINS}]-> (v:Vertex) | v]) END, "
+        "  groups: CASE WHEN $counts "
+        f"    THEN size([(f) -[:{CONTAINS}]-> (g:Group) | g]) END"
+        "}) AS fragments "
+        "CALL { "
+        "  WITH r "
+        "  WITH r WHERE $counts "
+        f"  MATCH (r) {MEMBER} (n) "
+        "  WHERE n:Vertex OR n:Group "
+        "  WITH DISTINCT n "
+        "  RETURN count(CASE WHEN n:Vertex THEN 1 END) AS vertices, "
+        "    count(CASE WHEN n:Group THEN 1 END) AS groups "
+        "} "
+        "RETURN r.uid, r.name, fragments, vertices, groups "
+        f"ORDER BY r.{key} {order}, r.uid {order}"
+    )
+
+
+LIST_ROOTS_BY_NAME = _list_roots("name")
+LIST_ROOTS_BY_NAME_DESC = _list_roots("name", descending=True)
+LIST_ROOTS_BY_ID = _list_roots("uid")
+LIST_ROOTS_BY_ID_DESC = _list_roots("uid", descending=True)
+
+
+# size statistics of the content, aggregated without returning entities;
+# degree of a vertex counts edges of its ports within the container, meta
+# size counts characters of stored metadata JSON
+CONTAINER_STATS = (
+    "MATCH (c:Container {uid: $uid}) "
+    "CALL { "
+    "  WITH c "
+    f"  MATCH (c) {MEMBER} (g:Group) "
+    "  WITH DISTINCT g "
+    "  RETURN count(g) AS groups, sum(size(g.meta_)) AS group_meta "
+    "} "
+    "CALL { "
+    "  WITH c "
+    f"  MATCH (c) {MEMBER} (v:Vertex) "
+    "  WITH DISTINCT c, v "
+    "  CALL { "
+    "    WITH v "
+    f"    OPTIONAL MATCH (v) -[:{CONN}]-> (p:Port) "
+    "    RETURN count(p) AS ports, sum(size(p.meta_)) AS port_meta "
+    "  } "
+    "  CALL { "
+    "    WITH c, v "
+    f"    OPTIONAL MATCH (v) -[:{CONN}]-> (:Port) -[r:{EDGE}]-> (:Port) "
+    f"      <-[:{CONN}]- (w:Vertex) "
+    f"    WHERE (c) {MEMBER} (w) "
+    "    RETURN count(r) AS outputs, sum(size(r.meta_)) AS edge_meta "
+    "  } "
+    "  CALL { "
+    "    WITH c, v "
+    f"    OPTIONAL MATCH (v) -[:{CONN}]-> (:Port) <-[r:{EDGE}]- (:Port) "
+    f"      <-[:{CONN}]- (w:Vertex) "
+    f"    WHERE (c) {MEMBER} (w) "
+    "    RETURN count(r) AS inputs "
+    "  } "
+    "  RETURN count(v) AS vertices, sum(ports) AS ports, sum(outputs) AS edges, "
+    "    min(outputs + inputs) AS min_degree, "
+    "    max(outputs + inputs) AS max_degree, "
+    "    avg(outputs + inputs) AS mean_degree, "
+    "    sum(size(v.meta_)) + sum(port_meta) + sum(edge_meta) AS vertex_meta "
+    "} "
+    "RETURN vertices, ports, edges, groups, min_degree, max_degree, "
+    "  mean_degree, vertex_meta + group_meta"
+)
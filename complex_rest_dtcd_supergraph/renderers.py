@@ -0,0 +1,44 @@
+"""
+Custom DRF renderers.
+"""
+
+import re
+
+from rest_framework.renderers import JSONRenderer
+
+from .structures import RawJSON
+
+
+class PassThroughJSONRenderer(JSONRenderer):
+    """Renders data to JSON, splicing pre-encoded `RawJSON` values into
+    the output as is.
+
+    Pre-encoded values are replaced with placeholders before rendering
+    and substituted back in a single pass afterwards.
+    """
+
+    placeholder = "\x00raw\x00{}"
+    pattern = re.compile(rb'"\\u0000raw\\u0000(\d+)"')
+
+    def _substitute(self, data, fragments: list):
+        if isinstance(data, RawJSON):
+            fragments.append(data.encode())
+            return self.placeholder.format(len(fragments) - 1)
+
+        if isinstance(data, dict):
+            return {key: self._substitute(val, fragments) for key, val in data.items()}
+
+        if isinstance(data, (list, tuple)):
+            return [self._substitute(item, fragments) for item in data]
+
+        return data
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        fragments = []
+        data = self._substitute(data, fragments)
+        rendered = super().render(data, accepted_media_type, renderer_context)
+
+        if not fragments:
+            return rendered
+
+        return self.pattern.sub(lambda m: fragments[int(m.group(1))], rendered)
@@ -48,6 +48,21 @@ class RootSerializer(ContainerSerializer):
     fragments = FragmentSerializer(read_only=True, source="fragments.all", many=True)
 
 
+class FragmentSummarySerializer(serializers.Serializer):
+    """Represents fragments of root listings, see `Root.page`."""
+
+    id = CustomUUIDFIeld(read_only=True, source="uid")
+    name = serializers.CharField(read_only=True)
+    vertices = serializers.IntegerField(read_only=True)  # only with counts
+    groups = serializers.IntegerField(read_only=True)
+
+
+class RootSummarySerializer(FragmentSummarySerializer):
+    """Represents roots of root listings, see `Root.page`."""
+
+    fragments = FragmentSummarySerializer(read_only=True, many=True)
+
+
 class ContentSerializer(serializers.Serializer):
     default_error_messages = {
         "does_not_exist": _("An entity with id [{value}] does not exist."),
@@ -154,3 +169,21 @@ class ContentSerializer(serializers.Serializer):
 
 class GraphSerializer(serializers.Serializer):
     graph = ContentSerializer()
+
+
+class JobSerializer(serializers.Serializer):
+    operation = serializers.ChoiceField(
+        choices=["clear", "delete"],
+        error_messages={
+            "invalid_choice": (
+                'Unsupported operation "{input}", only "clear" and "delete" '
+                "can be submitted."
+            )
+        },
+    )
+    container = serializers.UUIDField()
+
+
+class UploadSerializer(serializers.Serializer):
+    format = serializers.ChoiceField(choices=["json", "ndjson"], default="json")
+    chunks = serializers.IntegerField(min_value=1)
@@ -21,6 +21,57 @@ default_ini_config = {
         "user": "neo4j",
         "password": "password",
     },
+    "storage": {
+        "backend": "neo4j",
+        "deprecation": "cypher",
+        "deletion_batch_size": 1000,
+    },
+    "chunks": {
+        "threshold": 0,
+        "size": 1000,
+        "min_size": 100,
+        "max_size": 50000,
+        "target_latency": 1.0,
+        "store": "staging.sqlite3",
+    },
+    "meta": {
+        "passthrough": False,
+        "offload_threshold": 0,
+        "store": "meta.sqlite3",
+        "template_keys": "",
+        "gc_interval": 60 * 60,
+        "gc_grace": 60 * 60,
+    },
+    "history": {
+        "enabled": False,
+        "checkpoint_interval": 20,
+        "store": "history.sqlite3",
+    },
+    "changes": {
+        "enabled": False,
+        "tombstone_ttl": 7 * 24 * 60 * 60,
+        "store": "changes.sqlite3",
+    },
+    "events": {
+        "enabled": False,
+        "keepalive": 15,
+    },
+    "jobs": {
+        "async_writes": False,
+        "history_size": 1000,
+        "workers": 1,
+        "store": "jobs.sqlite3",
+    },
+    "uploads": {
+        "path": "uploads",
+        "ttl": 24 * 60 * 60,
+        "max_chunk_size": 64 * 1024 * 1024,
+    },
+    "transactions": {
+        "retries": 5,
+        "backoff_base": 0.05,
+        "backoff_max": 2.0,
+    },
 }
 
 # main config
@@ -28,6 +79,13 @@ config_parser = configparser.ConfigParser(allow_no_value=True)
 config_parser.read(PROJECT_DIR / "supergraph.conf")
 ini_config = merge_ini_config_with_defaults(config_parser, default_ini_config)
 
+
+def to_bool(value) -> bool:
+    """Convert a boolean value from INI config to `bool`."""
+
+    return str(value).lower() in ("1", "yes", "true", "on")
+
+
 KEYS = SimpleNamespace()
 KEYS.edges = "edges"
 KEYS.groups = "groups"
@@ -51,6 +109,78 @@ user = ini_config["neo4j"]["user"]
 password = ini_config["neo4j"]["password"]
 neomodel.config.DATABASE_URL = f"{protocol}://{user}:{password}@{address}:{port}"
 
+# storage backend for the content of containers: neo4j or memory
+STORAGE_BACKEND = ini_config["storage"]["backend"]
+# how to delete deprecated content on replace: cypher or python
+DEPRECATION_MODE = ini_config["storage"]["deprecation"]
+DELETION_BATCH_SIZE = int(ini_config["storage"]["deletion_batch_size"])
+
+# graph writes with at least this many objects (nodes, edges and groups)
+# are written in chunks, each in its own transaction; 0 disables chunks
+CHUNK_THRESHOLD = int(ini_config["chunks"]["threshold"])
+# initial number of entities per chunk, adapted to keep the latency of
+# a chunk near the target (in seconds)
+CHUNK_SIZE = int(ini_config["chunks"]["size"])
+CHUNK_MIN_SIZE = int(ini_config["chunks"]["min_size"])
+CHUNK_MAX_SIZE = int(ini_config["chunks"]["max_size"])
+CHUNK_TARGET_LATENCY = float(ini_config["chunks"]["target_latency"])
+CHUNK_STORE_PATH = PROJECT_DIR / ini_config["chunks"]["store"]
+
+# keep metadata as pre-encoded JSON from the database to HTTP response
+META_PASSTHROUGH = to_bool(ini_config["meta"]["passthrough"])
+# metadata larger than this (in characters of JSON) goes to a side store;
+# 0 disables offloading
+META_OFFLOAD_THRESHOLD = int(ini_config["meta"]["offload_threshold"])
+META_STORE_PATH = PROJECT_DIR / ini_config["meta"]["store"]
+# top-level metadata keys shared between entities as templates;
+# empty disables templates
+META_TEMPLATE_KEYS = tuple(
+    key.strip() for key in ini_config["meta"]["template_keys"].split(",") if key.strip()
+)
+
+# seconds between collections of blobs and templates nothing refers to;
+# rows saved within the grace period before a collection are kept
+META_GC_INTERVAL = float(ini_config["meta"]["gc_interval"])
+META_GC_GRACE = float(ini_config["meta"]["gc_grace"])
+
+# versioned snapshots of container content
+HISTORY_ENABLED = to_bool(ini_config["history"]["enabled"])
+# a full checkpoint every N versions, deltas in between
+HISTORY_CHECKPOINT_INTERVAL = int(ini_config["history"]["checkpoint_interval"])
+HISTORY_STORE_PATH = PROJECT_DIR / ini_config["history"]["store"]
+
+# change feed of container content
+CHANGES_ENABLED = to_bool(ini_config["changes"]["enabled"])
+# seconds to keep records of removed entities
+CHANGES_TOMBSTONE_TTL = float(ini_config["changes"]["tombstone_ttl"])
+CHANGES_STORE_PATH = PROJECT_DIR / ini_config["changes"]["store"]
+
+# push notifications of committed writes over Server-Sent Events
+EVENTS_ENABLED = to_bool(ini_config["events"]["enabled"])
+# seconds between keep-alive comments in idle streams
+EVENTS_KEEPALIVE = float(ini_config["events"]["keepalive"])
+
+# apply graph writes in a background worker, answer 202 with a job
+ASYNC_WRITES = to_bool(ini_config["jobs"]["async_writes"])
+# number of recent jobs kept for status requests
+JOBS_HISTORY_SIZE = int(ini_config["jobs"]["history_size"])
+# number of worker threads; jobs of the same container never run at once
+JOBS_WORKERS = int(ini_config["jobs"]["workers"])
+JOBS_STORE_PATH = PROJECT_DIR / ini_config["jobs"]["store"]
+
+# resumable uploads of graph content in numbered chunks, kept on disk
+UPLOADS_PATH = PROJECT_DIR / ini_config["uploads"]["path"]
+# seconds before an upload that is not committed is removed
+UPLOADS_TTL = float(ini_config["uploads"]["ttl"])
+# largest accepted chunk in bytes
+UPLOADS_MAX_CHUNK_SIZE = int(ini_config["uploads"]["max_chunk_size"])
+
+# retries of transactions on transient Neo4j errors (deadlocks, lock
+# timeouts); delays grow exponentially from base up to max seconds
+TRANSACTION_RETRIES = int(ini_config["transactions"]["retries"])
+TRANSACTION_BACKOFF_BASE = float(ini_config["transactions"]["backoff_base"])
+TRANSACTION_BACKOFF_MAX = float(ini_config["transactions"]["backoff_max"])
+
 # DB schema
 filename = "default_root_uid.txt"
 path = PROJECT_DIR / filename
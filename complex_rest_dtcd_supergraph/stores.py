@@ -0,0 +1,628 @@
+"""
+Local side stores backed by SQLite.
+
+These keep auxiliary data next to the plugin and do not require any
+external services.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class SQLiteStore:
+    """A store in a local SQLite database file.
+
+    Each thread gets its own connection. Subclasses define tables in
+    `schema`.
+    """
+
+    schema = ""
+
+    def __init__(self, path) -> None:
+        self.path = str(path)
+        self._local = threading.local()
+        self.connection().executescript(self.schema)
+
+    def connection(self) -> sqlite3.Connection:
+        """Return a connection for the current thread."""
+
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+
+        return connection
+
+    @contextmanager
+    def immediate(self) -> Iterator[sqlite3.Connection]:
+        """Run the block in a transaction that takes the write lock at
+        once, so that concurrent read-modify-write blocks take turns."""
+
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            yield connection
+        except BaseException:
+            connection.rollback()
+            raise
+
+        connection.commit()
+
+
+class MetaStore(SQLiteStore):
+    """Stores metadata blobs keyed by entity uid and content hash, and
+    shared metadata templates keyed by content hash.
+
+    Rows remember when they were last saved, so that a collection of
+    unreferenced rows spares the ones writes in progress refer to, see
+    `meta.MetaCollector`.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS blobs (
+            uid TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            data TEXT NOT NULL,
+            touched REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (uid, hash)
+        );
+        CREATE TABLE IF NOT EXISTS templates (
+            hash TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            touched REAL NOT NULL DEFAULT 0
+        );
+    """
+    batch_size = 500  # keys per SELECT, below SQLite variables limit
+
+    def __init__(self, path) -> None:
+        super().__init__(path)
+
+        # stores made by earlier versions have no timestamps, their rows
+        # count as saved long ago
+        for table in ("blobs", "templates"):
+            if "touched" in self._columns(table):
+                continue
+
+            with self.immediate() as connection:
+                # another process may have added it meanwhile
+                if "touched" not in self._columns(table):
+                    connection.execute(
+                        f"ALTER TABLE {table} "
+                        "ADD COLUMN touched REAL NOT NULL DEFAULT 0"
+                    )
+
+    def _columns(self, table: str) -> List[str]:
+        rows = self.connection().execute(f"PRAGMA table_info({table})")
+
+        return [row[1] for row in rows]
+
+    def put_many(self, items: Iterable[Tuple[str, str, str]]):
+        """Save (uid, hash, data) items."""
+
+        now = time.time()
+
+        with self.connection() as connection:
+            connection.executemany(
+                "INSERT INTO blobs (uid, hash, data, touched) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (uid, hash) DO UPDATE SET touched = excluded.touched",
+                ((uid, hash_, data, now) for uid, hash_, data in items),
+            )
+
+    def get_many(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """Return a mapping of (uid, hash) keys to data."""
+
+        keys = list(keys)
+        result = {}
+
+        for i in range(0, len(keys), self.batch_size):
+            batch = keys[i : i + self.batch_size]
+            placeholders = ",".join("(?, ?)" for _ in batch)
+            params = [value for key in batch for value in key]
+            rows = self.connection().execute(
+                f"SELECT uid, hash, data FROM blobs WHERE (uid, hash) IN (VALUES {placeholders})",
+                params,
+            )
+            result.update(((uid, hash_), data) for uid, hash_, data in rows)
+
+        return result
+
+    def delete_blobs(self, keep: Iterable[Tuple[str, str]], before: float) -> int:
+        """Delete blobs saved before a given time, except (uid, hash)
+        keys to `keep`, return their number."""
+
+        with self.immediate() as connection:
+            connection.execute(
+                "CREATE TEMP TABLE kept_blobs "
+                "(uid TEXT, hash TEXT, PRIMARY KEY (uid, hash))"
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO kept_blobs VALUES (?, ?)", keep
+            )
+            cursor = connection.execute(
+                "DELETE FROM blobs WHERE touched < ? AND NOT EXISTS ("
+                "SELECT 1 FROM kept_blobs k "
+                "WHERE k.uid = blobs.uid AND k.hash = blobs.hash)",
+                (before,),
+            )
+            connection.execute("DROP TABLE kept_blobs")
+
+        return cursor.rowcount
+
+    def put_templates(self, items: Iterable[Tuple[str, str]]):
+        """Save (hash, data) templates."""
+
+        now = time.time()
+
+        with self.connection() as connection:
+            connection.executemany(
+                "INSERT INTO templates (hash, data, touched) VALUES (?, ?, ?) "
+                "ON CONFLICT (hash) DO UPDATE SET touched = excluded.touched",
+                ((hash_, data, now) for hash_, data in items),
+            )
+
+    def get_templates(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Return a mapping of hashes to template data."""
+
+        hashes = list(hashes)
+        result = {}
+
+        for i in range(0, len(hashes), self.batch_size):
+            batch = hashes[i : i + self.batch_size]
+            placeholders = ",".join("?" for _ in batch)
+            rows = self.connection().execute(
+                f"SELECT hash, data FROM templates WHERE hash IN ({placeholders})",
+                batch,
+            )
+            result.update(rows)
+
+        return result
+
+    def delete_templates(self, keep: Iterable[str], before: float) -> int:
+        """Delete templates saved before a given time, except hashes to
+        `keep`, return their number."""
+
+        with self.immediate() as connection:
+            connection.execute(
+                "CREATE TEMP TABLE kept_templates (hash TEXT PRIMARY KEY)"
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO kept_templates VALUES (?)",
+                ((hash_,) for hash_ in keep),
+            )
+            cursor = connection.execute(
+                "DELETE FROM templates WHERE touched < ? "
+                "AND hash NOT IN (SELECT hash FROM kept_templates)",
+                (before,),
+            )
+            connection.execute("DROP TABLE kept_templates")
+
+        return cursor.rowcount
+
+
+class HistoryStore(SQLiteStore):
+    """Stores versions of container content as entity records.
+
+    A version is either a checkpoint with all records, or a delta with
+    changed records only; `NULL` data marks a removed entity.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS versions (
+            container TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            created REAL NOT NULL,
+            checkpoint INTEGER NOT NULL,
+            changes INTEGER NOT NULL,
+            PRIMARY KEY (container, version)
+        );
+        CREATE TABLE IF NOT EXISTS records (
+            container TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            data TEXT,
+            PRIMARY KEY (container, version, key)
+        );
+    """
+
+    def last_version(self, container: str) -> Optional[int]:
+        """Return the number of the last version of a container, if any."""
+
+        row = (
+            self.connection()
+            .execute(
+                "SELECT MAX(version) FROM versions WHERE container = ?", (container,)
+            )
+            .fetchone()
+        )
+
+        return row[0]
+
+    def last_checkpoint(self, container: str, version: int) -> Optional[int]:
+        """Return the number of the last checkpoint up to a given version."""
+
+        row = (
+            self.connection()
+            .execute(
+                "SELECT MAX(version) FROM versions "
+                "WHERE container = ? AND version <= ? AND checkpoint",
+                (container, version),
+            )
+            .fetchone()
+        )
+
+        return row[0]
+
+    def add_version(
+        self,
+        container: str,
+        version: int,
+        checkpoint: bool,
+        records: Dict[str, Optional[str]],
+    ):
+        """Save a version with its (key, data) records.
+
+        Must be called in `immediate`, together with the reads the
+        version number is based on.
+        """
+
+        connection = self.connection()
+        connection.execute(
+            "INSERT INTO versions (container, version, created, checkpoint, changes) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (container, version, time.time(), checkpoint, len(records)),
+        )
+        connection.executemany(
+            "INSERT INTO records (container, version, key, data) VALUES (?, ?, ?, ?)",
+            ((container, version, key, data) for key, data in records.items()),
+        )
+
+    def versions(self, container: str) -> List[Tuple[int, float, bool, int]]:
+        """Return (version, created, checkpoint, changes) rows of a container."""
+
+        rows = self.connection().execute(
+            "SELECT version, created, checkpoint, changes FROM versions "
+            "WHERE container = ? ORDER BY version",
+            (container,),
+        )
+
+        return [(v, created, bool(cp), changes) for v, created, cp, changes in rows]
+
+    def records(
+        self, container: str, start: int, end: int
+    ) -> Iterator[Tuple[int, str, Optional[str]]]:
+        """Return (version, key, data) records between versions, inclusive,
+        in order of versions."""
+
+        return self.connection().execute(
+            "SELECT version, key, data FROM records "
+            "WHERE container = ? AND version BETWEEN ? AND ? ORDER BY version",
+            (container, start, end),
+        )
+
+
+class ChangeStore(SQLiteStore):
+    """Stores the latest change of each entity per container.
+
+    Sequence numbers are global and monotonic. A newer change of an
+    entity replaces the older one, so the log does not grow beyond the
+    number of entities and tombstones. `NULL` data marks a removed
+    entity (a tombstone).
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            container TEXT NOT NULL,
+            key TEXT NOT NULL,
+            hash TEXT,
+            data TEXT,
+            created REAL NOT NULL,
+            UNIQUE (container, key)
+        );
+        CREATE INDEX IF NOT EXISTS changes_container_seq ON changes (container, seq);
+        CREATE TABLE IF NOT EXISTS horizons (
+            container TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS links (
+            feed TEXT NOT NULL,
+            container TEXT NOT NULL,
+            PRIMARY KEY (feed, container)
+        );
+    """
+    # containers whose changes make up a feed
+    feed_containers = (
+        "(SELECT container FROM links WHERE feed = :feed UNION SELECT :feed)"
+    )
+
+    def hashes(self, container: str) -> Dict[str, Optional[str]]:
+        """Return a mapping of entity keys to hashes of the latest changes."""
+
+        rows = self.connection().execute(
+            "SELECT key, hash FROM changes WHERE container = ?", (container,)
+        )
+
+        return dict(rows)
+
+    def append(self, container: str, changes: Iterable[Tuple[str, str, str]]) -> int:
+        """Save (key, hash, data) changes, replacing the older ones.
+
+        Returns the last sequence number of the container. Must be
+        called in `immediate`, together with the reads the changes are
+        based on.
+        """
+
+        created = time.time()
+        connection = self.connection()
+        connection.executemany(
+            "INSERT OR REPLACE INTO changes (container, key, hash, data, created) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((container, *change, created) for change in changes),
+        )
+        (seq,) = connection.execute(
+            "SELECT MAX(seq) FROM changes WHERE container = ?", (container,)
+        ).fetchone()
+
+        return seq or 0
+
+    def purge(self, container: str, before: float):
+        """Delete tombstones created before a given time, move the horizon.
+
+        Must be called in `immediate`.
+        """
+
+        connection = self.connection()
+        (seq,) = connection.execute(
+            "SELECT MAX(seq) FROM changes "
+            "WHERE container = ? AND data IS NULL AND created < ?",
+            (container, before),
+        ).fetchone()
+
+        if seq is None:
+            return
+
+        connection.execute(
+            "DELETE FROM changes WHERE container = ? AND data IS NULL AND seq <= ?",
+            (container, seq),
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO horizons (container, seq) VALUES (?, ?)",
+            (container, seq),
+        )
+
+    def link(self, feed: str, container: str):
+        """Include changes of a container into the feed of another one."""
+
+        with self.connection() as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO links (feed, container) VALUES (?, ?)",
+                (feed, container),
+            )
+
+    def horizon(self, feed: str) -> int:
+        """Return the sequence number up to which tombstones of the feed
+        were purged."""
+
+        (seq,) = (
+            self.connection()
+            .execute(
+                "SELECT MAX(seq) FROM horizons "
+                f"WHERE container IN {self.feed_containers}",
+                {"feed": feed},
+            )
+            .fetchone()
+        )
+
+        return seq or 0
+
+    def last(self) -> int:
+        """Return the last sequence number."""
+
+        row = (
+            self.connection()
+            .execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'")
+            .fetchone()
+        )
+
+        return row[0] if row else 0
+
+    def since(
+        self, feed: str, seq: int, limit: int
+    ) -> List[Tuple[int, str, Optional[str]]]:
+        """Return up to `limit` (seq, key, data) changes of the feed after
+        a given sequence number, in order."""
+
+        rows = self.connection().execute(
+            "SELECT seq, key, data FROM changes "
+            f"WHERE container IN {self.feed_containers} AND seq > :seq "
+            "ORDER BY seq LIMIT :limit",
+            {"feed": feed, "seq": seq, "limit": limit},
+        )
+
+        return rows.fetchall()
+
+
+class StagingStore(SQLiteStore):
+    """Stores snapshots of container content taken before a chunked
+    replace, as entity records grouped by a staging token."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS staged (
+            token TEXT NOT NULL,
+            container TEXT NOT NULL,
+            PRIMARY KEY (token, container)
+        );
+        CREATE TABLE IF NOT EXISTS snapshots (
+            token TEXT NOT NULL,
+            container TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (token, container, key)
+        );
+    """
+
+    def put(self, token: str, container: str, records: Dict[str, str]):
+        """Save a snapshot of a container, replacing the previous one."""
+
+        with self.connection() as connection:
+            connection.execute(
+                "DELETE FROM snapshots WHERE token = ? AND container = ?",
+                (token, container),
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO staged (token, container) VALUES (?, ?)",
+                (token, container),
+            )
+            connection.executemany(
+                "INSERT INTO snapshots (token, container, key, data) "
+                "VALUES (?, ?, ?, ?)",
+                ((token, container, key, data) for key, data in records.items()),
+            )
+
+    def get(self, token: str, container: str) -> Optional[Dict[str, str]]:
+        """Return a snapshot of a container, if any."""
+
+        connection = self.connection()
+        row = connection.execute(
+            "SELECT 1 FROM staged WHERE token = ? AND container = ?",
+            (token, container),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        rows = connection.execute(
+            "SELECT key, data FROM snapshots WHERE token = ? AND container = ?",
+            (token, container),
+        )
+
+        return dict(rows)
+
+    def containers(self, token: str) -> List[str]:
+        """Return containers with a snapshot under the token."""
+
+        rows = self.connection().execute(
+            "SELECT container FROM staged WHERE token = ?", (token,)
+        )
+
+        return [container for (container,) in rows]
+
+    def snapshots(self) -> Iterator[Dict[str, str]]:
+        """Yield all snapshots kept at the moment."""
+
+        staged = self.connection().execute("SELECT token, container FROM staged")
+
+        for token, container in staged.fetchall():
+            records = self.get(token, container)
+
+            # may be dropped meanwhile
+            if records is not None:
+                yield records
+
+    def drop(self, token: str):
+        """Delete all snapshots under the token."""
+
+        with self.connection() as connection:
+            connection.execute("DELETE FROM snapshots WHERE token = ?", (token,))
+            connection.execute("DELETE FROM staged WHERE token = ?", (token,))
+
+
+class JobStore(SQLiteStore):
+    """Stores records of background jobs as JSON, with the process that
+    owns each job and cancellation requests."""
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            uid TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created REAL NOT NULL,
+            cancel INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created);
+    """
+    active = ("queued", "running")
+
+    def put(self, uid: str, owner: str, status: str, data: str):
+        """Save a job record, keeping a cancellation request, if any."""
+
+        with self.connection() as connection:
+            connection.execute(
+                "INSERT INTO jobs (uid, owner, status, created, data) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (uid) DO UPDATE "
+                "SET status = excluded.status, data = excluded.data",
+                (uid, owner, status, time.time(), data),
+            )
+
+    def get(self, uid: str) -> Optional[Tuple[str, bool]]:
+        """Return (data, cancel) of a job, if any."""
+
+        row = (
+            self.connection()
+            .execute("SELECT data, cancel FROM jobs WHERE uid = ?", (uid,))
+            .fetchone()
+        )
+
+        return None if row is None else (row[0], bool(row[1]))
+
+    def list(self, status: str = None, limit: int = 100) -> List[Tuple[str, bool]]:
+        """Return (data, cancel) of the latest jobs, newest first."""
+
+        rows = self.connection().execute(
+            "SELECT data, cancel FROM jobs WHERE ? IS NULL OR status = ? "
+            "ORDER BY created DESC LIMIT ?",
+            (status, status, limit),
+        )
+
+        return [(data, bool(cancel)) for data, cancel in rows]
+
+    def request_cancel(self, uid: str) -> bool:
+        """Ask the owner to cancel a queued or running job.
+
+        Returns `False` if the job is unknown or finished.
+        """
+
+        with self.connection() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET cancel = 1 WHERE uid = ? AND status IN (?, ?)",
+                (uid, *self.active),
+            )
+
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, uid: str) -> bool:
+        """Whether cancellation of a job was asked for."""
+
+        row = (
+            self.connection()
+            .execute("SELECT cancel FROM jobs WHERE uid = ?", (uid,))
+            .fetchone()
+        )
+
+        return bool(row and row[0])
+
+    def unfinished(self) -> List[Tuple[str, str, str]]:
+        """Return (uid, owner, data) of queued and running jobs."""
+
+        rows = self.connection().execute(
+            "SELECT uid, owner, data FROM jobs WHERE status IN (?, ?)", self.active
+        )
+
+        return rows.fetchall()
+
+    def trim(self, size: int):
+        """Delete all but the latest `size` jobs."""
+
+        with self.connection() as connection:
+            connection.execute(
+                "DELETE FROM jobs WHERE uid NOT IN "
+                "(SELECT uid FROM jobs ORDER BY created DESC LIMIT ?)",
+                (size,),
+            )
@@ -0,0 +1,222 @@
+"""
+Streaming readers and writers of graph data files.
+
+Graph data is read object by object, so memory use is bounded by the
+largest object rather than by the size of the file. Two formats are
+supported:
+
+- JSON: the usual graph object with `nodes`, `edges` and `groups`
+  arrays, optionally wrapped in `{"graph": ...}` like in requests,
+- NDJSON: one object per line, keyed by its collection, e.g.
+  `{"nodes": {"primitiveID": "n1", ...}}`.
+
+Readers yield `(collection, object)` pairs. Streams of valid objects
+can be converted to content in parts, and parts of content written
+back as NDJSON.
+"""
+
+import json
+from typing import IO, Iterable, Iterator, Tuple
+
+from .converters import GraphDataConverter, encode
+from .settings import KEYS
+from .structures import Content
+from .utils import batched
+
+
+COLLECTIONS = (KEYS.nodes, KEYS.edges, KEYS.groups)
+WHITESPACE = " \t\r\n"
+DELIMITERS = set(WHITESPACE + ",]}")
+
+_decoder = json.JSONDecoder()
+
+
+class StreamError(ValueError):
+    """Malformed graph data."""
+
+
+class _Reader:
+    """Reads JSON values one by one from a text file in blocks."""
+
+    def __init__(self, file: IO[str], block_size: int = 1 << 16) -> None:
+        self.file = file
+        self.block_size = block_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Read the next block, drop consumed text; `False` at EOF."""
+
+        block = "" if self.eof else self.file.read(self.block_size)
+
+        if not block:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.pos :] + block
+        self.pos = 0
+
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace, return the next character or "" at EOF."""
+
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+
+        if found != char:
+            raise StreamError(f"Expected {char!r}, found {found or 'end of file'!r}.")
+
+        self.pos += 1
+
+    def skip(self, char: str) -> bool:
+        """Consume the character if it is next."""
+
+        if self.peek() == char:
+            self.pos += 1
+            return True
+
+        return False
+
+    def value(self):
+        """Decode the next JSON value."""
+
+        self.peek()
+
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+
+                raise StreamError(str(e)) from e
+
+            # a number is complete only before a delimiter, it may go on
+            # in the next block
+            if (
+                isinstance(value, (int, float))
+                and self.buffer[end : end + 1] not in DELIMITERS
+                and self._fill()
+            ):
+                continue
+
+            self.pos = end
+
+            return value
+
+
+def _iter_graph(reader: _Reader) -> Iterator[Tuple[str, dict]]:
+    """Yield objects of the graph object whose opening brace is consumed."""
+
+    while not reader.skip("}"):
+        key = reader.value()
+
+        if not isinstance(key, str):
+            raise StreamError(f"Expected a key, found {key!r}.")
+
+        reader.expect(":")
+
+        if key == "graph" and reader.peek() == "{":
+            reader.expect("{")
+            yield from _iter_graph(reader)
+        elif key in COLLECTIONS and reader.peek() == "[":
+            reader.expect("[")
+
+            while not reader.skip("]"):
+                yield key, reader.value()
+                reader.skip(",")
+        else:
+            reader.value()  # not graph data
+
+        reader.skip(",")
+
+
+def iter_json(file: IO[str], block_size: int = 1 << 16) -> Iterator[Tuple[str, dict]]:
+    """Yield (collection, object) pairs from a JSON graph file, read in
+    blocks of `block_size` characters."""
+
+    reader = _Reader(file, block_size)
+    reader.expect("{")
+    yield from _iter_graph(reader)
+
+    if reader.peek():
+        raise StreamError("Unexpected data after the graph object.")
+
+
+def iter_ndjson(file: IO[str]) -> Iterator[Tuple[str, dict]]:
+    """Yield (collection, object) pairs from an NDJSON graph file."""
+
+    for number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise StreamError(f"Line {number}: {e}") from e
+
+        if not isinstance(item, dict) or len(item) != 1:
+            raise StreamError(f"Line {number}: expected an object with one key.")
+
+        ((collection, obj),) = item.items()
+
+        if collection not in COLLECTIONS:
+            raise StreamError(f"Line {number}: unknown collection {collection!r}.")
+
+        yield collection, obj
+
+
+def iter_content(
+    items: Iterable[Tuple[str, dict]], converter: GraphDataConverter, size: int
+) -> Iterator[Content]:
+    """Convert valid objects to content in parts of up to `size` objects.
+
+    A part may refer to ports of nodes in earlier parts.
+    """
+
+    for batch in batched(items, size):
+        data = {key: [] for key in COLLECTIONS}
+
+        for collection, obj in batch:
+            data[collection].append(obj)
+
+        yield converter.to_content(data)
+
+
+def ndjson_line(collection: str, obj) -> str:
+    """Return an NDJSON line with an object of a collection.
+
+    The object may be pre-encoded JSON.
+    """
+
+    return "{" + json.dumps(collection) + ":" + encode(obj) + "}\n"
+
+
+def to_ndjson(parts: Iterable[Content], converter: GraphDataConverter) -> Iterator[str]:
+    """Yield NDJSON lines with objects of content parts, e.g. from
+    `Manager.iter_read`."""
+
+    for content in parts:
+        data = converter.to_data(content)
+
+        for collection in COLLECTIONS:
+            for obj in data[collection]:
+                yield ndjson_line(collection, obj)
+
+
+FORMATS = {
+    "json": iter_json,
+    "ndjson": iter_ndjson,
+}
@@ -13,6 +13,14 @@ from typing import Any, MutableMapping, MutableSet, MutableSequence
 ID = str
 
 
+class RawJSON(str):
+    """Pre-encoded JSON text.
+
+    Metadata may be kept in this form between the database and HTTP
+    response when the server does not need to look inside.
+    """
+
+
 @dataclass
 class Primitive:
     """A primitive entity.
@@ -82,6 +90,12 @@ class Content:
     edges: MutableSequence[Edge]
     groups: MutableSequence[Group]
 
+    @property
+    def size(self) -> int:
+        """Total number of entities."""
+
+        return len(self.vertices) + len(self.ports) + len(self.edges) + len(self.groups)
+
     @property
     def info(self):
         """Print basic statistics about the content."""
@@ -94,3 +108,22 @@ class Content:
                 f"{len(self.groups)} groups",
             )
         )
+
+
+@dataclass
+class Stats:
+    """Size statistics of graph content.
+
+    Degree of a vertex is the number of edges of its ports. Meta size
+    is the number of characters of metadata JSON as stored, so
+    offloaded metadata counts as its reference.
+    """
+
+    vertices: int = 0
+    ports: int = 0
+    edges: int = 0
+    groups: int = 0
+    min_degree: int = 0
+    max_degree: int = 0
+    mean_degree: float = 0.0
+    meta_size: int = 0
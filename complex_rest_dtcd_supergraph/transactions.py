@@ -0,0 +1,130 @@
+"""
+Transaction helpers.
+
+`atomic` runs a function inside a Neo4j transaction, like
+`neomodel.db.transaction` does, and additionally:
+
+- retries the whole function on transient errors (deadlocks, lock
+  timeouts, lost connections) with jittered exponential backoff,
+- runs callbacks registered with `on_commit` once the transaction is
+  committed.
+"""
+
+import functools
+import logging
+import random
+import threading
+import time
+
+import neomodel
+from neo4j import exceptions
+
+from . import metrics, settings
+from .exceptions import ServiceBusy
+
+
+logger = logging.getLogger("supergraph")
+
+_local = threading.local()
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether the error may go away if the transaction is retried."""
+
+    if isinstance(error, exceptions.TransientError):
+        return error.is_retriable()
+
+    # the outcome of an incomplete commit is unknown, retrying is unsafe
+    if isinstance(error, exceptions.IncompleteCommit):
+        return False
+
+    return isinstance(error, (exceptions.ServiceUnavailable, exceptions.SessionExpired))
+
+
+def backoff(attempt: int) -> float:
+    """Return a delay before the retry after a given attempt (from 0).
+
+    The delay is random up to an exponentially growing cap ("full jitter").
+    """
+
+    cap = min(
+        settings.TRANSACTION_BACKOFF_MAX,
+        settings.TRANSACTION_BACKOFF_BASE * 2**attempt,
+    )
+
+    return random.uniform(0, cap)
+
+
+def on_commit(callback):
+    """Run a callback after the current transaction commits.
+
+    Outside of `atomic` the callback runs immediately. Callbacks of
+    a failed transaction are discarded.
+    """
+
+    callbacks = getattr(_local, "callbacks", None)
+
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
+
+def _run(func, args, kwargs):
+    """Run a function once in a transaction, return the result and callbacks."""
+
+    _local.callbacks = []
+
+    try:
+        with neomodel.db.transaction:
+            result = func(*args, **kwargs)
+
+        return result, _local.callbacks
+    finally:
+        _local.callbacks = None
+
+
+def atomic(func):
+    """Decorator to run a function in a transaction with retries and
+    commit hooks.
+
+    The function may run several times, so it must not have side
+    effects outside of the transaction; defer them with `on_commit`.
+    Raises `ServiceBusy` if transient errors persist after
+    `TRANSACTION_RETRIES` retries.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, "callbacks", None) is not None:
+            return func(*args, **kwargs)  # already in a transaction
+
+        attempt = 0
+
+        while True:
+            try:
+                result, callbacks = _run(func, args, kwargs)
+                break
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+
+                if attempt >= settings.TRANSACTION_RETRIES:
+                    metrics.increment("transactions.retries_exhausted")
+                    logger.error(f"Giving up after {attempt} retries: {e}")
+                    raise ServiceBusy from e
+
+                delay = backoff(attempt)
+                metrics.increment("transactions.retries")
+                logger.warning(f"Transient error, retry in {delay:.3f}s: {e}")
+                time.sleep(delay)
+                attempt += 1
+
+        metrics.increment("transactions.committed")
+
+        for callback in callbacks:
+            callback()
+
+        return result
+
+    return wrapper
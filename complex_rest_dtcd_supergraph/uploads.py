@@ -0,0 +1,213 @@
+"""
+Resumable uploads of graph content.
+
+A graph file too large for a single request is sent in numbered
+chunks. An upload keeps its chunks in a directory on local disk until
+it is committed, so a client whose connection dropped asks which
+chunks the server already has and sends only the missing ones. On
+commit the chunks are read back in order as a single text stream,
+without joining them in memory.
+"""
+
+import io
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Iterable, List, Optional
+
+from . import settings
+
+
+BLOCK_SIZE = 1 << 16
+
+
+class ChunkError(ValueError):
+    """A chunk was not received in full or is too large."""
+
+
+@dataclass
+class Upload:
+    """An upload of graph content of a root or its fragment."""
+
+    root: str
+    fragment: Optional[str] = None
+    format: str = "json"
+    chunks: int = 1  # expected number of chunks
+    uid: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created: float = field(default_factory=time.time)
+    job: Optional[str] = None  # uid of the last commit job
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Chunks(io.RawIOBase):
+    """Reads files one after another as a single binary stream."""
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        self._paths = iter(paths)
+        self._file = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self._file is None:
+                path = next(self._paths, None)
+
+                if path is None:
+                    return 0
+
+                self._file = open(path, "rb")
+
+            count = self._file.readinto(buffer)
+
+            if count:
+                return count
+
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        super().close()
+
+
+class UploadStore:
+    """Keeps uploads in sub-directories of `path`, one file per chunk.
+
+    Uploads without activity for `ttl` seconds are removed by `expire`.
+    It runs when a new upload is created; views also run it when an
+    upload is checked or committed.
+    """
+
+    def __init__(self, path, ttl: float) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _dir(self, uid: str) -> Path:
+        return self.path / uid
+
+    def _chunk_path(self, upload: Upload, index: int) -> Path:
+        return self._dir(upload.uid) / f"{index}.chunk"
+
+    def save(self, upload: Upload):
+        directory = self._dir(upload.uid)
+        directory.mkdir(exist_ok=True)
+        tmp = directory / "upload.json.tmp"
+        tmp.write_text(json.dumps(upload.to_dict()))
+        os.replace(tmp, directory / "upload.json")
+
+    def create(self, upload: Upload) -> Upload:
+        """Save a new upload, remove expired ones."""
+
+        self.expire()
+        self.save(upload)
+
+        return upload
+
+    def get(self, uid: str) -> Optional[Upload]:
+        try:
+            data = (self._dir(uid) / "upload.json").read_text()
+        except FileNotFoundError:
+            return None
+
+        return Upload(**json.loads(data))
+
+    def put_chunk(
+        self,
+        upload: Upload,
+        index: int,
+        stream: IO[bytes],
+        max_size: int,
+        length: int = None,
+    ) -> int:
+        """Save a chunk read from a stream, return its size.
+
+        The chunk replaces the one with the same index only once it is
+        read in full. Raises `ChunkError` if it exceeds `max_size` bytes
+        or, when the expected `length` is given, is cut short.
+        """
+
+        path = self._chunk_path(upload, index)
+        tmp = path.parent / f"{index}.{uuid.uuid4().hex}.tmp"
+        size = 0
+
+        try:
+            with open(tmp, "wb") as f:
+                while True:
+                    block = stream.read(BLOCK_SIZE)
+
+                    if not block:
+                        break
+
+                    size += len(block)
+
+                    if size > max_size:
+                        raise ChunkError(f"Chunk is larger than {max_size} bytes.")
+
+                    f.write(block)
+
+            if length is not None and size != length:
+                raise ChunkError(f"Received {size} of {length} bytes.")
+
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        return size
+
+    def received(self, upload: Upload) -> List[int]:
+        """Return indices of received chunks in order."""
+
+        return sorted(
+            int(path.stem)
+            for path in self._dir(upload.uid).glob("*.chunk")
+            if path.stem.isdigit()
+        )
+
+    def missing(self, upload: Upload) -> List[int]:
+        """Return indices of expected chunks not received yet."""
+
+        return sorted(set(range(upload.chunks)) - set(self.received(upload)))
+
+    def open(self, upload: Upload) -> IO[str]:
+        """Open expected chunks in order as a single text stream."""
+
+        paths = (self._chunk_path(upload, i) for i in range(upload.chunks))
+
+        return io.TextIOWrapper(io.BufferedReader(_Chunks(paths)), encoding="utf-8")
+
+    def delete(self, uid: str):
+        shutil.rmtree(self._dir(uid), ignore_errors=True)
+
+    def expire(self) -> int:
+        """Remove uploads without activity for `ttl` seconds, return
+        their number."""
+
+        deadline = time.time() - self.ttl
+        count = 0
+
+        for directory in self.path.iterdir():
+            if directory.is_dir() and directory.stat().st_mtime < deadline:
+                shutil.rmtree(directory, ignore_errors=True)
+                count += 1
+
+        return count
+
+
+@lru_cache(maxsize=None)
+def get_upload_store() -> UploadStore:
+    """Return the shared store of uploads."""
+
+    return UploadStore(settings.UPLOADS_PATH, settings.UPLOADS_TTL)
@@ -5,13 +5,36 @@ from .views import (
     DefaultRootFragmentGraphView,
     DefaultRootFragmentListView,
     DefaultRootGraphView,
+    JobDetailView,
+    JobListView,
+    JobProgressView,
+    MetricsView,
     ResetNeo4jView,
     RootDetailView,
     RootFragmentDetailView,
+    RootFragmentGraphChangesView,
+    RootFragmentGraphEventsView,
+    RootFragmentGraphExportView,
+    RootFragmentGraphStatsView,
+    RootFragmentGraphUploadView,
+    RootFragmentGraphVersionDetailView,
+    RootFragmentGraphVersionListView,
+    RootFragmentGraphVersionRevertView,
     RootFragmentGraphView,
     RootFragmentListView,
+    RootGraphChangesView,
+    RootGraphEventsView,
+    RootGraphExportView,
+    RootGraphStatsView,
+    RootGraphUploadView,
+    RootGraphVersionDetailView,
+    RootGraphVersionListView,
+    RootGraphVersionRevertView,
     RootGraphView,
     RootListView,
+    UploadChunkView,
+    UploadCommitView,
+    UploadDetailView,
 )
 
 
@@ -37,8 +60,106 @@ urlpatterns = [
         RootFragmentGraphView.as_view(),
         name="root-fragment-graph",
     ),
+    # versions of graph content
+    path(
+        "roots/<uuid:pk>/graph/versions",
+        RootGraphVersionListView.as_view(),
+        name="root-graph-versions",
+    ),
+    path(
+        "roots/<uuid:pk>/graph/versions/<int:version>",
+        RootGraphVersionDetailView.as_view(),
+        name="root-graph-version-detail",
+    ),
+    path(
+        "roots/<uuid:pk>/graph/versions/<int:version>/revert",
+        RootGraphVersionRevertView.as_view(),
+        name="root-graph-version-revert",
+    ),
+    path(
+        "roots/<uuid:root_pk>/fragments/<uuid:fragment_pk>/graph/versions",
+        RootFragmentGraphVersionListView.as_view(),
+        name="root-fragment-graph-versions",
+    ),
+    path(
+        "roots/<uuid:root_pk>/fragments/<uuid:fragment_pk>/graph/versions/<int:version>",
+        RootFragmentGraphVersionDetailView.as_view(),
+        name="root-fragment-graph-version-detail",
+    ),
+    path(
+        "roots/<uuid:root_pk>/fragments/<uuid:fragment_pk>/graph/versions/<int:version>/revert",
+        RootFragmentGraphVersionRevertView.as_view(),
+        name="root-fragment-graph-version-revert",
+    ),
+    # change feeds of graph content
+    path(
+        "roots/<uuid:pk>/graph/changes",
+        RootGraphChangesView.as_view(),
+        name="root-graph-changes",
+    ),
+    path(
+        "roots/<uuid:root_pk>/fragments/<uuid:fragment_pk>/graph/changes",
+        RootFragmentGraphChangesView.as_view(),
+        name="root-fragment-graph-changes",
+    ),
+    # notifications of changes of graph content
+    path(
+        "roots/<uuid:pk>/graph/events",
+        RootGraphEventsView.as_view(),
+        name="root-graph-events",
+    ),
+    path(
+        "roots/<uuid:root_pk>/fragments/<uuid:fragment_pk>/graph/events",
+        RootFragmentGraphEventsView.as_view(),
+        name="root-fragment-graph-events",
+    ),
+    # streaming export of graph content
+    path(
+        "roots/<uuid:pk>/graph/export",
+        RootGraphExportView.as_view(),
+        name="root-graph-export",
+    ),
+    path(
+        "roots/<uuid:root_pk>/fragments/<uuid:fragment_pk>/graph/export",
+        RootFragmentGraphExportView.as_view(),
+        name="root-fragment-graph-export",
+    ),
+    # size statistics of graph content
+    path(
+        "roots/<uuid:pk>/graph/stats",
+        RootGraphStatsView.as_view(),
+        name="root-graph-stats",
+    ),
+    path(
+        "roots/<uuid:root_pk>/fragments/<uuid:fragment_pk>/graph/stats",
+        RootFragmentGraphStatsView.as_view(),
+        name="root-fragment-graph-stats",
+    ),
+    # resumable uploads of graph content
+    path(
+        "roots/<uuid:pk>/graph/uploads",
+        RootGraphUploadView.as_view(),
+        name="root-graph-uploads",
+    ),
+    path(
+        "roots/<uuid:root_pk>/fragments/<uuid:fragment_pk>/graph/uploads",
+        RootFragmentGraphUploadView.as_view(),
+        name="root-fragment-graph-uploads",
+    ),
+    path("uploads/<uuid:pk>", UploadDetailView.as_view(), name="upload-detail"),
+    path(
+        "uploads/<uuid:pk>/chunks/<int:index>",
+        UploadChunkView.as_view(),
+        name="upload-chunk",
+    ),
+    path("uploads/<uuid:pk>/commit", UploadCommitView.as_view(), name="upload-commit"),
+    # background jobs
+    path("jobs", JobListView.as_view(), name="jobs"),
+    path("jobs/<uuid:pk>", JobDetailView.as_view(), name="job-detail"),
+    path("jobs/<uuid:pk>/progress", JobProgressView.as_view(), name="job-progress"),
     # services
     path("reset", ResetNeo4jView.as_view(), name="reset"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]
 
 # backward API compatibility: fragment management for default root
@@ -3,8 +3,10 @@ This module provides custom utility functions.
 """
 
 import uuid
-from typing import Sequence
+from itertools import islice
+from typing import Iterable, Iterator, Sequence
 
+import neo4j
 import neomodel
 from neomodel import contrib
 
@@ -68,6 +70,66 @@ def connect_if_not_connected(
         return manager.relationship(node)
 
 
+def call(func):
+    """Call a function without arguments and return the result."""
+
+    return func()
+
+
+def delete_in_batches(query: str, params: dict, batch_size: int, run=call) -> int:
+    """Run a deletion query until it deletes less than a batch.
+
+    The query takes a `$limit` parameter and returns the number of
+    deleted nodes. Each batch is run through `run`, e.g. in
+    a transaction of its own. Returns the total number of deleted nodes.
+    """
+
+    params = dict(params, limit=batch_size)
+    total = 0
+
+    def delete_batch():
+        return neomodel.db.cypher_query(query, params)
+
+    while True:
+        results, _ = run(delete_batch)
+        deleted = results[0][0]
+        total += deleted
+
+        if deleted < batch_size:
+            return total
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to `size` consecutive items."""
+
+    iterator = iter(iterable)
+
+    while True:
+        batch = list(islice(iterator, size))
+
+        if not batch:
+            return
+
+        yield batch
+
+
+def read_session(fetch_size: int = 1000) -> neo4j.Session:
+    """Open a read session outside of neomodel's transaction.
+
+    Results of queries in the session are pulled from the server
+    `fetch_size` records at a time.
+    """
+
+    if not neomodel.db.url:
+        neomodel.db.set_connection(neomodel.config.DATABASE_URL)
+
+    return neomodel.db.driver.session(
+        default_access_mode=neo4j.READ_ACCESS,
+        database=neomodel.db._database_name,
+        fetch_size=fetch_size,
+    )
+
+
 def valid_property(value) -> bool:
     """
     Return `True` if the value is a valid Neo4j property, `False` otherwise.
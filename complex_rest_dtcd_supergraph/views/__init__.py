@@ -1,3 +1,6 @@
+from .changes import RootFragmentGraphChangesView, RootGraphChangesView
+from .events import RootFragmentGraphEventsView, RootGraphEventsView
+from .exports import RootFragmentGraphExportView, RootGraphExportView
 from .fragments import (
     DefaultRootFragmentDetailView,
     DefaultRootFragmentListView,
@@ -10,8 +13,25 @@ from .graphs import (
     RootFragmentGraphView,
     RootGraphView,
 )
+from .history import (
+    RootFragmentGraphVersionDetailView,
+    RootFragmentGraphVersionListView,
+    RootFragmentGraphVersionRevertView,
+    RootGraphVersionDetailView,
+    RootGraphVersionListView,
+    RootGraphVersionRevertView,
+)
+from .jobs import JobDetailView, JobListView, JobProgressView
 from .roots import (
     RootDetailView,
     RootListView,
 )
-from .service import ResetNeo4jView
+from .service import MetricsView, ResetNeo4jView
+from .stats import RootFragmentGraphStatsView, RootGraphStatsView
+from .uploads import (
+    RootFragmentGraphUploadView,
+    RootGraphUploadView,
+    UploadChunkView,
+    UploadCommitView,
+    UploadDetailView,
+)
@@ -0,0 +1,64 @@
+"""
+Views for change feeds of graph content of roots and fragments.
+"""
+
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from rest.permissions import AllowAny
+from rest.response import SuccessResponse
+from rest.views import APIView
+
+from ..exceptions import ChangesExpired
+from ..managers import Manager
+from ..models import Root
+from ..renderers import PassThroughJSONRenderer
+from ..transactions import atomic
+from .fragments import get_fragment_from_root_or_404
+from .shortcuts import get_int_param, get_node_or_404
+
+
+class RootGraphChangesView(APIView):
+    """Retrieve changes of graph content of a root since a sequence number.
+
+    The feed of a root includes changes of its fragments.
+    """
+
+    http_method_names = ["get"]
+    permission_classes = (AllowAny,)
+    renderer_classes = (PassThroughJSONRenderer, *APIView.renderer_classes)
+    manager = Manager()
+    page_size = 1000
+
+    def get_container(self, **kwargs):
+        return get_node_or_404(Root.nodes, uid=kwargs["pk"].hex)
+
+    @atomic
+    def get(self, request: Request, **kwargs):
+        """Read changes after `since` sequence number, at most `limit` of them.
+
+        Changes come in order; `last` is the sequence number to ask
+        next, `more` tells whether there are more changes right away.
+        """
+
+        container = self.get_container(**kwargs)
+
+        if self.manager.changelog is None:
+            raise NotFound
+
+        since = get_int_param(request, "since", 0)
+        limit = get_int_param(request, "limit", self.page_size) or self.page_size
+
+        try:
+            data = self.manager.changelog.since(container.uid, since, limit)
+        except LookupError:
+            raise ChangesExpired
+
+        return SuccessResponse(data=data)
+
+
+class RootFragmentGraphChangesView(RootGraphChangesView):
+    """Retrieve changes of graph content of this root's fragment."""
+
+    def get_container(self, **kwargs):
+        return get_fragment_from_root_or_404(kwargs["root_pk"], kwargs["fragment_pk"])
@@ -0,0 +1,88 @@
+"""
+Views for push notifications of graph changes over Server-Sent Events.
+"""
+
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from rest.permissions import AllowAny
+from rest.views import APIView
+
+from .. import settings
+from ..events import Subscription
+from ..managers import Manager
+from ..models import Root
+from ..transactions import atomic
+from .fragments import get_fragment_from_root_or_404
+from .shortcuts import get_node_or_404
+
+
+def stream(subscription: Subscription, keepalive: float):
+    """Yield notifications in `text/event-stream` format."""
+
+    with subscription:
+        yield "retry: 3000\n\n"
+
+        while True:
+            event = subscription.get(timeout=keepalive)
+
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+
+            yield f"id: {event['id']}\nevent: change\ndata: {json.dumps(event)}\n\n"
+
+
+class RootGraphEventsView(APIView):
+    """Stream notifications of changes of graph content of a root.
+
+    The stream includes changes of root's fragments.
+    """
+
+    http_method_names = ["get"]
+    permission_classes = (AllowAny,)
+    manager = Manager()
+
+    def get_container(self, **kwargs):
+        return get_node_or_404(Root.nodes, uid=kwargs["pk"].hex)
+
+    @atomic
+    def subscribe(self, **kwargs) -> Subscription:
+        container = self.get_container(**kwargs)
+
+        if isinstance(container, Root):
+            for fragment in container.fragments.all():
+                self.manager.broker.link(container.uid, fragment.uid)
+
+        return self.manager.broker.subscribe([container.uid])
+
+    def get(self, request: Request, **kwargs):
+        """Open a stream of change notifications.
+
+        Each notification carries the container uid, the new version and
+        sequence number, and ids of changed objects when history and
+        change feed are enabled.
+        """
+
+        if self.manager.broker is None:
+            raise NotFound
+
+        subscription = self.subscribe(**kwargs)
+        response = StreamingHttpResponse(
+            stream(subscription, settings.EVENTS_KEEPALIVE),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+
+        return response
+
+
+class RootFragmentGraphEventsView(RootGraphEventsView):
+    """Stream notifications of changes of graph content of this root's fragment."""
+
+    def get_container(self, **kwargs):
+        return get_fragment_from_root_or_404(kwargs["root_pk"], kwargs["fragment_pk"])
@@ -0,0 +1,57 @@
+"""
+Views for streaming export of graph content of roots and fragments.
+"""
+
+from django.http import StreamingHttpResponse
+from rest_framework.request import Request
+
+from rest.permissions import AllowAny
+from rest.views import APIView
+
+from .. import settings
+from ..converters import GraphDataConverter
+from ..managers import Manager
+from ..models import Root
+from ..streams import to_ndjson
+from ..transactions import atomic
+from .fragments import get_fragment_from_root_or_404
+from .shortcuts import get_node_or_404
+
+
+class RootGraphExportView(APIView):
+    """Stream graph content of a root as NDJSON.
+
+    The content is read in batches from server-side cursors, so memory
+    use does not depend on the size of the graph.
+    """
+
+    http_method_names = ["get"]
+    permission_classes = (AllowAny,)
+    converter = GraphDataConverter(passthrough=settings.META_PASSTHROUGH)
+    manager = Manager()
+    batch_size = 1000
+
+    def get_container(self, **kwargs):
+        return get_node_or_404(Root.nodes, uid=kwargs["pk"].hex)
+
+    def get(self, request: Request, **kwargs):
+        """Download graph content, one node (with ports), edge or group
+        per line."""
+
+        container = atomic(self.get_container)(**kwargs)
+        parts = self.manager.iter_read(container, self.batch_size)
+        response = StreamingHttpResponse(
+            to_ndjson(parts, self.converter), content_type="application/x-ndjson"
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="{container.uid}.ndjson"'
+
+        return response
+
+
+class RootFragmentGraphExportView(RootGraphExportView):
+    """Stream graph content of this root's fragment as NDJSON."""
+
+    def get_container(self, **kwargs):
+        return get_fragment_from_root_or_404(kwargs["root_pk"], kwargs["fragment_pk"])
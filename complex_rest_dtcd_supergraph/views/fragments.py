@@ -6,7 +6,6 @@ Fragments belong to roots.
 
 import uuid
 
-import neomodel
 from rest_framework import status
 from rest_framework.request import Request
 
@@ -15,8 +14,10 @@ from rest.response import SuccessResponse
 from rest.views import APIView
 
 from .. import settings
+from ..managers import Manager
 from ..models import Fragment, Root
 from ..serializers import FragmentSerializer
+from ..transactions import atomic
 from .shortcuts import get_node_or_404
 
 
@@ -36,7 +37,7 @@ class RootFragmentListView(APIView):
     permission_classes = (AllowAny,)
     serializer_class = FragmentSerializer
 
-    @neomodel.db.transaction
+    @atomic
     def get(self, request: Request, pk: uuid.UUID):
         """Read a list of root's fragments."""
 
@@ -46,7 +47,7 @@ class RootFragmentListView(APIView):
 
         return SuccessResponse({"fragments": serializer.data})
 
-    @neomodel.db.transaction
+    @atomic
     def post(self, request: Request, pk: uuid.UUID):
         """Create a new fragment for this root."""
 
@@ -86,8 +87,9 @@ class RootFragmentDetailView(APIView):
     http_method_names = ["get", "put", "delete"]
     permission_classes = (AllowAny,)
     serializer_class = FragmentSerializer
+    manager = Manager()
 
-    @neomodel.db.transaction
+    @atomic
     def get(self, request: Request, root_pk: uuid.UUID, fragment_pk: uuid.UUID):
         """Return root's fragment."""
 
@@ -96,7 +98,7 @@ class RootFragmentDetailView(APIView):
 
         return SuccessResponse({"fragment": serializer.data})
 
-    @neomodel.db.transaction
+    @atomic
     def put(self, request: Request, root_pk: uuid.UUID, fragment_pk: uuid.UUID):
         """Update this root's fragment."""
 
@@ -107,14 +109,20 @@ class RootFragmentDetailView(APIView):
 
         return SuccessResponse({"fragment": serializer.data})
 
-    @neomodel.db.transaction
+    @atomic
     def delete(self, request: Request, root_pk: uuid.UUID, fragment_pk: uuid.UUID):
-        """Delete this root's fragment and its content."""
+        """Delete this root's fragment and its content.
+
+        The fragment is gone at once, the content is deleted in background;
+        answers 202 with a job to check.
+        """
 
         fragment = get_fragment_from_root_or_404(root_pk, fragment_pk)
-        fragment.delete()
+        job = self.manager.delete(fragment)
 
-        return SuccessResponse()
+        return SuccessResponse(
+            data={"job": job.to_dict()}, http_status=status.HTTP_202_ACCEPTED
+        )
 
 
 class DefaultRootFragmentDetailView(RootFragmentDetailView):
@@ -4,7 +4,7 @@ Views for graph management operations for roots and fragments.
 
 import uuid
 
-import neomodel
+from rest_framework import status
 from rest_framework.request import Request
 
 from rest.permissions import AllowAny
@@ -15,7 +15,9 @@ from .. import settings
 from ..converters import GraphDataConverter
 from ..managers import Manager
 from ..models import Root
-from ..serializers import ContentSerializer, GraphSerializer
+from ..renderers import PassThroughJSONRenderer
+from ..serializers import GraphSerializer
+from ..transactions import atomic
 from .fragments import get_fragment_from_root_or_404
 from .mixins import ContainerManagementMixin
 from .shortcuts import get_node_or_404
@@ -26,36 +28,57 @@ class RootGraphView(ContainerManagementMixin, APIView):
 
     http_method_names = ["get", "put", "delete"]
     permission_classes = (AllowAny,)
-    converter = GraphDataConverter()
+    renderer_classes = (PassThroughJSONRenderer, *APIView.renderer_classes)
+    converter = GraphDataConverter(passthrough=settings.META_PASSTHROUGH)
     manager = Manager()
 
-    @neomodel.db.transaction
+    @atomic
     def get(self, request: Request, pk: uuid.UUID):
         """Read graph content of a root."""
 
         root = get_node_or_404(Root.nodes, uid=pk.hex)
         payload = self.read(root)
-        serializer = ContentSerializer(instance=payload)
 
-        return SuccessResponse(data={"graph": serializer.data})
+        return SuccessResponse(data={"graph": self.represent(payload)})
 
-    @neomodel.db.transaction
     def put(self, request: Request, pk: uuid.UUID):
-        """Replace graph content of a root."""
+        """Replace graph content of a root.
 
+        With asynchronous writes or large content, answers 202 with
+        a job to check. NDJSON content is written as it is uploaded.
+        """
+
+        if self.is_stream(request):
+            root = atomic(get_node_or_404)(Root.nodes, uid=pk.hex)
+            self.replace_stream(root, request.stream)
+
+            return SuccessResponse()
+
+        return self.put_json(request, pk)
+
+    @atomic
+    def put_json(self, request: Request, pk: uuid.UUID):
         root = get_node_or_404(Root.nodes, uid=pk.hex)
         serializer = GraphSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+
+        if settings.ASYNC_WRITES or self.is_large(serializer.data["graph"]):
+            job = self.replace_later(root, serializer.data["graph"])
+
+            return SuccessResponse(
+                data={"job": job.to_dict()}, http_status=status.HTTP_202_ACCEPTED
+            )
+
         self.replace(root, serializer.data["graph"])
 
         return SuccessResponse()
 
-    @neomodel.db.transaction
     def delete(self, request: Request, pk: uuid.UUID):
-        """Delete graph content of a root."""
+        """Delete graph content of a root in batches, each in
+        a transaction of its own."""
 
-        root = get_node_or_404(Root.nodes, uid=pk.hex)
-        root.clear(content_only=True)
+        root = atomic(get_node_or_404)(Root.nodes, uid=pk.hex)
+        self.manager.clear(root)
 
         return SuccessResponse()
 
@@ -80,29 +103,56 @@ class RootFragmentGraphView(ContainerManagementMixin, APIView):
 
     http_method_names = ["get", "put", "delete"]
     permission_classes = (AllowAny,)
-    converter = GraphDataConverter()
+    renderer_classes = (PassThroughJSONRenderer, *APIView.renderer_classes)
+    converter = GraphDataConverter(passthrough=settings.META_PASSTHROUGH)
     manager = Manager()
 
-    @neomodel.db.transaction
+    @atomic
     def get(self, request: Request, root_pk: uuid.UUID, fragment_pk: uuid.UUID):
         """Read graph content of the given root's fragment."""
 
         fragment = get_fragment_from_root_or_404(root_pk, fragment_pk)
         payload = self.read(fragment)
-        serializer = ContentSerializer(instance=payload)
 
-        return SuccessResponse(data={"graph": serializer.data})
+        return SuccessResponse(data={"graph": self.represent(payload)})
 
-    @neomodel.db.transaction
     def put(self, request: Request, root_pk: uuid.UUID, fragment_pk: uuid.UUID):
-        """Replace graph content of this root's fragment."""
+        """Replace graph content of this root's fragment.
 
+        With asynchronous writes or large content, answers 202 with
+        a job to check. NDJSON content is written as it is uploaded.
+        """
+
+        if self.is_stream(request):
+            root = atomic(get_node_or_404)(Root.nodes, uid=root_pk.hex)
+            fragment = atomic(get_node_or_404)(root.fragments, uid=fragment_pk.hex)
+            self.replace_stream(fragment, request.stream)
+            atomic(self.manager.reconnect)(root, fragment)
+
+            return SuccessResponse()
+
+        return self.put_json(request, root_pk, fragment_pk)
+
+    @atomic
+    def put_json(self, request: Request, root_pk: uuid.UUID, fragment_pk: uuid.UUID):
         # validate incoming graph content
         serializer = GraphSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         # query root and fragment
         root = get_node_or_404(Root.nodes, uid=root_pk.hex)
         fragment = get_node_or_404(root.fragments, uid=fragment_pk.hex)
+
+        if settings.ASYNC_WRITES or self.is_large(serializer.data["graph"]):
+            job = self.replace_later(
+                fragment,
+                serializer.data["graph"],
+                then=lambda: self.manager.reconnect(root, fragment),
+            )
+
+            return SuccessResponse(
+                data={"job": job.to_dict()}, http_status=status.HTTP_202_ACCEPTED
+            )
+
         # convert to domain classes, update fragment's content
         self.replace(fragment, serializer.data["graph"])
         # re-connect root to content
@@ -110,12 +160,12 @@ class RootFragmentGraphView(ContainerManagementMixin, APIView):
 
         return SuccessResponse()
 
-    @neomodel.db.transaction
     def delete(self, request: Request, root_pk: uuid.UUID, fragment_pk: uuid.UUID):
-        """Delete graph content this root's fragment."""
+        """Delete graph content this root's fragment in batches, each in
+        a transaction of its own."""
 
-        fragment = get_fragment_from_root_or_404(root_pk, fragment_pk)
-        fragment.clear()
+        fragment = atomic(get_fragment_from_root_or_404)(root_pk, fragment_pk)
+        self.manager.clear(fragment)
 
         return SuccessResponse()
 
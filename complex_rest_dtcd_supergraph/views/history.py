@@ -0,0 +1,122 @@
+"""
+Views for versions of graph content of roots and fragments.
+"""
+
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from rest.permissions import AllowAny
+from rest.response import SuccessResponse
+from rest.views import APIView
+
+from ..converters import GraphDataConverter
+from ..managers import Manager
+from ..models import Root
+from ..transactions import atomic
+from .fragments import get_fragment_from_root_or_404
+from .mixins import ContainerManagementMixin
+from .shortcuts import get_node_or_404, replace_or_400
+
+
+class RootGraphVersionMixin(ContainerManagementMixin):
+    """Finds the root and its content at a given version."""
+
+    permission_classes = (AllowAny,)
+    converter = GraphDataConverter()
+    manager = Manager()
+
+    def get_container(self, **kwargs):
+        return get_node_or_404(Root.nodes, uid=kwargs["pk"].hex)
+
+    def reconnect(self, container, **kwargs):
+        """Hook to connect replaced content to other containers."""
+
+    def get_content_or_404(self, container, version: int):
+        if self.manager.history is None:
+            raise NotFound
+
+        try:
+            return self.manager.history.content(container.uid, version)
+        except KeyError:
+            raise NotFound
+
+
+class RootGraphVersionListView(RootGraphVersionMixin, APIView):
+    """List versions of graph content of a root."""
+
+    http_method_names = ["get"]
+
+    @atomic
+    def get(self, request: Request, **kwargs):
+        """Read a list of versions."""
+
+        container = self.get_container(**kwargs)
+        history = self.manager.history
+        versions = history.versions(container.uid) if history is not None else []
+
+        return SuccessResponse(data={"versions": versions})
+
+
+class RootGraphVersionDetailView(RootGraphVersionMixin, APIView):
+    """Retrieve graph content of a root at a given version."""
+
+    http_method_names = ["get"]
+
+    @atomic
+    def get(self, request: Request, version: int, **kwargs):
+        """Read graph content at a given version."""
+
+        container = self.get_container(**kwargs)
+        content = self.get_content_or_404(container, version)
+        payload = self.converter.to_data(content)
+
+        return SuccessResponse(data={"graph": self.represent(payload)})
+
+
+class RootGraphVersionRevertView(RootGraphVersionMixin, APIView):
+    """Revert graph content of a root to a given version."""
+
+    http_method_names = ["post"]
+
+    @atomic
+    def post(self, request: Request, version: int, **kwargs):
+        """Replace graph content with the content at a given version.
+
+        The revert itself becomes a new version.
+        """
+
+        container = self.get_container(**kwargs)
+        content = self.get_content_or_404(container, version)
+        replace_or_400(self.manager, container, content)
+        self.reconnect(container, **kwargs)
+
+        return SuccessResponse()
+
+
+class RootFragmentGraphVersionMixin(RootGraphVersionMixin):
+    """Finds root's fragment and its content at a given version."""
+
+    def get_container(self, **kwargs):
+        return get_fragment_from_root_or_404(kwargs["root_pk"], kwargs["fragment_pk"])
+
+    def reconnect(self, container, **kwargs):
+        root = get_node_or_404(Root.nodes, uid=kwargs["root_pk"].hex)
+        self.manager.reconnect(root, container)
+
+
+class RootFragmentGraphVersionListView(
+    RootFragmentGraphVersionMixin, RootGraphVersionListView
+):
+    """List versions of graph content of this root's fragment."""
+
+
+class RootFragmentGraphVersionDetailView(
+    RootFragmentGraphVersionMixin, RootGraphVersionDetailView
+):
+    """Retrieve graph content of this root's fragment at a given version."""
+
+
+class RootFragmentGraphVersionRevertView(
+    RootFragmentGraphVersionMixin, RootGraphVersionRevertView
+):
+    """Revert graph content of this root's fragment to a given version."""
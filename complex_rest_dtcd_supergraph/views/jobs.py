@@ -0,0 +1,124 @@
+"""
+Views for background jobs.
+"""
+
+import uuid
+
+from rest_framework import status
+from rest_framework.request import Request
+
+from rest.permissions import AllowAny
+from rest.response import SuccessResponse
+from rest.views import APIView
+
+from ..exceptions import JobNotCancellable
+from ..jobs import Job, WriteQueue, get_write_queue
+from ..managers import Manager
+from ..models import Container
+from ..serializers import JobSerializer
+from ..transactions import atomic
+from .shortcuts import get_int_param, get_node_or_404, get_or_404
+
+
+class JobQueueMixin:
+    """Provides the process-wide job queue, created on first use."""
+
+    @property
+    def writer(self) -> WriteQueue:
+        return get_write_queue()
+
+
+class JobListView(JobQueueMixin, APIView):
+    """List recent background jobs or submit a new one."""
+
+    http_method_names = ["get", "post"]
+    permission_classes = (AllowAny,)
+    manager = Manager()
+    page_size = 100
+
+    def get(self, request: Request):
+        """Read the latest jobs, newest first, optionally with a given
+        `status`, at most `limit` of them."""
+
+        limit = get_int_param(request, "limit", self.page_size) or self.page_size
+        jobs = self.writer.list(request.query_params.get("status"), limit)
+
+        return SuccessResponse(data={"jobs": [job.to_dict() for job in jobs]})
+
+    def post(self, request: Request):
+        """Run an operation on a root or a fragment in background.
+
+        - `clear` deletes the graph content of the container in batches,
+        - `delete` deletes the container with its content.
+
+        Other operations are rejected with 400; writes are submitted
+        through graph endpoints. Answers 202 with the job to check.
+        """
+
+        serializer = JobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operation = serializer.validated_data["operation"]
+        uid = serializer.validated_data["container"].hex
+        container = atomic(get_node_or_404)(Container.nodes, uid=uid)
+
+        if operation == "delete":
+            job = atomic(self.manager.delete)(container)
+        else:
+            # batches of the clear run in transactions of their own
+            job = self.writer.submit(
+                container.uid,
+                lambda: self.manager.clear(container),
+                transaction=False,
+                job=Job(container=container.uid, kind=operation),
+            )
+
+        return SuccessResponse(
+            data={"job": job.to_dict()}, http_status=status.HTTP_202_ACCEPTED
+        )
+
+
+class JobDetailView(JobQueueMixin, APIView):
+    """Retrieve the status of a background job or cancel it."""
+
+    http_method_names = ["get", "delete"]
+    permission_classes = (AllowAny,)
+
+    def get(self, request: Request, pk: uuid.UUID):
+        """Read the status of a job."""
+
+        job = get_or_404(self.writer.get(pk.hex))
+
+        return SuccessResponse(data={"job": job.to_dict()})
+
+    def delete(self, request: Request, pk: uuid.UUID):
+        """Cancel a job.
+
+        A queued job is cancelled at once, a running one when it reports
+        progress next time. Answers 409 if the job is finished or cannot
+        be stopped: deletions, and running writes of a single
+        transaction, which never report progress.
+        """
+
+        get_or_404(self.writer.get(pk.hex))
+
+        if not self.writer.cancel(pk.hex):
+            raise JobNotCancellable
+
+        return SuccessResponse(
+            data={"job": self.writer.get(pk.hex).to_dict()},
+            http_status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class JobProgressView(JobQueueMixin, APIView):
+    """Retrieve the status and progress of a background job."""
+
+    http_method_names = ["get"]
+    permission_classes = (AllowAny,)
+
+    def get(self, request: Request, pk: uuid.UUID):
+        """Read the status and progress of a job, for frequent polling."""
+
+        job = get_or_404(self.writer.get(pk.hex))
+
+        return SuccessResponse(data={"status": job.status, "progress": job.progress})
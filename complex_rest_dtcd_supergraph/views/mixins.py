@@ -1,9 +1,21 @@
 import logging
 
+from rest_framework.exceptions import ValidationError
+
+from .. import settings
+from ..bulk import InvalidGraph, Validator
+from ..jobs import Job, WriteQueue, get_write_queue
+from ..models import Container
+from ..settings import KEYS
+from ..serializers import ContentSerializer
+from ..streams import StreamError, iter_content, iter_ndjson
+from ..transactions import atomic, on_commit
 from .shortcuts import to_content_or_400, replace_or_400
 
 logger = logging.getLogger("supergraph")
 
+NDJSON = "application/x-ndjson"
+
 
 class ContainerManagementMixin:
     """Provides `read` and `replace` methods for working with container
@@ -13,6 +25,12 @@ class ContainerManagementMixin:
     converter = None
     manager = None
 
+    @property
+    def writer(self) -> WriteQueue:
+        """Queue of asynchronous writes, created on first use."""
+
+        return get_write_queue()
+
     def read(self, container) -> dict:
         """Read container's content as Python primitives in correct format.
 
@@ -26,6 +44,18 @@ class ContainerManagementMixin:
 
         return data
 
+    def represent(self, data: dict) -> dict:
+        """Return a representation of graph data for the response.
+
+        In pass-through mode the data contains pre-encoded JSON parts,
+        we leave it to the renderer.
+        """
+
+        if self.converter.passthrough:
+            return data
+
+        return ContentSerializer(instance=data).data
+
     def replace(self, container, data: dict):
         """Replace container's content with new one.
 
@@ -36,3 +66,87 @@ class ContainerManagementMixin:
         new_content = to_content_or_400(self.converter, data)
         logger.info("Converted to content: " + new_content.info)
         replace_or_400(self.manager, container, new_content)
+
+    @staticmethod
+    def is_stream(request) -> bool:
+        """Whether the request carries graph data as NDJSON."""
+
+        return request.content_type.split(";")[0].strip() == NDJSON
+
+    def replace_stream(self, container, stream):
+        """Replace container's content with NDJSON graph data read from
+        a stream.
+
+        Objects are validated one by one and written in parts as they
+        are read, see `Manager.replace_stream`. Must not be called
+        inside a transaction.
+        """
+
+        items = Validator().stream(iter_ndjson(stream or []))
+        parts = iter_content(items, self.converter, settings.CHUNK_SIZE)
+
+        try:
+            self.manager.replace_stream(container, parts)
+        except (InvalidGraph, StreamError) as e:
+            raise ValidationError({"graph": [str(e)]})
+
+    @staticmethod
+    def is_large(data: dict) -> bool:
+        """Whether graph data is large enough to be written in chunks."""
+
+        if not settings.CHUNK_THRESHOLD:
+            return False
+
+        count = sum(len(data[key]) for key in (KEYS.nodes, KEYS.edges, KEYS.groups))
+
+        return count >= settings.CHUNK_THRESHOLD
+
+    def replace_later(self, container, data: dict, then=None) -> Job:
+        """Queue replacement of container's content, return the job.
+
+        The data is converted right away, so conversion errors are
+        reported to the client. `then` is called after the replacement
+        in the same transaction. Large data is written in chunks, then
+        `then` runs in a transaction of its own.
+
+        The job is queued once the current transaction commits, so that
+        it neither runs before the commit nor is queued again on retry.
+        """
+
+        new_content = to_content_or_400(self.converter, data)
+        logger.info("Converted to content: " + new_content.info)
+        manager = self.manager
+
+        def check():
+            if Container.nodes.get_or_none(uid=container.uid) is None:
+                raise LookupError(f"Container {container.uid} no longer exists.")
+
+        def write():
+            check()
+            manager.replace(container, new_content)
+
+            if then is not None:
+                then()
+
+        def write_chunked():
+            atomic(check)()
+            manager.replace_chunked(container, new_content)
+
+            if then is not None:
+                atomic(then)()
+
+        writer = self.writer
+
+        if self.is_large(data):
+            job = Job(container=container.uid)
+            on_commit(
+                lambda: writer.submit(
+                    container.uid, write_chunked, transaction=False, job=job
+                )
+            )
+        else:
+            # a single transaction has no progress reports to stop at
+            job = Job(container=container.uid, interruptible=False)
+            on_commit(lambda: writer.submit(container.uid, write, job=job))
+
+        return job
@@ -2,19 +2,52 @@
 Views for root management operations.
 """
 
+import base64
+import json
 import uuid
+from typing import Optional
 
-import neomodel
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.request import Request
 
 from rest.permissions import AllowAny
 from rest.response import SuccessResponse
 from rest.views import APIView
 
+from ..managers import Manager
 from ..models import Root
-from ..serializers import RootSerializer
-from .shortcuts import get_node_or_404
+from ..serializers import RootSerializer, RootSummarySerializer
+from ..settings import to_bool
+from ..transactions import atomic
+from .shortcuts import get_int_param, get_node_or_404
+
+
+def encode_cursor(after: list, sort: str) -> str:
+    """Return an opaque cursor of a page in a given sort order."""
+
+    data = json.dumps({"sort": sort, "after": after}).encode()
+
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: Optional[str], sort: str) -> Optional[list]:
+    """Return the position a cursor points to, raise `ValidationError`
+    if it is malformed or belongs to another sort order."""
+
+    if not cursor:
+        return None
+
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        valid = data["sort"] == sort and len(data["after"]) == 2
+    except (ValueError, TypeError, KeyError):
+        valid = False
+
+    if not valid:
+        raise ValidationError({"cursor": "Invalid cursor."})
+
+    return data["after"]
 
 
 class RootListView(APIView):
@@ -23,17 +56,46 @@ class RootListView(APIView):
     http_method_names = ["get", "post"]
     permission_classes = (AllowAny,)
     serializer_class = RootSerializer
+    page_size = 1000
 
-    @neomodel.db.transaction
+    @atomic
     def get(self, request: Request):
-        """Read a list of existing roots."""
+        """Read a page of roots with their fragments.
+
+        Query parameters:
 
-        roots = list(Root.nodes)
-        serializer = self.serializer_class(roots, many=True)
+        - `sort`: `name` (default), `id`, or either with `-` for the
+          descending order,
+        - `limit`: roots per page, at most `page_size`,
+        - `cursor`: `next` cursor of the previous page,
+        - `counts`: add the numbers of vertices and groups.
 
-        return SuccessResponse({"roots": serializer.data})
+        Roots, fragments and counts are read in one query.
+        """
 
-    @neomodel.db.transaction
+        sort = request.query_params.get("sort", "name")
+
+        if sort not in Root.SORTS:
+            raise ValidationError({"sort": f"Must be one of: {', '.join(Root.SORTS)}."})
+
+        limit = get_int_param(request, "limit", self.page_size)
+        limit = min(limit, self.page_size) or self.page_size
+        after = decode_cursor(request.query_params.get("cursor"), sort)
+        counts = to_bool(request.query_params.get("counts", False))
+
+        # one more root tells whether there is a next page
+        roots = Root.page(sort, after, limit + 1, counts)
+        next_ = None
+
+        if len(roots) > limit:
+            roots = roots[:limit]
+            next_ = encode_cursor(Root.cursor(sort, roots[-1]), sort)
+
+        serializer = RootSummarySerializer(roots, many=True)
+
+        return SuccessResponse({"roots": serializer.data, "next": next_})
+
+    @atomic
     def post(self, request: Request):
         """Create a new root."""
 
@@ -53,8 +115,9 @@ class RootDetailView(APIView):
     http_method_names = ["get", "put", "delete"]
     permission_classes = (AllowAny,)
     serializer_class = RootSerializer
+    manager = Manager()
 
-    @neomodel.db.transaction
+    @atomic
     def get(self, request: Request, pk: uuid.UUID):
         """Return a root."""
 
@@ -63,7 +126,7 @@ class RootDetailView(APIView):
 
         return SuccessResponse({"root": serializer.data})
 
-    @neomodel.db.transaction
+    @atomic
     def put(self, request: Request, pk: uuid.UUID):
         """Update a fragment."""
 
@@ -74,11 +137,17 @@ class RootDetailView(APIView):
 
         return SuccessResponse({"root": serializer.data})
 
-    @neomodel.db.transaction
+    @atomic
     def delete(self, request: Request, pk: uuid.UUID):
-        """Delete a fragment and its content."""
+        """Delete a root with its fragments and content.
+
+        The root is gone at once, the content is deleted in background;
+        answers 202 with a job to check.
+        """
 
         root = get_node_or_404(Root.nodes, uid=pk.hex)
-        root.delete()
+        job = self.manager.delete(root)
 
-        return SuccessResponse()
+        return SuccessResponse(
+            data={"job": job.to_dict()}, http_status=status.HTTP_202_ACCEPTED
+        )
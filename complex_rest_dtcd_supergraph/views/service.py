@@ -1,9 +1,13 @@
-import neomodel
+from rest_framework import status
 
 from rest.permissions import AllowAny
 from rest.response import SuccessResponse
 from rest.views import APIView
 
+from .. import metrics
+from ..deletion import get_deleter
+from ..transactions import atomic
+
 
 class ResetNeo4jView(APIView):
     """A view to reset Neo4j database."""
@@ -11,10 +15,31 @@ class ResetNeo4jView(APIView):
     http_method_names = ["post"]
     permission_classes = (AllowAny,)
 
-    @neomodel.db.transaction
+    @atomic
     def post(self, request, *args, **kwargs):
-        """Delete all nodes and relationships from Neo4j database."""
+        """Delete all roots and fragments with their content.
+
+        Containers are gone at once, the content is deleted in background
+        in batches; answers 202 with the jobs to check. The last job also
+        deletes vertices, ports and groups no container holds, so the
+        database ends up empty.
+        """
+
+        jobs = get_deleter().delete_all_later()
+
+        return SuccessResponse(
+            data={"jobs": [job.to_dict() for job in jobs]},
+            http_status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class MetricsView(APIView):
+    """A view to read plugin's counters."""
+
+    http_method_names = ["get"]
+    permission_classes = (AllowAny,)
 
-        neomodel.clear_neo4j_database(neomodel.db)
+    def get(self, request, *args, **kwargs):
+        """Return current values of counters, e.g. transaction retries."""
 
-        return SuccessResponse()
+        return SuccessResponse({"metrics": metrics.snapshot()})
@@ -2,9 +2,11 @@ import logging
 from typing import Union
 
 import neomodel
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
 
 from ..exceptions import LoadingError, ManagerError
+from ..transactions import is_transient
 
 
 logger = logging.getLogger("supergraph")
@@ -26,6 +28,30 @@ def get_node_or_404(
         raise NotFound
 
 
+def get_or_404(obj):
+    """Return the object, raise `rest_framework.exceptions.NotFound` if
+    it is `None`."""
+
+    if obj is None:
+        raise NotFound
+
+    return obj
+
+
+def get_int_param(request: Request, name: str, default: int) -> int:
+    """Return a non-negative integer query parameter."""
+
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise ValidationError({name: "Must be an integer."})
+
+    if value < 0:
+        raise ValidationError({name: "Must be non-negative."})
+
+    return value
+
+
 def func_or_400(func, *args, exception=None, **kwargs):
     try:
         return func(*args, **kwargs)
@@ -53,12 +79,16 @@ def replace_or_400(manager, container, new_content):
     """Try to use the manager to replace the content of a container with new one.
 
     Calls `manager.replace(container, content)` and returns the result.
-    Raises `Manager` on exception and logs it.
+    Raises `Manager` on exception and logs it. Transient database errors
+    are re-raised as is, so that the transaction can be retried.
     """
 
     # FIXME too broad of an exception
     try:
         return manager.replace(container, new_content)
     except Exception as e:
+        if is_transient(e):
+            raise
+
         logger.error("Manager error: \n" + str(e))
         raise ManagerError
@@ -0,0 +1,49 @@
+"""
+Views for size statistics of graph content of roots and fragments.
+"""
+
+from dataclasses import asdict
+
+from rest_framework.request import Request
+
+from rest.permissions import AllowAny
+from rest.response import SuccessResponse
+from rest.views import APIView
+
+from ..managers import Manager
+from ..models import Root
+from ..transactions import atomic
+from .fragments import get_fragment_from_root_or_404
+from .shortcuts import get_node_or_404
+
+
+class RootGraphStatsView(APIView):
+    """Read size statistics of graph content of a root.
+
+    Statistics are aggregated in the database without reading the
+    content, and cached until the next write.
+    """
+
+    http_method_names = ["get"]
+    permission_classes = (AllowAny,)
+    manager = Manager()
+
+    def get_container(self, **kwargs):
+        return get_node_or_404(Root.nodes, uid=kwargs["pk"].hex)
+
+    @atomic
+    def get(self, request: Request, **kwargs):
+        """Read the numbers of vertices, ports, edges and groups, vertex
+        degrees and the size of stored metadata."""
+
+        container = self.get_container(**kwargs)
+        stats = self.manager.stats(container)
+
+        return SuccessResponse({"stats": asdict(stats)})
+
+
+class RootFragmentGraphStatsView(RootGraphStatsView):
+    """Read size statistics of graph content of this root's fragment."""
+
+    def get_container(self, **kwargs):
+        return get_fragment_from_root_or_404(kwargs["root_pk"], kwargs["fragment_pk"])
@@ -0,0 +1,260 @@
+"""
+Views for resumable uploads of graph content of roots and fragments.
+
+1. `POST` to `graph/uploads` of a root or a fragment starts an upload
+   of a given number of chunks.
+2. `PUT` each chunk to `uploads/<id>/chunks/<index>`, in any order,
+   again if it failed. `GET uploads/<id>` tells which chunks are
+   missing.
+3. `POST uploads/<id>/commit` validates the joined chunks and replaces
+   the content in a background job.
+"""
+
+import io
+import uuid
+from itertools import chain
+
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+
+from rest.permissions import AllowAny
+from rest.response import SuccessResponse
+from rest.views import APIView
+
+from .. import jobs, settings
+from ..bulk import Validator
+from ..converters import GraphDataConverter
+from ..exceptions import ChunkTooLarge, UploadInProgress
+from ..jobs import Job, WriteQueue, get_write_queue
+from ..managers import Manager
+from ..models import Root
+from ..serializers import UploadSerializer
+from ..settings import KEYS
+from ..streams import FORMATS, iter_content
+from ..transactions import atomic
+from ..uploads import ChunkError, Upload, UploadStore, get_upload_store
+from .fragments import get_fragment_from_root_or_404
+from .shortcuts import get_node_or_404, get_or_404
+
+
+def represent(store, upload: Upload) -> dict:
+    return dict(
+        upload.to_dict(),
+        received=store.received(upload),
+        missing=store.missing(upload),
+    )
+
+
+def is_committing(upload: Upload) -> bool:
+    """Whether the commit job of the upload has not finished yet."""
+
+    job = upload.job and get_write_queue().get(upload.job)
+
+    return bool(job) and not job.is_finished
+
+
+class UploadStoreMixin:
+    """Provides the shared store of uploads, created on first use."""
+
+    @property
+    def store(self) -> UploadStore:
+        return get_upload_store()
+
+
+class RootGraphUploadView(UploadStoreMixin, APIView):
+    """Start an upload of graph content of a root."""
+
+    http_method_names = ["post"]
+    permission_classes = (AllowAny,)
+
+    def get_upload(self, data: dict, **kwargs) -> Upload:
+        root = get_node_or_404(Root.nodes, uid=kwargs["pk"].hex)
+
+        return Upload(root=root.uid, **data)
+
+    def post(self, request: Request, **kwargs):
+        """Start an upload of `chunks` chunks of a graph file in `json`
+        (default) or `ndjson` format."""
+
+        serializer = UploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = atomic(self.get_upload)(serializer.validated_data, **kwargs)
+        self.store.create(upload)
+
+        return SuccessResponse(
+            data={"upload": represent(self.store, upload)},
+            http_status=status.HTTP_201_CREATED,
+        )
+
+
+class RootFragmentGraphUploadView(RootGraphUploadView):
+    """Start an upload of graph content of this root's fragment."""
+
+    def get_upload(self, data: dict, **kwargs) -> Upload:
+        fragment = get_fragment_from_root_or_404(
+            kwargs["root_pk"], kwargs["fragment_pk"]
+        )
+
+        return Upload(root=kwargs["root_pk"].hex, fragment=fragment.uid, **data)
+
+
+class UploadDetailView(UploadStoreMixin, APIView):
+    """Check which chunks of an upload are received, or abort it."""
+
+    http_method_names = ["get", "delete"]
+    permission_classes = (AllowAny,)
+
+    def get(self, request: Request, pk: uuid.UUID):
+        """Read the upload with indices of `received` and `missing` chunks.
+
+        Expired uploads are removed first.
+        """
+
+        self.store.expire()
+        upload = get_or_404(self.store.get(pk.hex))
+
+        return SuccessResponse(data={"upload": represent(self.store, upload)})
+
+    def delete(self, request: Request, pk: uuid.UUID):
+        """Abort the upload, delete its chunks."""
+
+        upload = get_or_404(self.store.get(pk.hex))
+
+        if is_committing(upload):
+            raise UploadInProgress
+
+        self.store.delete(upload.uid)
+
+        return SuccessResponse()
+
+
+class UploadChunkView(UploadStoreMixin, APIView):
+    """Receive a chunk of an upload."""
+
+    http_method_names = ["put"]
+    permission_classes = (AllowAny,)
+
+    def put(self, request: Request, pk: uuid.UUID, index: int):
+        """Save the raw request body as the chunk with a given index.
+
+        The body is written to disk as it is read. A chunk cut short by
+        a dropped connection is discarded, and sending a chunk again
+        replaces it.
+        """
+
+        upload = get_or_404(self.store.get(pk.hex))
+
+        if index >= upload.chunks:
+            raise NotFound(f"The upload has {upload.chunks} chunks.")
+
+        if is_committing(upload):
+            raise UploadInProgress
+
+        length = request.META.get("CONTENT_LENGTH")
+        length = int(length) if length else None
+
+        if length is not None and length > settings.UPLOADS_MAX_CHUNK_SIZE:
+            raise ChunkTooLarge
+
+        try:
+            size = self.store.put_chunk(
+                upload,
+                index,
+                request.stream or io.BytesIO(),
+                settings.UPLOADS_MAX_CHUNK_SIZE,
+                length,
+            )
+        except ChunkError as e:
+            raise ValidationError({"chunk": [str(e)]})
+
+        return SuccessResponse(data={"index": index, "size": size})
+
+
+class UploadCommitView(UploadStoreMixin, APIView):
+    """Replace graph content with the uploaded file in background."""
+
+    http_method_names = ["post"]
+    permission_classes = (AllowAny,)
+    converter = GraphDataConverter(passthrough=settings.META_PASSTHROUGH)
+    manager = Manager()
+
+    @property
+    def writer(self) -> WriteQueue:
+        return get_write_queue()
+
+    @staticmethod
+    def _key(uid: str) -> str:
+        # a later write to the container must not supersede the commit,
+        # or the upload would stay committing with its chunks on disk
+        return "upload:" + uid
+
+    def write(self, upload: Upload):
+        """Validate the uploaded file, then replace the content with it.
+
+        Runs in a background job. The file is read several times, only
+        IDs are kept in memory, see `bulk.Validator`. The upload is
+        deleted once written; after a failure it is kept, so that bad
+        chunks may be sent again.
+        """
+
+        root = atomic(get_node_or_404)(Root.nodes, uid=upload.root)
+        container = root
+
+        if upload.fragment is not None:
+            container = atomic(get_node_or_404)(root.fragments, uid=upload.fragment)
+
+        def items():
+            with self.store.open(upload) as f:
+                yield from FORMATS[upload.format](f)
+
+        validator = Validator()
+        validator.collect(items())
+        validator.check(items())
+        jobs.report(validated=sum(validator.counts.values()))
+
+        # edges after the nodes with their ports
+        ordered = chain(
+            (item for item in items() if item[0] != KEYS.edges),
+            (item for item in items() if item[0] == KEYS.edges),
+        )
+        parts = iter_content(ordered, self.converter, settings.CHUNK_SIZE)
+        self.manager.replace_stream(container, parts)
+
+        if container is not root:
+            atomic(self.manager.reconnect)(root, container)
+
+        self.store.delete(upload.uid)
+
+    def post(self, request: Request, pk: uuid.UUID):
+        """Commit the upload once all chunks are received.
+
+        Answers 202 with the job that validates and writes the content.
+        A repeated commit returns the same job while it runs. Expired
+        uploads are removed first.
+        """
+
+        self.store.expire()
+        upload = get_or_404(self.store.get(pk.hex))
+
+        if is_committing(upload):
+            job = self.writer.get(upload.job)
+        else:
+            missing = self.store.missing(upload)
+
+            if missing:
+                raise ValidationError({"missing": missing})
+
+            job = Job(container=upload.fragment or upload.root)
+            upload.job = job.uid
+            self.store.save(upload)
+            self.writer.submit(
+                self._key(upload.uid),
+                lambda: self.write(upload),
+                transaction=False,
+                job=job,
+            )
+
+        return SuccessResponse(
+            data={"job": job.to_dict()}, http_status=status.HTTP_202_ACCEPTED
+        )
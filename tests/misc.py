@@ -3,8 +3,13 @@ Helper module for tests.
 """
 
 import json
+from contextlib import nullcontext
 from operator import itemgetter
+from unittest import mock
 
+import neomodel
+
+from complex_rest_dtcd_supergraph import queries
 from complex_rest_dtcd_supergraph.settings import KEYS
 
 
@@ -45,3 +50,21 @@ def load_data(path) -> dict:
     sort_payload(data)
 
     return data
+
+
+def statements() -> dict:
+    """Return a mapping of names to Cypher statements from `queries`."""
+
+    return {
+        name: value
+        for name, value in vars(queries).items()
+        if name.isupper() and isinstance(value, str) and " " in value
+    }
+
+
+def no_transaction():
+    """Patch neomodel transactions with a no-op context manager."""
+
+    return mock.patch.object(
+        type(neomodel.db), "transaction", property(lambda self: nullcontext())
+    )
@@ -0,0 +1,215 @@
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from complex_rest_dtcd_supergraph.backends import InMemoryBackend, content_stats
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+
+from .misc import load_data, sort_payload
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+
+class TestInMemoryBackend(SimpleTestCase):
+    converter = GraphDataConverter()
+
+    def setUp(self) -> None:
+        self.backend = InMemoryBackend()
+        self.container = SimpleNamespace(uid="container")
+
+    def replace(self, data: dict, container=None, fingerprint=None):
+        container = container or self.container
+        self.backend.replace(container, self.converter.to_content(data), fingerprint)
+
+    def retrieve(self, container=None) -> dict:
+        container = container or self.container
+        data = self.converter.to_data(self.backend.read(container))
+        sort_payload(data)
+
+        return data
+
+    def assert_replace_retrieve_eq(self, data: dict):
+        sort_payload(data)
+        self.replace(data)
+        self.assertEqual(self.retrieve(), data)
+
+    def test_read_empty(self):
+        self.assertEqual(self.retrieve(), {"nodes": [], "edges": [], "groups": []})
+
+    def test_basic(self):
+        self.assert_replace_retrieve_eq(load_data(DATA_DIR / "basic.json"))
+
+    def test_sample(self):
+        self.assert_replace_retrieve_eq(load_data(DATA_DIR / "sample.json"))
+
+    def test_2vertices_2groups(self):
+        self.assert_replace_retrieve_eq(load_data(DATA_DIR / "2v-2g.json"))
+
+    def test_n50_e25(self):
+        self.assert_replace_retrieve_eq(load_data(DATA_DIR / "n50_e25.json"))
+
+    def test_replace_port_with_another(self):
+        path = DATA_DIR / "vertex-port.json"
+        self.replace(load_data(path))
+
+        new = load_data(path)
+        new["nodes"][0] = {
+            "primitiveID": "amy",
+            "initPorts": [{"primitiveID": "mobile"}, {"primitiveID": "laptop"}],
+        }
+        self.assert_replace_retrieve_eq(new)
+
+    def test_replace_edge_with_none(self):
+        path = DATA_DIR / "2v-1e.json"
+        self.replace(load_data(path))
+
+        new = load_data(path)
+        new["edges"] = []
+        self.assert_replace_retrieve_eq(new)
+
+    def test_replace_with_empty(self):
+        self.replace(load_data(DATA_DIR / "sample.json"))
+        self.assert_replace_retrieve_eq({"nodes": [], "edges": [], "groups": []})
+
+    def test_replace_stream(self):
+        self.replace(load_data(DATA_DIR / "2v-2g.json"))
+
+        data = load_data(DATA_DIR / "sample.json")
+        sort_payload(data)
+        parts = [
+            self.converter.to_content({"nodes": data["nodes"], "edges": []}),
+            self.converter.to_content({"nodes": [], "edges": data["edges"]}),
+        ]
+        self.backend.replace_stream(self.container, iter(parts))
+        self.assertEqual(self.retrieve(), data)
+
+    def test_read_returns_copies(self):
+        data = load_data(DATA_DIR / "vertex.json")
+        self.replace(data)
+        content = self.backend.read(self.container)
+        content.vertices[0].meta["nodeTitle"] = "changed"
+        self.assertEqual(self.retrieve(), data)
+
+    def test_reconnect(self):
+        data = load_data(DATA_DIR / "sample.json")
+        fragment = SimpleNamespace(uid="fragment")
+        self.replace(data, container=fragment)
+        self.backend.reconnect(self.container, fragment)
+        self.assertEqual(self.retrieve(), data)
+
+    def test_fragment_changes_after_reconnect(self):
+        fragment = SimpleNamespace(uid="fragment")
+        self.backend.reconnect(self.container, fragment)
+        data = load_data(DATA_DIR / "sample.json")
+        self.replace(data, container=fragment)
+        sort_payload(data)
+        self.assertEqual(self.retrieve(), data)
+
+    def test_root_replace_sees_fragment(self):
+        fragment = SimpleNamespace(uid="fragment")
+        self.backend.reconnect(self.container, fragment)
+        self.replace(load_data(DATA_DIR / "basic.json"), container=fragment)
+
+        new = load_data(DATA_DIR / "vertex.json")
+        self.assert_replace_retrieve_eq(new)
+        self.assertEqual(self.retrieve(fragment), new)
+
+    def test_root_write_back_leaves_fragment_content(self):
+        fragment = SimpleNamespace(uid="fragment")
+        self.backend.reconnect(self.container, fragment)
+        self.replace(load_data(DATA_DIR / "sample.json"), container=fragment)
+        data = self.retrieve()
+        self.replace(data)
+
+        # the fragment still holds its content alone
+        self.assertEqual(self.retrieve(), data)
+        self.assertEqual(self.backend._contains_vertex.successors("container"), set())
+        self.assertEqual(self.backend._contains_group.successors("container"), set())
+
+    def test_clear_parent(self):
+        fragment = SimpleNamespace(uid="fragment")
+        self.backend.reconnect(self.container, fragment)
+        self.replace(load_data(DATA_DIR / "sample.json"), container=fragment)
+        self.backend.clear(self.container)
+
+        empty = {"nodes": [], "edges": [], "groups": []}
+        self.assertEqual(self.retrieve(fragment), empty)
+
+    def test_clear(self):
+        data = load_data(DATA_DIR / "sample.json")
+        fragment = SimpleNamespace(uid="fragment")
+        self.replace(data, container=fragment)
+        self.backend.reconnect(self.container, fragment)
+        self.backend.clear(fragment)
+
+        # deleted entities disappear from all containers
+        empty = {"nodes": [], "edges": [], "groups": []}
+        self.assertEqual(self.retrieve(fragment), empty)
+        self.assertEqual(self.retrieve(), empty)
+
+    def test_fingerprint(self):
+        self.assertFalse(self.backend.matches(self.container, "a"))
+        self.replace(load_data(DATA_DIR / "sample.json"), fingerprint="a")
+        self.assertTrue(self.backend.matches(self.container, "a"))
+        self.assertFalse(self.backend.matches(self.container, "b"))
+
+        self.backend.clear(self.container)
+        self.assertFalse(self.backend.matches(self.container, "a"))
+
+    def test_fragment_write_changes_root_fingerprint(self):
+        fragment = SimpleNamespace(uid="fragment")
+        self.backend.reconnect(self.container, fragment)
+        self.replace(load_data(DATA_DIR / "basic.json"), fingerprint="root")
+        self.assertTrue(self.backend.matches(self.container, "root"))
+
+        self.replace(load_data(DATA_DIR / "sample.json"), fragment, "fragment")
+        self.assertTrue(self.backend.matches(fragment, "fragment"))
+        self.assertFalse(self.backend.matches(self.container, "root"))
+
+    def test_shared_write_changes_fingerprint(self):
+        data = load_data(DATA_DIR / "sample.json")
+        first, second = SimpleNamespace(uid="first"), SimpleNamespace(uid="second")
+        self.replace(data, first, "data")
+        self.replace(data, second, "data")
+        self.assertFalse(self.backend.matches(first, "data"))
+
+        self.replace({"nodes": [], "edges": [], "groups": []}, second, "empty")
+        self.assertFalse(self.backend.matches(first, "data"))
+
+    def test_version(self):
+        self.assertIsNone(self.backend.version(self.container))
+        self.replace(load_data(DATA_DIR / "basic.json"), fingerprint="a")
+        version = self.backend.version(self.container)
+        self.assertIsNotNone(version)
+
+        # unknown until a new fragment is written
+        fragment = SimpleNamespace(uid="fragment")
+        self.backend.reconnect(self.container, fragment)
+        self.assertIsNone(self.backend.version(self.container))
+
+        self.replace(load_data(DATA_DIR / "sample.json"), fragment)
+        self.assertNotIn(self.backend.version(self.container), (None, version))
+
+    def test_stats(self):
+        data = load_data(DATA_DIR / "2v-1e.json")
+        self.replace(data)
+        stats = self.backend.stats(self.container)
+
+        self.assertEqual((stats.vertices, stats.edges, stats.groups), (2, 1, 0))
+        self.assertEqual((stats.min_degree, stats.max_degree), (1, 1))
+        self.assertEqual(stats.mean_degree, 1.0)
+        self.assertGreater(stats.meta_size, 0)
+
+    def test_stats_of_empty(self):
+        empty = self.converter.to_content({"nodes": [], "edges": [], "groups": []})
+        stats = content_stats(empty)
+        self.assertEqual(stats.vertices, 0)
+        self.assertEqual(stats.mean_degree, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import neomodel
+from django.test import SimpleTestCase, tag
+
+from complex_rest_dtcd_supergraph import bulk
+from complex_rest_dtcd_supergraph.bulk import (
+    BulkImporter,
+    InvalidGraph,
+    Validator,
+    batches,
+    prepare,
+)
+from complex_rest_dtcd_supergraph.meta import MetaTemplates
+from complex_rest_dtcd_supergraph.settings import KEYS
+from complex_rest_dtcd_supergraph.stores import MetaStore
+from complex_rest_dtcd_supergraph.streams import COLLECTIONS
+
+from .misc import load_data, sort_payload
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+
+def flatten(data: dict) -> list:
+    return [(key, obj) for key in COLLECTIONS for obj in data.get(key, [])]
+
+
+class TestValidator(SimpleTestCase):
+    def setUp(self) -> None:
+        self.data = load_data(DATA_DIR / "sample.json")
+
+    def validate(self, data: dict):
+        validator = Validator()
+        validator.collect(flatten(data))
+        validator.check(flatten(data))
+
+        return validator
+
+    def test_valid(self):
+        validator = self.validate(self.data)
+        self.assertEqual(validator.counts[KEYS.nodes], len(self.data[KEYS.nodes]))
+        self.assertEqual(len(validator.edge_ids), 0)
+
+    def test_missing_id(self):
+        del self.data[KEYS.nodes][1][KEYS.yfiles_id]
+
+        with self.assertRaisesRegex(InvalidGraph, r"nodes\[1\]"):
+            self.validate(self.data)
+
+    def test_duplicated_id(self):
+        self.data[KEYS.nodes].append(self.data[KEYS.nodes][0])
+
+        with self.assertRaisesRegex(InvalidGraph, "duplicated"):
+            self.validate(self.data)
+
+    def test_missing_port(self):
+        self.data[KEYS.edges][0][KEYS.source_port] = "missing"
+
+        with self.assertRaisesRegex(InvalidGraph, r"edges\[0\]: \[missing\]"):
+            self.validate(self.data)
+
+    def test_missing_parent_group(self):
+        self.data[KEYS.nodes][0][KEYS.parent_id] = "missing"
+
+        with self.assertRaisesRegex(InvalidGraph, "missing"):
+            self.validate(self.data)
+
+    def test_stream(self):
+        items = flatten(self.data)
+        self.assertEqual(list(Validator().stream(items)), items)
+
+    def test_stream_refers_to_later_object(self):
+        # edges before nodes
+        items = flatten(self.data)[::-1]
+
+        with self.assertRaisesRegex(InvalidGraph, r"edges\[0\].*does not exist"):
+            list(Validator().stream(items))
+
+    def test_stream_duplicated_edge(self):
+        items = flatten(self.data) + [(KEYS.edges, self.data[KEYS.edges][0])]
+
+        with self.assertRaisesRegex(InvalidGraph, "duplicated"):
+            list(Validator().stream(items))
+
+
+class TestBatches(SimpleTestCase):
+    def test_batches(self):
+        items = [("nodes", 1), ("nodes", 2), ("nodes", 3), ("edges", 4), ("nodes", 5)]
+        self.assertEqual(
+            list(batches(items, 2)),
+            [("nodes", [1, 2]), ("nodes", [3]), ("edges", [4]), ("nodes", [5])],
+        )
+
+
+class TestPrepare(SimpleTestCase):
+    def test_nodes(self):
+        data = load_data(DATA_DIR / "sample.json")
+        rows = prepare(KEYS.nodes, data[KEYS.nodes], passthrough=False)
+        ports = sum(len(node.get(KEYS.init_ports, [])) for node in data[KEYS.nodes])
+
+        self.assertEqual(len(rows["vertices"]), len(data[KEYS.nodes]))
+        self.assertEqual(len(rows["ports"]), ports)
+
+        for row in rows["vertices"]:
+            self.assertEqual(row["properties"]["uid"], row["uid"])
+            self.assertIsInstance(row["properties"]["meta_"], str)
+
+    def test_edges(self):
+        data = load_data(DATA_DIR / "sample.json")
+        rows = prepare(KEYS.edges, data[KEYS.edges], passthrough=True)
+        edge = data[KEYS.edges][0]
+
+        self.assertEqual(rows["edges"][0]["start"], edge[KEYS.source_port])
+        self.assertIsInstance(rows["edges"][0]["meta"], str)
+
+    def test_templates(self):
+        data = load_data(DATA_DIR / "sample.json")
+        templates = MetaTemplates(MetaStore(":memory:"), keys=("primitiveName",))
+        bulk._get_meta.cache_clear()
+        self.addCleanup(bulk._get_meta.cache_clear)
+
+        with mock.patch.object(bulk, "get_templates", return_value=templates):
+            rows = prepare(KEYS.nodes, data[KEYS.nodes], passthrough=False)
+
+        for row in rows["vertices"]:
+            self.assertNotIn("primitiveName", json.loads(row["properties"]["meta_"]))
+
+
+@tag("neo4j")
+class TestBulkImporter(SimpleTestCase):
+    def setUp(self) -> None:
+        neomodel.clear_neo4j_database(neomodel.db)
+
+    def tearDown(self) -> None:
+        neomodel.clear_neo4j_database(neomodel.db)
+
+    def test_import(self):
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Manager
+        from complex_rest_dtcd_supergraph.models import Fragment, Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        data = load_data(DATA_DIR / "n50_e25.json")
+        root = Root(name="root").save()
+        fragment = Fragment(name="fragment").save()
+        root.fragments.connect(fragment)
+
+        importer = BulkImporter(fragment, batch_size=7)
+        stats = importer.run(lambda: iter(flatten(data)))
+        self.assertEqual(stats.counts[KEYS.nodes], len(data[KEYS.nodes]))
+        self.assertGreater(stats.batches, 2)
+
+        converter = GraphDataConverter()
+
+        for container in (fragment, root):
+            content = atomic(Manager().read)(container)
+            result = converter.to_data(content)
+            sort_payload(result)
+            sort_payload(data)
+            self.assertEqual(result, data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from complex_rest_dtcd_supergraph.changes import ChangeLog
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+from complex_rest_dtcd_supergraph.stores import ChangeStore
+
+from .misc import load_data, sort_payload
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+EMPTY = {"nodes": [], "edges": [], "groups": []}
+TTL = 60 * 60
+
+
+def apply(state: dict, changes: list):
+    """Apply changes to a mapping of (collection, id) to objects."""
+
+    for change in changes:
+        key = change["collection"], json.dumps(change["id"])
+
+        if change["data"] is None:
+            state.pop(key, None)
+        else:
+            state[key] = json.loads(change["data"])
+
+
+def to_graph(state: dict) -> dict:
+    graph = {"nodes": [], "edges": [], "groups": []}
+
+    for (collection, _), item in state.items():
+        graph[collection].append(item)
+
+    sort_payload(graph)
+
+    return graph
+
+
+class TestChangeLog(SimpleTestCase):
+    converter = GraphDataConverter()
+    container = "container"
+
+    def setUp(self) -> None:
+        self.store = ChangeStore(":memory:")
+        self.changelog = ChangeLog(self.store, tombstone_ttl=TTL)
+
+    def record(self, data: dict, container=None):
+        content = self.converter.to_content(data)
+        self.changelog.record(container or self.container, content)
+
+    def sync(self, state: dict, since: int, feed=None, limit=1000) -> int:
+        """Apply all changes since a given number, return the last one."""
+
+        while True:
+            result = self.changelog.since(feed or self.container, since, limit)
+            apply(state, result["changes"])
+            since = result["last"]
+
+            if not result["more"]:
+                return since
+
+    def test_sync(self):
+        state = {}
+        since = 0
+
+        for name in ("sample.json", "n25_e25.json", "n50_e25.json", "basic.json"):
+            data = load_data(DATA_DIR / name)
+            self.record(data)
+            since = self.sync(state, since, limit=7)
+            sort_payload(data)
+            self.assertEqual(to_graph(state), data)
+
+    def test_concurrent_records(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.changelog = ChangeLog(
+            ChangeStore(Path(directory.name) / "c.sqlite3"), tombstone_ttl=TTL
+        )
+        data = load_data(DATA_DIR / "n25_e25.json")
+        variants = [dict(data, nodes=data["nodes"][i:], edges=[]) for i in range(8)]
+        records, errors = [], []
+
+        def record(variant):
+            content = self.converter.to_content(variant)
+
+            try:
+                seq, _ = self.changelog.record(self.container, content)
+                records.append((seq, variant))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=record, args=(v,)) for v in variants]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+        # the feed ends with the content recorded last
+        _, last = max(records, key=lambda record: record[0])
+        state = {}
+        self.sync(state, 0)
+        sort_payload(last)
+        self.assertEqual(to_graph(state), last)
+
+    def test_changes_only(self):
+        data = load_data(DATA_DIR / "n25_e25.json")
+        self.record(data)
+        last = self.changelog.since(self.container, 0, 1000)["last"]
+
+        data["nodes"][0]["nodeTitle"] = "changed"
+        removed = data["edges"].pop()
+        self.record(data)
+        changes = self.changelog.since(self.container, last, 1000)["changes"]
+
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(changes[0]["id"], data["nodes"][0]["primitiveID"])
+        self.assertEqual(
+            changes[1]["id"], [removed["sourcePort"], removed["targetPort"]]
+        )
+        self.assertIsNone(changes[1]["data"])
+
+    def test_unchanged(self):
+        data = load_data(DATA_DIR / "sample.json")
+        self.record(data)
+        last = self.changelog.since(self.container, 0, 1000)["last"]
+        self.record(data)
+        result = self.changelog.since(self.container, last, 1000)
+        self.assertEqual(result["changes"], [])
+        self.assertEqual(result["last"], last)
+
+    def test_compaction(self):
+        data = load_data(DATA_DIR / "sample.json")
+
+        for i in range(5):
+            data["nodes"][0]["nodeTitle"] = str(i)
+            self.record(data)
+
+        changes = self.changelog.since(self.container, 0, 1000)["changes"]
+        count = len(data["nodes"]) + len(data["edges"]) + len(data["groups"])
+        self.assertEqual(len(changes), count)
+
+    def test_expired_tombstones(self):
+        self.changelog.tombstone_ttl = 0
+        self.record(load_data(DATA_DIR / "sample.json"))
+        last = self.changelog.since(self.container, 0, 1000)["last"]
+        self.record(EMPTY)
+        self.record(EMPTY)  # purges tombstones of the previous record
+
+        with self.assertRaises(LookupError):
+            self.changelog.since(self.container, last, 1000)
+
+        # from scratch is fine
+        self.assertEqual(self.changelog.since(self.container, 0, 1000)["changes"], [])
+
+    def test_linked_feed(self):
+        root, fragment = "root", "fragment"
+        self.changelog.link(root, fragment)
+        self.record(load_data(DATA_DIR / "basic.json"), container=root)
+        data = load_data(DATA_DIR / "sample.json")
+        self.record(data, container=fragment)
+
+        state = {}
+        since = self.sync(state, 0, feed=root)
+        self.record(EMPTY, container=fragment)
+        self.sync(state, since, feed=root)
+
+        basic = load_data(DATA_DIR / "basic.json")
+        sort_payload(basic)
+        self.assertEqual(to_graph(state), basic)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from complex_rest_dtcd_supergraph.chunks import ChunkSizer, split
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+from complex_rest_dtcd_supergraph.history import encode
+from complex_rest_dtcd_supergraph.stores import StagingStore
+
+from .misc import load_data
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+
+class TestSplit(SimpleTestCase):
+    converter = GraphDataConverter()
+
+    def setUp(self) -> None:
+        self.content = self.converter.to_content(load_data(DATA_DIR / "n50_e25.json"))
+
+    def test_chunks_cover_content(self):
+        sizer = ChunkSizer(size=7, min_size=1, max_size=100, target_latency=1)
+        vertices, edges, groups = [], [], []
+
+        for chunk in split(self.content, sizer):
+            vertices.extend(v.uid for v in chunk.vertices)
+            edges.extend(e.uid for e in chunk.edges)
+            groups.extend(g.uid for g in chunk.groups)
+
+        self.assertEqual(vertices, [v.uid for v in self.content.vertices])
+        self.assertEqual(edges, [e.uid for e in self.content.edges])
+        self.assertEqual(groups, [g.uid for g in self.content.groups])
+
+    def test_chunks_are_self_contained(self):
+        sizer = ChunkSizer(size=7, min_size=1, max_size=100, target_latency=1)
+
+        for chunk in split(self.content, sizer):
+            ports = set(p.uid for p in chunk.ports)
+
+            for vertex in chunk.vertices:
+                self.assertLessEqual(vertex.ports, ports)
+
+            for edge in chunk.edges:
+                self.assertIn(edge.start, ports)
+                self.assertIn(edge.end, ports)
+
+    def test_size_is_looked_up_per_chunk(self):
+        sizer = ChunkSizer(size=10, min_size=1, max_size=100, target_latency=1)
+        sizes = []
+
+        for chunk in split(self.content, sizer):
+            sizes.append(chunk.size)
+            sizer.size = 100
+
+        self.assertLess(sizes[0], 20)
+        self.assertGreaterEqual(sizes[1], 100)
+
+
+class TestChunkSizer(SimpleTestCase):
+    def setUp(self) -> None:
+        self.sizer = ChunkSizer(size=100, min_size=10, max_size=1000, target_latency=1)
+
+    def test_grow(self):
+        self.sizer.observe(100, 0.1)
+        self.assertEqual(self.sizer.size, 200)
+
+    def test_shrink(self):
+        self.sizer.observe(100, 1.25)
+        self.assertEqual(self.sizer.size, 80)
+        self.sizer.observe(80, 10)
+        self.assertEqual(self.sizer.size, 40)
+
+    def test_limits(self):
+        for _ in range(10):
+            self.sizer.observe(self.sizer.size, 0)
+
+        self.assertEqual(self.sizer.size, 1000)
+
+        for _ in range(10):
+            self.sizer.observe(self.sizer.size, 100)
+
+        self.assertEqual(self.sizer.size, 10)
+
+    def test_incomplete_chunk_is_ignored(self):
+        self.sizer.observe(5, 10)
+        self.assertEqual(self.sizer.size, 100)
+
+
+class TestStagingStore(SimpleTestCase):
+    converter = GraphDataConverter()
+
+    def setUp(self) -> None:
+        self.store = StagingStore(":memory:")
+
+    def test_put_get(self):
+        content = self.converter.to_content(load_data(DATA_DIR / "sample.json"))
+        records = encode(content)
+        self.store.put("t", "a", records)
+        self.store.put("t", "b", {})
+
+        self.assertEqual(self.store.get("t", "a"), records)
+        self.assertEqual(self.store.get("t", "b"), {})
+        self.assertIsNone(self.store.get("t", "c"))
+        self.assertEqual(sorted(self.store.containers("t")), ["a", "b"])
+
+    def test_drop(self):
+        self.store.put("t", "a", {"vertex:v": "{}"})
+        self.store.put("u", "a", {"vertex:v": "{}"})
+        self.store.drop("t")
+
+        self.assertIsNone(self.store.get("t", "a"))
+        self.assertEqual(self.store.containers("t"), [])
+        self.assertIsNotNone(self.store.get("u", "a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
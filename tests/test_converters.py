@@ -4,7 +4,9 @@ from pathlib import Path
 
 from django.test import SimpleTestCase
 
-from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter, splice
+from complex_rest_dtcd_supergraph.renderers import PassThroughJSONRenderer
+from complex_rest_dtcd_supergraph.structures import RawJSON
 
 from .misc import load_data, sort_payload
 
@@ -53,5 +55,50 @@ class TestGraphDataConverter(SimpleTestCase):
         self._check_to_content_to_data_from_json(DATA_DIR / "graph-sample-large.json")
 
 
+class TestPassThroughGraphDataConverter(TestGraphDataConverter):
+    converter = GraphDataConverter(passthrough=True)
+    renderer = PassThroughJSONRenderer()
+
+    def _check_to_content_to_data(self, data):
+        sort_payload(data)
+        content = self.converter.to_content(data)
+        exported = self.converter.to_data(content)
+        exported = json.loads(self.renderer.render(exported))
+        sort_payload(exported)
+        self.assertEqual(exported, data)
+
+    def test_meta_encoded(self):
+        data = load_data(DATA_DIR / "basic.json")
+        content = self.converter.to_content(data)
+
+        for item in content.vertices + content.ports + content.edges:
+            self.assertIsInstance(item.meta, RawJSON)
+
+    def test_to_content_to_data_basic(self):
+        self._check_to_content_to_data(load_data(DATA_DIR / "basic.json"))
+
+    def test_to_content_to_data_vertex_port(self):
+        self._check_to_content_to_data(load_data(DATA_DIR / "vertex-port.json"))
+
+    def test_to_content_to_data_2v_2g(self):
+        self._check_to_content_to_data(load_data(DATA_DIR / "2v-2g.json"))
+
+    def test_splice(self):
+        data = {"a": RawJSON('{"b": 1}'), "c": [RawJSON("{}"), {"d": 2}]}
+        raw = splice(RawJSON(" {} "), data)
+        self.assertEqual(json.loads(raw), {"a": {"b": 1}, "c": [{}, {"d": 2}]})
+
+        raw = splice(RawJSON('{"x": null}'), {"y": "z"})
+        self.assertEqual(json.loads(raw), {"x": None, "y": "z"})
+
+    def test_render(self):
+        data = {"graph": {"nodes": [RawJSON('{"primitiveID": "n1"}')], "edges": []}}
+        rendered = self.renderer.render(data)
+        self.assertEqual(
+            json.loads(rendered),
+            {"graph": {"nodes": [{"primitiveID": "n1"}], "edges": []}},
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import neomodel
+from django.test import SimpleTestCase, tag
+
+from .misc import load_data
+
+# imports of models are deferred, see the note in `test_managers`
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+
+@tag("neo4j")
+class TestDeleter(SimpleTestCase):
+    def setUp(self) -> None:
+        from complex_rest_dtcd_supergraph.deletion import Deleter
+        from complex_rest_dtcd_supergraph.jobs import WriteQueue
+        from complex_rest_dtcd_supergraph.managers import Manager
+
+        neomodel.clear_neo4j_database(neomodel.db)
+        self.queue = WriteQueue()
+        self.deleter = Deleter(self.queue, batch_size=10)
+        self.manager = Manager()
+
+    def tearDown(self) -> None:
+        self.queue.join(30)
+        neomodel.clear_neo4j_database(neomodel.db)
+
+    def create(self, name: str, fragment_data: dict):
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.models import Fragment, Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        @atomic
+        def create():
+            root = Root(name=name).save()
+            fragment = Fragment(name=name).save()
+            root.fragments.connect(fragment)
+            content = GraphDataConverter().to_content(fragment_data)
+            self.manager.replace(fragment, content)
+
+            return root, fragment
+
+        return create()
+
+    def count(self, label: str) -> int:
+        rows, _ = neomodel.db.cypher_query(f"MATCH (n:{label}) RETURN count(n)")
+
+        return rows[0][0]
+
+    def test_delete_root(self):
+        from complex_rest_dtcd_supergraph import jobs
+        from complex_rest_dtcd_supergraph.models import Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        root, _ = self.create("root", load_data(DATA_DIR / "n50_e25.json"))
+        job = atomic(self.deleter.delete_later)(root)
+
+        # hidden at once
+        self.assertEqual(list(Root.nodes), [])
+
+        self.assertTrue(self.queue.join(30))
+        self.assertEqual(job.status, jobs.DONE)
+        self.assertGreater(job.progress["deleted"], 50)
+
+        for label in ("Vertex", "Port", "Group", "Container", "PendingDeletion"):
+            self.assertEqual(self.count(label), 0, msg=label)
+
+    def test_shared_entities_survive(self):
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        data = load_data(DATA_DIR / "sample.json")
+        first, _ = self.create("first", data)
+        second, _ = self.create("second", data)
+        atomic(self.deleter.delete_later)(first)
+        self.assertTrue(self.queue.join(30))
+
+        self.assertEqual(len(self.manager.read(second).vertices), len(data["nodes"]))
+
+    def test_delete_fragment_after_root_write_back(self):
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        root, fragment = self.create("root", load_data(DATA_DIR / "sample.json"))
+        # a client reads the root with fragment content and writes it back
+        atomic(self.manager.replace)(root, atomic(self.manager.read)(root))
+        atomic(self.deleter.delete_later)(fragment)
+        self.assertTrue(self.queue.join(30))
+
+        self.assertEqual(self.count("Vertex"), 0)
+        self.assertEqual(atomic(self.manager.read)(root).vertices, [])
+
+    def test_delete_all_sweeps_unheld(self):
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        self.create("first", load_data(DATA_DIR / "sample.json"))
+        self.create("second", load_data(DATA_DIR / "basic.json"))
+        # leftovers no container holds
+        neomodel.db.cypher_query(
+            "CREATE (:Vertex {uid: $uid}) -[:CONN]-> (:Port {uid: $port}), "
+            "(:Group {uid: $group}), (:Port {uid: $orphan})",
+            {"uid": "v", "port": "p", "group": "g", "orphan": "o"},
+        )
+
+        jobs = atomic(self.deleter.delete_all_later)()
+        self.assertTrue(self.queue.join(30))
+        self.assertTrue(all(job.status == "done" for job in jobs))
+
+        for label in ("Vertex", "Port", "Group", "Container", "PendingDeletion"):
+            self.assertEqual(self.count(label), 0, msg=label)
+
+    def test_resume(self):
+        from complex_rest_dtcd_supergraph import queries
+
+        root, _ = self.create("root", load_data(DATA_DIR / "sample.json"))
+        # hidden, but the job is lost
+        neomodel.db.cypher_query(queries.HIDE_CONTAINER, {"uid": root.uid})
+
+        self.assertEqual(len(self.deleter.resume()), 1)
+        self.assertTrue(self.queue.join(30))
+        self.assertEqual(self.count("Vertex"), 0)
+        self.assertEqual(self.count("PendingDeletion"), 0)
+
+
+class TestResumeLater(SimpleTestCase):
+    def test_resumed_in_job(self):
+        from complex_rest_dtcd_supergraph import jobs
+        from complex_rest_dtcd_supergraph.deletion import Deleter, resume_later
+        from complex_rest_dtcd_supergraph.jobs import WriteQueue
+
+        queue = WriteQueue()
+
+        with mock.patch.object(Deleter, "resume", return_value=[]) as resume:
+            job = resume_later(queue)
+            self.assertTrue(queue.join(5))
+
+        resume.assert_called_once_with()
+        self.assertEqual(job.status, jobs.DONE)
+        self.assertFalse(job.cancellable)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import sqlite3
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from complex_rest_dtcd_supergraph.backends import InMemoryBackend
+from complex_rest_dtcd_supergraph.changes import ChangeLog
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+from complex_rest_dtcd_supergraph.events import Broker
+from complex_rest_dtcd_supergraph.managers import Manager
+from complex_rest_dtcd_supergraph.stores import ChangeStore
+from complex_rest_dtcd_supergraph.transactions import atomic
+
+from .misc import load_data, no_transaction
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+
+class TestBroker(SimpleTestCase):
+    def setUp(self) -> None:
+        self.broker = Broker()
+
+    def test_publish_subscribe(self):
+        with self.broker.subscribe(["a"]) as subscription:
+            self.broker.publish("a", {"n": 1})
+            self.broker.publish("b", {"n": 2})
+            self.assertEqual(subscription.get(timeout=0)["n"], 1)
+            self.assertIsNone(subscription.get(timeout=0))
+
+    def test_ids_increase(self):
+        first = self.broker.publish("a", {})
+        second = self.broker.publish("a", {})
+        self.assertGreater(second["id"], first["id"])
+
+    def test_link(self):
+        self.broker.link("root", "fragment")
+
+        with self.broker.subscribe(["root"]) as subscription:
+            self.broker.publish("fragment", {"n": 1})
+            self.assertEqual(subscription.get(timeout=0)["n"], 1)
+
+    def test_unsubscribe(self):
+        subscription = self.broker.subscribe(["a"])
+        subscription.close()
+        self.broker.publish("a", {})
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_slow_subscriber(self):
+        broker = Broker(maxsize=1)
+
+        with broker.subscribe(["a"]) as subscription:
+            broker.publish("a", {"n": 1})
+            broker.publish("a", {"n": 2})
+            self.assertEqual(subscription.get(timeout=0)["n"], 1)
+            self.assertIsNone(subscription.get(timeout=0))
+
+
+class TestManagerNotifications(SimpleTestCase):
+    converter = GraphDataConverter()
+
+    def setUp(self) -> None:
+        self.broker = Broker()
+        self.manager = Manager(
+            backend=InMemoryBackend(),
+            changelog=ChangeLog(ChangeStore(":memory:"), tombstone_ttl=3600),
+            broker=self.broker,
+        )
+        self.root = SimpleNamespace(uid="root")
+        self.fragment = SimpleNamespace(uid="fragment")
+
+    def replace(self, data: dict, container):
+        self.manager.replace(container, self.converter.to_content(data))
+
+    def test_bookkeeping_errors_do_not_fail_write(self):
+        data = load_data(DATA_DIR / "2v-1e.json")
+
+        with mock.patch.object(
+            self.manager.changelog, "record", side_effect=sqlite3.OperationalError
+        ):
+            with self.broker.subscribe([self.fragment.uid]) as subscription:
+                with self.assertLogs("supergraph", "ERROR"):
+                    self.replace(data, self.fragment)
+
+                self.assertIsNotNone(subscription.get(timeout=0))
+
+    def test_changed_ids(self):
+        data = load_data(DATA_DIR / "2v-1e.json")
+
+        with self.broker.subscribe([self.fragment.uid]) as subscription:
+            self.replace(data, self.fragment)
+            event = subscription.get(timeout=0)
+            self.assertEqual(event["container"], self.fragment.uid)
+            self.assertEqual(len(event["changed"]["nodes"]), 2)
+            self.assertEqual(len(event["changed"]["edges"]), 1)
+
+            # unchanged content does not notify
+            self.replace(data, self.fragment)
+            self.assertIsNone(subscription.get(timeout=0))
+
+    def test_root_sees_fragment(self):
+        self.manager.reconnect(self.root, self.fragment)
+
+        with self.broker.subscribe([self.root.uid]) as subscription:
+            self.replace(load_data(DATA_DIR / "basic.json"), self.fragment)
+            event = subscription.get(timeout=0)
+            self.assertEqual(event["container"], self.fragment.uid)
+
+    def test_notify_after_commit(self):
+        @atomic
+        def replace():
+            self.replace(load_data(DATA_DIR / "basic.json"), self.fragment)
+            self.assertIsNone(subscription.get(timeout=0))
+
+        with self.broker.subscribe([self.fragment.uid]) as subscription:
+            with no_transaction():
+                replace()
+
+            self.assertIsNotNone(subscription.get(timeout=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+from complex_rest_dtcd_supergraph.history import History, fingerprint
+from complex_rest_dtcd_supergraph.stores import HistoryStore
+
+from .misc import load_data, sort_payload
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+EMPTY = {"nodes": [], "edges": [], "groups": []}
+
+
+class TestHistory(SimpleTestCase):
+    converter = GraphDataConverter()
+    container = "container"
+
+    def setUp(self) -> None:
+        self.store = HistoryStore(":memory:")
+        self.history = History(self.store, checkpoint_interval=3)
+
+    def record(self, data: dict):
+        return self.history.record(self.container, self.converter.to_content(data))
+
+    def retrieve(self, version: int) -> dict:
+        content = self.history.content(self.container, version)
+        data = self.converter.to_data(content)
+        sort_payload(data)
+
+        return data
+
+    def test_versions(self):
+        datasets = [
+            load_data(DATA_DIR / name)
+            for name in (
+                "basic.json",
+                "sample.json",
+                "2v-1e.json",
+                "n25_e25.json",
+                "n50_e25.json",
+                "2v-2g.json",
+                "vertex-port.json",
+            )
+        ]
+
+        for i, data in enumerate(datasets, start=1):
+            self.assertEqual(self.record(data), i)
+
+        for i, data in enumerate(datasets, start=1):
+            sort_payload(data)
+            self.assertEqual(self.retrieve(i), data)
+
+        checkpoints = [v["checkpoint"] for v in self.history.versions(self.container)]
+        self.assertEqual(checkpoints, [True, False, False, True, False, False, True])
+
+    def test_unchanged_is_not_recorded(self):
+        data = load_data(DATA_DIR / "sample.json")
+        self.assertEqual(self.record(data), 1)
+        self.assertIsNone(self.record(data))
+
+    def test_delta_has_changes_only(self):
+        data = load_data(DATA_DIR / "n25_e25.json")
+        self.record(data)
+        data["nodes"][0]["nodeTitle"] = "changed"
+        data["edges"].pop()
+        self.record(data)
+
+        versions = self.history.versions(self.container)
+        self.assertEqual(versions[1]["changes"], 2)
+
+    def test_empty(self):
+        self.record(load_data(DATA_DIR / "sample.json"))
+        self.record(EMPTY)
+        self.assertEqual(self.retrieve(2), EMPTY)
+
+    def test_missing_version(self):
+        self.record(EMPTY)
+
+        for version in (0, 2):
+            with self.assertRaises(KeyError):
+                self.history.content(self.container, version)
+
+        with self.assertRaises(KeyError):
+            self.history.content("other", 1)
+
+    def test_concurrent_records(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        history = History(HistoryStore(Path(directory.name) / "h.sqlite3"), 3)
+        data = load_data(DATA_DIR / "n25_e25.json")
+        versions, errors = [], []
+
+        def record(i):
+            changed = dict(data, nodes=data["nodes"][i:])
+
+            try:
+                versions.append(
+                    history.record(self.container, self.converter.to_content(changed))
+                )
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=record, args=(i,)) for i in range(8)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(versions), list(range(1, 9)))
+
+
+class TestFingerprint(SimpleTestCase):
+    converter = GraphDataConverter()
+
+    def test_order_does_not_matter(self):
+        data = load_data(DATA_DIR / "n25_e25.json")
+        expected = fingerprint(self.converter.to_content(data))
+
+        for key in ("nodes", "edges"):
+            data[key].reverse()
+
+        self.assertEqual(fingerprint(self.converter.to_content(data)), expected)
+
+    def test_changes(self):
+        data = load_data(DATA_DIR / "n25_e25.json")
+        expected = fingerprint(self.converter.to_content(data))
+        data["nodes"][0]["nodeTitle"] = "changed"
+        self.assertNotEqual(fingerprint(self.converter.to_content(data)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,304 @@
+import socket
+import subprocess
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+from neo4j.exceptions import ServiceUnavailable
+
+from complex_rest_dtcd_supergraph import jobs, transactions
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+from complex_rest_dtcd_supergraph.jobs import Job, WriteQueue
+from complex_rest_dtcd_supergraph.stores import JobStore
+from complex_rest_dtcd_supergraph.transactions import atomic
+from complex_rest_dtcd_supergraph.views.mixins import ContainerManagementMixin
+
+from .misc import load_data, no_transaction
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+
+class TestWriteQueue(SimpleTestCase):
+    def setUp(self) -> None:
+        patcher = no_transaction()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = WriteQueue()
+        self.written = []
+
+    def write(self, container: str, value):
+        return self.queue.submit(container, lambda: self.written.append(value))
+
+    def block(self, container: str) -> threading.Event:
+        """Occupy the worker until the returned event is set."""
+
+        started, release = threading.Event(), threading.Event()
+
+        def func():
+            started.set()
+            release.wait(5)
+
+        self.queue.submit(container, func)
+        started.wait(5)
+
+        return release
+
+    def test_write(self):
+        job = self.write("a", 1)
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual(self.written, [1])
+        self.assertEqual(self.queue.get(job.uid).status, jobs.DONE)
+
+    def test_coalesce(self):
+        release = self.block("a")
+        queued = [self.write("a", i) for i in range(3)]
+        other = self.write("b", "other")
+        release.set()
+        self.assertTrue(self.queue.join(5))
+
+        self.assertEqual(self.written, [2, "other"])
+        self.assertEqual(
+            [job.status for job in queued],
+            [jobs.SUPERSEDED, jobs.SUPERSEDED, jobs.DONE],
+        )
+        self.assertEqual(queued[0].superseded_by, queued[1].uid)
+        self.assertEqual(other.status, jobs.DONE)
+
+    def test_order(self):
+        release = self.block("a")
+
+        for container in "bcd":
+            self.write(container, container)
+
+        release.set()
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual(self.written, ["b", "c", "d"])
+
+    def test_failure(self):
+        def func():
+            raise ValueError("broken")
+
+        job = self.queue.submit("a", func)
+        self.write("b", 1)
+        self.assertTrue(self.queue.join(5))
+
+        self.assertEqual(job.status, jobs.FAILED)
+        self.assertEqual(job.error, "broken")
+        self.assertEqual(self.written, [1])
+
+    def test_current(self):
+        seen = []
+        job = self.queue.submit("a", lambda: seen.append(jobs.current()))
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual(seen, [job])
+        self.assertIsNone(jobs.current())
+
+    def test_job_created_in_advance(self):
+        job = jobs.Job(container="a")
+        self.assertIs(self.queue.submit("a", lambda: None, job=job), job)
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual(job.status, jobs.DONE)
+
+    def test_cancel_queued(self):
+        release = self.block("a")
+        job = self.write("b", 1)
+        self.assertTrue(self.queue.cancel(job.uid))
+        release.set()
+        self.assertTrue(self.queue.join(5))
+
+        self.assertEqual(job.status, jobs.CANCELLED)
+        self.assertEqual(self.written, [])
+
+    def test_cancel_running(self):
+        started, release = threading.Event(), threading.Event()
+
+        def func():
+            for i in range(3):
+                jobs.report(step=i)
+                started.set()
+                release.wait(5)
+
+        job = self.queue.submit("a", func)
+        started.wait(5)
+        self.assertTrue(self.queue.cancel(job.uid))
+        release.set()
+        self.assertTrue(self.queue.join(5))
+
+        self.assertEqual(job.status, jobs.CANCELLED)
+        self.assertEqual(job.progress, {"step": 1})
+
+    def test_cancel_not_cancellable(self):
+        job = self.queue.submit("a", lambda: None, job=Job("a", cancellable=False))
+        self.assertFalse(self.queue.cancel(job.uid))
+        self.assertTrue(self.queue.join(5))
+        self.assertFalse(self.queue.cancel(job.uid))
+        self.assertFalse(self.queue.cancel("unknown"))
+
+    def test_cancel_running_uninterruptible(self):
+        started, release = threading.Event(), threading.Event()
+
+        def func():
+            started.set()
+            release.wait(5)
+
+        job = self.queue.submit("a", func, job=Job("a", interruptible=False))
+        started.wait(5)
+        self.assertFalse(self.queue.cancel(job.uid))
+        release.set()
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual(job.status, jobs.DONE)
+
+        # queued ones are cancelled at once
+        release = self.block("a")
+        queued = self.queue.submit("a", lambda: None, job=Job("a", interruptible=False))
+        self.assertTrue(self.queue.cancel(queued.uid))
+        release.set()
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual(queued.status, jobs.CANCELLED)
+
+    def test_workers(self):
+        queue = WriteQueue(workers=2)
+        barrier = threading.Barrier(2, timeout=5)
+        # both containers run at the same time, or the barrier breaks
+        first = queue.submit("a", barrier.wait)
+        second = queue.submit("b", barrier.wait)
+        self.assertTrue(queue.join(5))
+        self.assertEqual([first.status, second.status], [jobs.DONE, jobs.DONE])
+
+    def test_workers_serialize_container(self):
+        queue = WriteQueue(workers=2)
+        running, overlaps = set(), []
+
+        def func(key):
+            def run():
+                overlaps.append(key in running)
+                running.add(key)
+                threading.Event().wait(0.05)
+                running.discard(key)
+
+            return run
+
+        release = threading.Event()
+        queue.submit("a", lambda: release.wait(5))
+
+        for _ in range(2):
+            queue.submit("a", func("a"))
+            queue.submit("b", func("b"))
+
+        release.set()
+        self.assertTrue(queue.join(5))
+        self.assertEqual(overlaps, [False] * len(overlaps))
+
+    def test_list(self):
+        release = self.block("b")  # the writes coalesce while it runs
+        submitted = [self.write("a", i) for i in range(3)]
+        release.set()
+        self.assertTrue(self.queue.join(5))
+
+        self.assertEqual(self.queue.list()[:3], submitted[::-1])
+        self.assertEqual(self.queue.list(status=jobs.SUPERSEDED), submitted[1::-1])
+        self.assertEqual(self.queue.list(limit=1), submitted[2:])
+
+    def test_history_size(self):
+        queue = WriteQueue(history_size=2)
+        submitted = [queue.submit("a", lambda: None) for _ in range(3)]
+        self.assertIsNone(queue.get(submitted[0].uid))
+        self.assertIsNotNone(queue.get(submitted[2].uid))
+        queue.join(5)
+
+
+class TestPersistence(SimpleTestCase):
+    def setUp(self) -> None:
+        patcher = no_transaction()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "jobs.sqlite3"
+        self.queue = WriteQueue(store=JobStore(self.path))
+
+    def test_status_outlives_queue(self):
+        job = self.queue.submit("a", lambda: jobs.report(done=1))
+        self.assertTrue(self.queue.join(5))
+
+        restored = WriteQueue(store=JobStore(self.path)).get(job.uid)
+        self.assertEqual(restored, job)
+        self.assertEqual(restored.progress, {"done": 1})
+
+    def test_cancel_through_store(self):
+        started, release = threading.Event(), threading.Event()
+
+        def func():
+            started.set()
+            release.wait(5)
+            jobs.report(step=1)
+
+        job = self.queue.submit("a", func)
+        started.wait(5)
+        # e.g. a request served by another process
+        other = WriteQueue(store=JobStore(self.path))
+        self.assertTrue(other.cancel(job.uid))
+        release.set()
+        self.assertTrue(self.queue.join(5))
+
+        self.assertEqual(job.status, jobs.CANCELLED)
+        self.assertEqual(other.get(job.uid).status, jobs.CANCELLED)
+
+    def test_interrupted_jobs_fail(self):
+        store = JobStore(self.path)
+        job = Job(container="a", status=jobs.RUNNING)
+        process = subprocess.Popen(["true"])
+        process.wait()  # gone
+        owner = f"{socket.gethostname()}:{process.pid}"
+        store.put(job.uid, owner, job.status, job.to_json())
+        store.put("x", jobs.OWNER, job.status, Job("b", uid="x").to_json())
+        queue = WriteQueue(store=store)
+
+        self.assertEqual(queue.get(job.uid).status, jobs.FAILED)
+        self.assertEqual(queue.get("x").status, jobs.QUEUED)
+
+
+class TestReplaceLater(SimpleTestCase):
+    def setUp(self) -> None:
+        patcher = no_transaction()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        class View(ContainerManagementMixin):
+            converter = GraphDataConverter()
+            writer = mock.Mock()
+
+        self.view = View()
+        self.container = SimpleNamespace(uid="c")
+        self.data = load_data(DATA_DIR / "basic.json")
+
+    def test_submitted_once_after_commit(self):
+        attempts = []
+
+        @atomic
+        def put():
+            job = self.view.replace_later(self.container, self.data)
+            self.view.writer.submit.assert_not_called()
+            attempts.append(job)
+
+            if len(attempts) == 1:
+                raise ServiceUnavailable("lost")
+
+            return job
+
+        with mock.patch.object(transactions, "backoff", return_value=0):
+            job = put()
+
+        self.view.writer.submit.assert_called_once()
+        self.assertIs(self.view.writer.submit.call_args.kwargs["job"], job)
+        self.assertEqual(len(attempts), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
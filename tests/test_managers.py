@@ -1,29 +1,483 @@
+import tempfile
+import threading
+import time
 import unittest
 from pathlib import Path
+from unittest import mock
 
+import neomodel
 from django.test import SimpleTestCase, tag
 
+from .misc import load_data, statements
+
 # TODO import here causes a strange error: RelationshipClassRedefined
 # something with how neomodel builds up the registry & django runs the tests?
 # from complex_rest_dtcd_supergraph.managers import Manager
 
 
 TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+# superset of parameters used by statements in `queries`
+PARAMS = {
+    "after": ["n1", "c1"],
+    "counts": True,
+    "fragments": ["h1"],
+    "hash": "h1",
+    "limit": 1000,
+    "pairs": [["p1", "p2"], ["p3", "p4"]],
+    "prefix": "{",
+    "rows": [
+        {
+            "uid": "v1",
+            "properties": {"uid": "v1"},
+            "ports": ["p1"],
+            "start": "p1",
+            "end": "p2",
+            "meta": "{}",
+        }
+    ],
+    "token": "t1",
+    "uid": "c1",
+    "uids": ["v1", "p1", "g1"],
+}
+
+
+def iter_operators(plan: dict):
+    """Yield operator types of a query plan and all its children."""
+
+    yield plan["operatorType"]
+
+    for child in plan.get("children", []):
+        yield from iter_operators(child)
 
 
 @tag("neo4j")
 class TestManager(SimpleTestCase):
     @classmethod
     def setUpClass(cls) -> None:
-        pass  # clear the db
+        neomodel.clear_neo4j_database(neomodel.db)
 
     @classmethod
     def tearDownClass(cls) -> None:
         pass
 
     def tearDown(self) -> None:
+        neomodel.clear_neo4j_database(neomodel.db)
+
+    def save_fragments(self, n: int, repeats: int, concurrent: bool = True) -> float:
+        """Save content of `n` fragments of the same root, `repeats`
+        times each, concurrently or one fragment after another. Returns
+        wall time of the saves."""
+
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Manager
+        from complex_rest_dtcd_supergraph.models import Fragment, Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        converter = GraphDataConverter()
+        manager = Manager()
+
+        @atomic
+        def create():
+            root = Root(name="root").save()
+            fragments = [Fragment(name=str(i)).save() for i in range(n)]
+
+            for fragment in fragments:
+                root.fragments.connect(fragment)
+
+            return root, fragments
+
+        @atomic
+        def save(root, fragment, data):
+            manager.replace(fragment, converter.to_content(data))
+            manager.reconnect(root, fragment)
+
+        root, fragments = create()
+        errors = []
+
+        def work(i, fragment):
+            data = load_data(DATA_DIR / "n25_e25.json")
+
+            # fragments own disjoint content
+            for node in data["nodes"]:
+                node["primitiveID"] += f"-{i}"
+
+                for port in node.get("initPorts", []):
+                    port["primitiveID"] += f"-{i}"
+
+            for edge in data["edges"]:
+                for key in ("sourceNode", "targetNode", "sourcePort", "targetPort"):
+                    edge[key] += f"-{i}"
+
+            try:
+                for _ in range(repeats):
+                    save(root, fragment, data)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=work, args=(i, fragment))
+            for i, fragment in enumerate(fragments)
+        ]
+        start = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+
+            if not concurrent:
+                thread.join()
+
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - start
+        self.assertEqual(errors, [])
+
+        # root sees the content of all fragments
+        content = manager.read(root)
+        self.assertEqual(len(content.vertices), 25 * n)
+
+        return elapsed
+
+    def test_chunked_replace(self):
+        from complex_rest_dtcd_supergraph import queries, settings
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Neo4jBackend
+        from complex_rest_dtcd_supergraph.models import Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        converter = GraphDataConverter()
+        old = converter.to_content(load_data(DATA_DIR / "n25_e25.json"))
+        new = converter.to_content(load_data(DATA_DIR / "n50_e25.json"))
+        root = Root(name="root").save()
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.multiple(
+            settings,
+            CHUNK_THRESHOLD=1,
+            CHUNK_SIZE=10,
+            CHUNK_MIN_SIZE=10,
+            CHUNK_STORE_PATH=Path(directory) / "staging.sqlite3",
+        ):
+            backend = Neo4jBackend()
+            atomic(backend.replace)(root, old)
+            merge_chunk = backend._merge_chunk
+            seen = []
+
+            def spy(container, chunk):
+                merge_chunk(container, chunk)
+                seen.append(len(backend.read(container).vertices))
+
+            with mock.patch.object(backend, "_merge_chunk", spy):
+                backend.replace_chunked(root, new)
+
+            # readers see the old content until the swap
+            self.assertGreater(len(seen), 1)
+            self.assertEqual(set(seen), {len(old.vertices)})
+            self.assertEqual(len(backend.read(root).vertices), len(new.vertices))
+
+            # flags are lifted
+            rows, _ = neomodel.db.cypher_query(queries.READ_STAGING, {"uid": root.uid})
+            self.assertEqual(rows, [[None]])
+
+    def test_replace_stream(self):
+        from complex_rest_dtcd_supergraph import settings
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Neo4jBackend
+        from complex_rest_dtcd_supergraph.models import Root
+        from complex_rest_dtcd_supergraph.streams import COLLECTIONS, iter_content
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        converter = GraphDataConverter()
+        old = converter.to_content(load_data(DATA_DIR / "n25_e25.json"))
+        data = load_data(DATA_DIR / "n50_e25.json")
+        items = [(key, obj) for key in COLLECTIONS for obj in data.get(key, [])]
+        root = Root(name="root").save()
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.multiple(
+            settings,
+            CHUNK_THRESHOLD=1,
+            CHUNK_STORE_PATH=Path(directory) / "staging.sqlite3",
+        ):
+            backend = Neo4jBackend()
+            atomic(backend.replace)(root, old)
+            seen = []
+
+            def parts():
+                for part in iter_content(items, converter, 10):
+                    seen.append(len(backend.read(root).vertices))
+                    yield part
+
+            # readers see the old content until the swap
+            backend.replace_stream(root, parts())
+            self.assertGreater(len(seen), 1)
+            self.assertEqual(set(seen), {len(old.vertices)})
+            self.assertEqual(len(backend.read(root).vertices), len(data["nodes"]))
+
+            # a failed stream leaves the content as it was
+            def failing():
+                yield from iter_content(items[:10], converter, 5)
+                raise ValueError
+
+            atomic(backend.replace)(root, old)
+
+            with self.assertRaises(ValueError):
+                backend.replace_stream(root, failing())
+
+            content = backend.read(root)
+            self.assertCountEqual(
+                [v.uid for v in content.vertices], [v.uid for v in old.vertices]
+            )
+
+    def test_iter_read(self):
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Manager
+        from complex_rest_dtcd_supergraph.models import Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        converter = GraphDataConverter()
+        content = converter.to_content(load_data(DATA_DIR / "n25_e25.json"))
+        manager = Manager()
+        root = Root(name="root").save()
+        atomic(manager.replace)(root, content)
+
+        parts = list(manager.iter_read(root, batch_size=10))
+        self.assertGreater(len(parts), 1)
+        self.assertTrue(all(len(part.vertices) <= 10 for part in parts))
+
+        # parts add up to the content
+        vertices = [v.uid for part in parts for v in part.vertices]
+        edges = {e.uid for part in parts for e in part.edges}
+        self.assertCountEqual(vertices, [v.uid for v in content.vertices])
+        self.assertEqual(edges, {e.uid for e in content.edges})
+
+    def test_clear_in_batches(self):
+        from complex_rest_dtcd_supergraph import metrics
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Manager
+        from complex_rest_dtcd_supergraph.models import Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        converter = GraphDataConverter()
+        content = converter.to_content(load_data(DATA_DIR / "n50_e25.json"))
+        manager = Manager()
+        root = Root(name="root").save()
+        atomic(manager.replace)(root, content)
+        metrics.reset()
+
+        with mock.patch.object(manager.backend._deprecator, "batch_size", 10):
+            manager.clear(root)
+
+        # a transaction per batch of 10 vertices
+        self.assertGreater(metrics.snapshot()["transactions.committed"], 5)
+        self.assertEqual(atomic(manager.read)(root).vertices, [])
+
+    def test_stats(self):
+        from complex_rest_dtcd_supergraph.backends import content_stats
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Manager
+        from complex_rest_dtcd_supergraph.models import Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        converter = GraphDataConverter()
+        content = converter.to_content(load_data(DATA_DIR / "n25_e25.json"))
+        manager = Manager()
+        root = Root(name="root").save()
+        self.assertEqual(atomic(manager.stats)(root).vertices, 0)
+
+        atomic(manager.replace)(root, content)
+
+        # aggregated in Cypher the same way as in Python
+        stats = atomic(manager.stats)(root)
+        self.assertEqual(stats, content_stats(atomic(manager.backend.read)(root)))
+        self.assertEqual(stats.vertices, len(content.vertices))
+
+    def test_collect_meta(self):
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Manager
+        from complex_rest_dtcd_supergraph.meta import MetaCollector, MetaOffloader
+        from complex_rest_dtcd_supergraph.models import Root
+        from complex_rest_dtcd_supergraph.stores import MetaStore
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        converter = GraphDataConverter()
+        store = MetaStore(":memory:")
+        manager = Manager(
+            offloader=MetaOffloader(store, threshold=50),
+            collector=MetaCollector(store, grace=0, interval=3600),
+        )
+        root = Root(name="root").save()
+
+        with mock.patch.object(manager, "collect_later"):
+            for name in ("sample.json", "basic.json"):
+                content = converter.to_content(load_data(DATA_DIR / name))
+                atomic(manager.replace)(root, content)
+
+        self.assertGreater(manager.collect_meta()[0], 0)
+
+        # blobs of the current content stay
+        (blobs,) = store.connection().execute("SELECT count(*) FROM blobs").fetchone()
+        references = [
+            meta
+            for _, meta in manager.backend.iter_meta()
+            if MetaOffloader._reference(meta)
+        ]
+        self.assertEqual(blobs, len(references))
+        self.assertEqual(manager.collect_meta(), (0, 0))
+        self.assertEqual(
+            len(atomic(manager.read)(root).vertices), len(content.vertices)
+        )
+
+    def test_concurrent_fragment_saves_do_not_conflict(self):
+        from complex_rest_dtcd_supergraph import metrics
+
+        metrics.reset()
+        self.save_fragments(4, repeats=10)
+
+        # saves to different fragments do not lock the root: no deadlocks
+        # or lock timeouts to retry
+        counters = metrics.snapshot()
+        self.assertEqual(counters.get("transactions.retries", 0), 0)
+        self.assertEqual(counters.get("transactions.retries_exhausted", 0), 0)
+        self.assertGreaterEqual(counters["transactions.committed"], 40)
+
+    def test_fragment_saves_scale(self):
+        # warm up caches and query plans
+        self.save_fragments(1, repeats=2)
+        neomodel.clear_neo4j_database(neomodel.db)
+
+        serial = self.save_fragments(4, repeats=5, concurrent=False)
+        neomodel.clear_neo4j_database(neomodel.db)
+        concurrent = self.save_fragments(4, repeats=5)
+
+        # saves to different fragments do not wait for each other
+        self.assertLess(concurrent, serial * 0.9)
+
+    def test_unlink_fragment_content(self):
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import (
+            Manager,
+            connect_to_container,
+            unlink_fragment_content,
+        )
+        from complex_rest_dtcd_supergraph.models import Fragment, Root
+        from complex_rest_dtcd_supergraph.transactions import atomic
+
+        converter = GraphDataConverter()
+        content = converter.to_content(load_data(DATA_DIR / "basic.json"))
+        manager = Manager()
+        root = Root(name="root").save()
+        fragment = Fragment(name="fragment").save()
+        root.fragments.connect(fragment)
+        atomic(manager.replace)(fragment, content)
+
+        # relationships the old reconnect wrote
+        vertices = [v.uid for v in content.vertices]
+        atomic(connect_to_container)(root, vertices, [g.uid for g in content.groups])
+
+        self.assertEqual(
+            unlink_fragment_content(batch_size=2), len(vertices) + len(content.groups)
+        )
+        self.assertEqual(unlink_fragment_content(), 0)
+
+        # the root still includes the content through the fragment
+        self.assertEqual(len(root.vertices), 0)
+        self.assertEqual(len(atomic(manager.read)(root).vertices), len(vertices))
+
+
+class TestManagerStats(SimpleTestCase):
+    def setUp(self) -> None:
+        from types import SimpleNamespace
+
+        from complex_rest_dtcd_supergraph.backends import InMemoryBackend
+        from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+        from complex_rest_dtcd_supergraph.managers import Manager, StatsCache
+
+        self.converter = GraphDataConverter()
+        self.manager = Manager(
+            backend=InMemoryBackend(), stats_cache=StatsCache(maxsize=1)
+        )
+        self.container = SimpleNamespace(uid="container")
+
+    def replace(self, name: str):
+        content = self.converter.to_content(load_data(DATA_DIR / name))
+        self.manager.replace(self.container, content)
+
+    def test_cached_until_write(self):
+        self.replace("basic.json")
+
+        with mock.patch.object(
+            self.manager.backend, "stats", wraps=self.manager.backend.stats
+        ) as stats:
+            first = self.manager.stats(self.container)
+            self.assertIs(self.manager.stats(self.container), first)
+            self.assertEqual(stats.call_count, 1)
+
+            self.replace("sample.json")
+            self.assertNotEqual(self.manager.stats(self.container), first)
+            self.assertEqual(stats.call_count, 2)
+
+    def test_unknown_version_is_not_cached(self):
+        with mock.patch.object(self.manager.backend, "version", return_value=None):
+            self.manager.stats(self.container)
+            self.assertIsNone(self.manager.stats_cache.get((self.container.uid, None)))
+
+    def test_cache_size(self):
+        from complex_rest_dtcd_supergraph.managers import StatsCache
+        from complex_rest_dtcd_supergraph.structures import Stats
+
+        cache = StatsCache(maxsize=2)
+        cache.put(("a", "1"), Stats())
+        cache.put(("b", "1"), Stats())
+        cache.get(("a", "1"))
+        cache.put(("c", "1"), Stats())
+
+        self.assertIsNotNone(cache.get(("a", "1")))
+        self.assertIsNone(cache.get(("b", "1")))
+
+
+@tag("neo4j")
+class TestQueryPlans(SimpleTestCase):
+    """Make sure that generated statements use indexes instead of
+    scanning all nodes."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        from complex_rest_dtcd_supergraph import models
+
+        for cls_ in (models.Container, models.Port, models.Vertex, models.Group):
+            neomodel.install_labels(cls_)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
         pass
 
+    def explain(self, query: str, params: dict) -> dict:
+        """Return the plan of a given query without running it."""
+
+        if neomodel.db.url is None:
+            neomodel.db.set_connection(neomodel.config.DATABASE_URL)
+
+        with neomodel.db.driver.session() as session:
+            result = session.run("EXPLAIN " + query, params)
+
+            return result.consume().plan
+
+    def assert_no_all_nodes_scan(self, query: str, params: dict):
+        operators = list(iter_operators(self.explain(query, params)))
+
+        for operator in operators:
+            self.assertNotIn(
+                "AllNodesScan",
+                operator,
+                msg=f"Query:\n{query}\nuses operators: {', '.join(operators)}",
+            )
+
+    def test_statements(self):
+        for name, query in statements().items():
+            with self.subTest(name=name):
+                self.assert_no_all_nodes_scan(query, PARAMS)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,341 @@
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from complex_rest_dtcd_supergraph.backends import InMemoryBackend
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+from complex_rest_dtcd_supergraph.managers import Manager
+from complex_rest_dtcd_supergraph.meta import (
+    MetaCollector,
+    MetaOffloader,
+    MetaTemplates,
+    entities,
+    entity_key,
+)
+from complex_rest_dtcd_supergraph.stores import MetaStore
+from complex_rest_dtcd_supergraph.structures import RawJSON
+
+from .misc import load_data, sort_payload
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+
+class TestMetaOffloader(SimpleTestCase):
+    converter = GraphDataConverter()
+    threshold = 50
+
+    def setUp(self) -> None:
+        self.store = MetaStore(":memory:")
+        self.offloader = MetaOffloader(self.store, threshold=self.threshold)
+
+    def _check_offload_restore(self, data: dict):
+        sort_payload(data)
+        content = self.converter.to_content(data)
+        offloaded = self.offloader.offload(content)
+
+        for item in entities(offloaded):
+            self.assertLessEqual(len(json.dumps(item.meta)), 80)
+
+        self.offloader.restore(offloaded)
+        exported = self.converter.to_data(offloaded)
+        sort_payload(exported)
+        self.assertEqual(exported, data)
+
+    def test_offload_restore_sample(self):
+        self._check_offload_restore(load_data(DATA_DIR / "sample.json"))
+
+    def test_offload_restore_n25_e25(self):
+        self._check_offload_restore(load_data(DATA_DIR / "n25_e25.json"))
+
+    def test_small_meta_stays(self):
+        data = load_data(DATA_DIR / "basic.json")
+        content = self.converter.to_content(data)
+        offloaded = MetaOffloader(self.store, threshold=10**6).offload(content)
+        self.assertEqual(offloaded, content)
+
+    def test_original_content_intact(self):
+        data = load_data(DATA_DIR / "sample.json")
+        content = self.converter.to_content(data)
+        self.offloader.offload(content)
+        exported = self.converter.to_data(content)
+        sort_payload(exported)
+        self.assertEqual(exported, data)
+
+
+class TestPassThroughMetaOffloader(TestMetaOffloader):
+    converter = GraphDataConverter(passthrough=True)
+
+    def _check_offload_restore(self, data: dict):
+        sort_payload(data)
+        content = self.converter.to_content(data)
+        offloaded = self.offloader.offload(content)
+
+        for item in entities(offloaded):
+            self.assertIsInstance(item.meta, RawJSON)
+
+        self.offloader.restore(offloaded)
+        self.assertEqual(offloaded, content)
+
+    def test_original_content_intact(self):
+        data = load_data(DATA_DIR / "sample.json")
+        content = self.converter.to_content(data)
+        self.offloader.offload(content)
+        self.assertEqual(content, self.converter.to_content(data))
+
+
+class TestMetaTemplates(SimpleTestCase):
+    converter = GraphDataConverter()
+    keys = ("extensionName", "primitiveName", "nodeTitle")
+
+    def setUp(self) -> None:
+        self.store = MetaStore(":memory:")
+        self.templates = MetaTemplates(self.store, keys=self.keys)
+
+    def split_expand(self, data: dict):
+        content = self.converter.to_content(data)
+        split = self.templates.split(content)
+
+        for item in entities(split):
+            for key in self.keys:
+                self.assertNotIn(key, self.converter._load(item.meta))
+
+        return self.converter.to_data(self.templates.expand(split))
+
+    def _check_split_expand(self, data: dict):
+        sort_payload(data)
+        exported = self.split_expand(data)
+        sort_payload(exported)
+        self.assertEqual(exported, data)
+
+    def test_split_expand_sample(self):
+        self._check_split_expand(load_data(DATA_DIR / "sample.json"))
+
+    def test_split_expand_n25_e25(self):
+        self._check_split_expand(load_data(DATA_DIR / "n25_e25.json"))
+
+    def test_templates_are_shared(self):
+        data = {
+            "nodes": [
+                {"primitiveID": str(i), "primitiveName": "Data", "layout": i}
+                for i in range(10)
+            ],
+            "edges": [],
+        }
+        self.templates.split(self.converter.to_content(data))
+        count = self.store.connection().execute("SELECT COUNT(*) FROM templates")
+        self.assertEqual(count.fetchone()[0], 1)
+
+    def test_no_template_keys(self):
+        data = {"nodes": [{"primitiveID": "n1", "layout": 1}], "edges": []}
+        content = self.converter.to_content(data)
+        self.assertEqual(self.templates.split(content), content)
+
+    def test_template_only(self):
+        data = {"nodes": [{"primitiveID": "n1", "primitiveName": "Data"}], "edges": []}
+        self._check_split_expand(data)
+
+
+class TestPassThroughMetaTemplates(TestMetaTemplates):
+    converter = GraphDataConverter(passthrough=True)
+
+    def _check_split_expand(self, data: dict):
+        sort_payload(data)
+        content = self.converter.to_content(data)
+        split = self.templates.split(content)
+
+        for item in entities(split):
+            self.assertIsInstance(item.meta, RawJSON)
+
+        self.templates.expand(split)
+
+        for item, original in zip(entities(split), entities(content)):
+            self.assertIsInstance(item.meta, RawJSON)
+            self.assertEqual(json.loads(item.meta), json.loads(original.meta))
+
+
+class TestMetaCollector(SimpleTestCase):
+    converter = GraphDataConverter()
+
+    def setUp(self) -> None:
+        self.store = MetaStore(":memory:")
+        self.offloader = MetaOffloader(self.store, threshold=50)
+        self.collector = MetaCollector(self.store, grace=0, interval=3600)
+
+    def count_blobs(self) -> int:
+        return (
+            self.store.connection().execute("SELECT count(*) FROM blobs").fetchone()[0]
+        )
+
+    def offload(self, name: str) -> list:
+        content = self.converter.to_content(load_data(DATA_DIR / name))
+        offloaded = self.offloader.offload(content)
+
+        return [(entity_key(item), item.meta) for item in entities(offloaded)]
+
+    def test_unreferenced_deleted(self):
+        metas = self.offload("sample.json")
+        references = [
+            (key, meta) for key, meta in metas if MetaOffloader._reference(meta)
+        ]
+        self.assertGreater(len(references), 1)
+        self.assertEqual(self.count_blobs(), len(references))
+
+        kept, dropped = references[:1], references[1:]
+        self.assertEqual(self.collector.collect(kept), (len(dropped), 0))
+        self.assertEqual(self.count_blobs(), 1)
+
+        key, meta = kept[0]
+        hash_ = MetaOffloader._reference(meta)
+        self.assertIn((key, hash_), self.store.get_many([(key, hash_)]))
+
+    def test_recent_kept(self):
+        self.offload("sample.json")
+        blobs = self.count_blobs()
+        collector = MetaCollector(self.store, grace=60, interval=3600)
+        self.assertEqual(collector.collect([]), (0, 0))
+        self.assertEqual(self.count_blobs(), blobs)
+
+    def test_saved_again_is_recent(self):
+        self.offload("sample.json")
+        blobs = self.count_blobs()
+        self.store.connection().execute("UPDATE blobs SET touched = 0")
+        self.store.connection().commit()
+
+        # the same metadata written again must survive the grace period
+        self.offload("sample.json")
+        collector = MetaCollector(self.store, grace=60, interval=3600)
+        self.assertEqual(collector.collect([]), (0, 0))
+        self.assertEqual(self.count_blobs(), blobs)
+
+    def split(self, *names: str) -> list:
+        templates = MetaTemplates(self.store, keys=("primitiveName",))
+        data = {
+            "nodes": [
+                {"primitiveID": name, "primitiveName": name, "layout": i}
+                for i, name in enumerate(names)
+            ],
+            "edges": [],
+        }
+        split = templates.split(self.converter.to_content(data))
+
+        return [(entity_key(item), item.meta) for item in entities(split)]
+
+    def test_unreferenced_templates_deleted(self):
+        metas = self.split("Data", "Other")
+        count = self.store.connection().execute("SELECT COUNT(*) FROM templates")
+        self.assertEqual(count.fetchone()[0], 2)
+
+        self.assertEqual(self.collector.collect(metas[:1]), (0, 1))
+        hash_ = MetaTemplates._reference(metas[0][1])
+        self.assertEqual(list(self.store.get_templates([hash_])), [hash_])
+
+    def test_templates_of_blobs_kept(self):
+        metas = self.split("Data")
+        content = self.converter.to_content(
+            {"nodes": [{"primitiveID": "Data"}], "edges": []}
+        )
+        # the override with a template reference is large enough to offload
+        content.vertices[0].meta = metas[0][1]
+        offloaded = self.offloader.offload(content)
+        metas = [(entity_key(item), item.meta) for item in entities(offloaded)]
+        self.assertIsNotNone(MetaOffloader._reference(metas[0][1]))
+
+        # the template is referred to by the offloaded override only
+        self.assertEqual(self.collector.collect(metas), (0, 0))
+        self.assertEqual(self.collector.collect([]), (1, 1))
+
+    def test_due(self):
+        self.assertTrue(self.collector.due())
+        self.collector.collect([])
+        self.assertFalse(self.collector.due())
+        self.assertTrue(MetaCollector(self.store, grace=0, interval=0).due())
+
+    def test_store_without_timestamps(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "meta.sqlite3"
+            connection = sqlite3.connect(path)
+            connection.execute(
+                "CREATE TABLE blobs (uid TEXT NOT NULL, hash TEXT NOT NULL, "
+                "data TEXT NOT NULL, PRIMARY KEY (uid, hash))"
+            )
+            connection.execute("INSERT INTO blobs VALUES ('a', 'b', '{}')")
+            connection.execute(
+                "CREATE TABLE templates (hash TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            connection.execute("INSERT INTO templates VALUES ('b', '{}')")
+            connection.commit()
+            connection.close()
+
+            store = MetaStore(path)
+            collector = MetaCollector(store, grace=60, interval=3600)
+            self.assertEqual(collector.collect([]), (1, 1))
+
+
+class TestPassThroughMetaCollector(TestMetaCollector):
+    converter = GraphDataConverter(passthrough=True)
+
+
+class TestManagerCollection(SimpleTestCase):
+    converter = GraphDataConverter()
+
+    def setUp(self) -> None:
+        self.store = MetaStore(":memory:")
+        self.manager = Manager(
+            backend=InMemoryBackend(),
+            offloader=MetaOffloader(self.store, threshold=50),
+            collector=MetaCollector(self.store, grace=0, interval=3600),
+        )
+        self.fragment = SimpleNamespace(uid="fragment")
+
+    def replace(self, name: str):
+        data = load_data(DATA_DIR / name)
+        self.manager.replace(self.fragment, self.converter.to_content(data))
+
+        return data
+
+    def test_replaced_meta_collected(self):
+        with mock.patch.object(self.manager, "collect_later") as collect_later:
+            self.replace("sample.json")
+            data = self.replace("basic.json")
+
+        self.assertEqual(collect_later.call_count, 2)
+        self.assertGreater(self.manager.collect_meta()[0], 0)
+
+        # only blobs of the current content are left
+        references = [
+            meta
+            for _, meta in self.manager.backend.iter_meta()
+            if MetaOffloader._reference(meta)
+        ]
+        self.assertEqual(
+            self.store.connection().execute("SELECT count(*) FROM blobs").fetchone(),
+            (len(references),),
+        )
+
+        exported = self.converter.to_data(self.manager.read(self.fragment))
+        sort_payload(exported)
+        sort_payload(data)
+        self.assertEqual(exported, data)
+
+    def test_stored_meta_kept(self):
+        with mock.patch.object(self.manager, "collect_later"):
+            data = self.replace("sample.json")
+
+        self.assertEqual(self.manager.collect_meta(), (0, 0))
+
+        exported = self.converter.to_data(self.manager.read(self.fragment))
+        sort_payload(exported)
+        sort_payload(data)
+        self.assertEqual(exported, data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import re
+import unittest
+
+from django.test import SimpleTestCase
+
+from .misc import statements
+
+
+# listings scan a label by design, pages are bounded by a limit
+LISTINGS = (
+    "LIST_ROOTS_BY_NAME",
+    "LIST_ROOTS_BY_NAME_DESC",
+    "LIST_ROOTS_BY_ID",
+    "LIST_ROOTS_BY_ID_DESC",
+)
+
+# sweeps of entities no container holds scan a label by design
+SWEEPS = ("SWEEP_VERTICES", "SWEEP_GROUPS", "SWEEP_PORTS")
+
+# scans of all metadata are streamed from a cursor instead of pages
+SCANS = ("SCAN_META", "SCAN_EDGE_META")
+
+# relationship pattern: optional left arrow, dash, optional [...], dash, optional right arrow
+RELATIONSHIP_PATTERN = re.compile(r"(<?)-(\[[^\]]*\])?-(>?)")
+
+
+class TestQueries(SimpleTestCase):
+    def test_found(self):
+        self.assertIn("CONTAINER_EDGES", statements())
+
+    def test_parameterised(self):
+        # literal values or internal ids make every query text unique,
+        # which defeats the plan cache
+        for name, query in statements().items():
+            with self.subTest(name=name):
+                self.assertIn("$", query)
+                self.assertNotIn("'", query)
+                self.assertNotIn('"', query)
+                self.assertNotIn("id(", query)
+
+    def test_directed(self):
+        for name, query in statements().items():
+            with self.subTest(name=name):
+                for left, _, right in RELATIONSHIP_PATTERN.findall(query):
+                    self.assertEqual(len(left + right), 1, msg=query)
+
+    def test_anchored(self):
+        for name, query in statements().items():
+            if name in LISTINGS + SWEEPS + SCANS:
+                continue
+
+            with self.subTest(name=name):
+                self.assertRegex(
+                    query, r":(Container|PendingDeletion|Vertex|Port|Group) \{uid: "
+                )
+
+    def test_scans_are_limited(self):
+        for name in LISTINGS + SWEEPS:
+            with self.subTest(name=name):
+                self.assertIn("LIMIT $limit", statements()[name])
+
+
+if __name__ == "__main__":
+    unittest.main()
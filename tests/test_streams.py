@@ -0,0 +1,132 @@
+import io
+import json
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from complex_rest_dtcd_supergraph.backends import InMemoryBackend
+from complex_rest_dtcd_supergraph.converters import GraphDataConverter
+from complex_rest_dtcd_supergraph.managers import Manager
+from complex_rest_dtcd_supergraph.settings import KEYS
+from complex_rest_dtcd_supergraph.streams import (
+    COLLECTIONS,
+    StreamError,
+    _Reader,
+    iter_content,
+    iter_json,
+    iter_ndjson,
+    ndjson_line,
+    to_ndjson,
+)
+
+from .misc import load_data, sort_payload
+
+
+TEST_DIR = Path(__file__).resolve().parent
+DATA_DIR = TEST_DIR / "data"
+
+
+def flatten(data: dict) -> list:
+    return [(key, obj) for key in COLLECTIONS for obj in data.get(key, [])]
+
+
+class TestIterJSON(SimpleTestCase):
+    def setUp(self) -> None:
+        self.data = load_data(DATA_DIR / "n50_e25.json")
+
+    def test_small_blocks(self):
+        text = json.dumps(self.data, indent=2)
+
+        for block_size in (1, 7, 1024):
+            with self.subTest(block_size=block_size):
+                items = list(iter_json(io.StringIO(text), block_size))
+                self.assertEqual(items, flatten(self.data))
+
+    def test_numbers_across_blocks(self):
+        reader = _Reader(io.StringIO("[12345, 6.78e9]"), block_size=2)
+        reader.expect("[")
+        self.assertEqual(reader.value(), 12345)
+        reader.skip(",")
+        self.assertEqual(reader.value(), 6.78e9)
+
+    def test_wrapped_and_other_keys(self):
+        text = json.dumps({"version": 2, "graph": self.data, "extra": [1, {"a": 2}]})
+        self.assertEqual(list(iter_json(io.StringIO(text))), flatten(self.data))
+
+    def test_empty(self):
+        self.assertEqual(list(iter_json(io.StringIO("{}"))), [])
+
+    def test_malformed(self):
+        for text in ('{"nodes": [{"primitiveID": }]}', "[]", '{"nodes": [] } x'):
+            with self.subTest(text=text):
+                with self.assertRaises(StreamError):
+                    list(iter_json(io.StringIO(text)))
+
+
+class TestIterNDJSON(SimpleTestCase):
+    def test_lines(self):
+        data = load_data(DATA_DIR / "sample.json")
+        items = flatten(data)
+        text = "\n".join(json.dumps({key: obj}) for key, obj in items) + "\n\n"
+
+        self.assertEqual(list(iter_ndjson(io.StringIO(text))), items)
+
+    def test_malformed(self):
+        for line in ("{", "[]", '{"nodes": {}, "edges": {}}', '{"vertices": {}}'):
+            with self.subTest(line=line):
+                with self.assertRaises(StreamError):
+                    list(iter_ndjson(io.StringIO(line)))
+
+
+class TestIterContent(SimpleTestCase):
+    def test_parts(self):
+        data = load_data(DATA_DIR / "sample.json")
+        items = [(key, obj) for key in COLLECTIONS for obj in data.get(key, [])]
+        parts = list(iter_content(items, GraphDataConverter(), 50))
+
+        self.assertEqual([len(part.vertices) for part in parts], [50, 15, 0])
+        self.assertEqual([len(part.edges) for part in parts], [0, 35, 38])
+        # ports come with their nodes
+        self.assertEqual(
+            sum(len(part.ports) for part in parts),
+            sum(len(node.get(KEYS.init_ports, [])) for node in data[KEYS.nodes]),
+        )
+
+
+class TestToNDJSON(SimpleTestCase):
+    def test_line(self):
+        self.assertEqual(ndjson_line("nodes", {"a": 1}), '{"nodes":{"a": 1}}\n')
+
+    def test_round_trip(self):
+        data = load_data(DATA_DIR / "sample.json")
+        container = SimpleNamespace(uid="c")
+
+        for passthrough in (False, True):
+            with self.subTest(passthrough=passthrough):
+                converter = GraphDataConverter(passthrough=passthrough)
+                manager = Manager(
+                    backend=InMemoryBackend(),
+                    offloader=None,
+                    templates=None,
+                    history=None,
+                    changelog=None,
+                    broker=None,
+                )
+                manager.backend.replace(container, converter.to_content(data))
+                text = "".join(to_ndjson(manager.iter_read(container), converter))
+
+                result = {key: [] for key in COLLECTIONS}
+
+                for collection, obj in iter_ndjson(io.StringIO(text)):
+                    result[collection].append(obj)
+
+                sort_payload(result)
+                expected = load_data(DATA_DIR / "sample.json")
+                sort_payload(expected)
+                self.assertEqual(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+from neo4j.exceptions import Neo4jError, ServiceUnavailable
+
+from complex_rest_dtcd_supergraph import metrics, settings, transactions
+from complex_rest_dtcd_supergraph.exceptions import ServiceBusy
+from complex_rest_dtcd_supergraph.transactions import atomic, is_transient, on_commit
+
+from .misc import no_transaction
+
+
+DEADLOCK = "Neo.TransientError.Transaction.DeadlockDetected"
+TERMINATED = "Neo.TransientError.Transaction.Terminated"
+SYNTAX = "Neo.ClientError.Statement.SyntaxError"
+
+# original, before it is patched in tests
+backoff = transactions.backoff
+
+
+def error(code: str) -> Neo4jError:
+    return Neo4jError.hydrate(message="error", code=code)
+
+
+class TestAtomic(SimpleTestCase):
+    def test_on_commit_outside_transaction(self):
+        calls = []
+        on_commit(lambda: calls.append(1))
+        self.assertEqual(calls, [1])
+
+    def test_on_commit_after_transaction(self):
+        calls = []
+
+        @atomic
+        def func():
+            on_commit(lambda: calls.append("commit"))
+            calls.append("body")
+
+        with no_transaction():
+            func()
+
+        self.assertEqual(calls, ["body", "commit"])
+
+    def test_discard_on_error(self):
+        calls = []
+
+        @atomic
+        def func():
+            on_commit(lambda: calls.append("commit"))
+            raise ValueError
+
+        with no_transaction():
+            with self.assertRaises(ValueError):
+                func()
+
+        self.assertEqual(calls, [])
+        on_commit(lambda: calls.append("after"))
+        self.assertEqual(calls, ["after"])
+
+
+class TestRetries(SimpleTestCase):
+    def setUp(self) -> None:
+        for patcher in (
+            no_transaction(),
+            mock.patch.object(transactions, "backoff", return_value=0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        metrics.reset()
+
+    def failing(self, *errors):
+        """Return a function that raises given errors, then succeeds."""
+
+        errors = list(errors)
+        calls = []
+
+        @atomic
+        def func():
+            calls.append(1)
+            on_commit(lambda: calls.append("commit"))
+
+            if errors:
+                raise errors.pop(0)
+
+            return "result"
+
+        return func, calls
+
+    def test_is_transient(self):
+        self.assertTrue(is_transient(error(DEADLOCK)))
+        self.assertTrue(is_transient(ServiceUnavailable()))
+        self.assertFalse(is_transient(error(TERMINATED)))
+        self.assertFalse(is_transient(error(SYNTAX)))
+        self.assertFalse(is_transient(ValueError()))
+
+    def test_retry_transient(self):
+        func, calls = self.failing(error(DEADLOCK), error(DEADLOCK))
+        self.assertEqual(func(), "result")
+        self.assertEqual(calls, [1, 1, 1, "commit"])
+        self.assertEqual(metrics.snapshot()["transactions.retries"], 2)
+
+    def test_permanent_not_retried(self):
+        func, calls = self.failing(error(SYNTAX))
+
+        with self.assertRaises(Neo4jError):
+            func()
+
+        self.assertEqual(calls, [1])
+
+    def test_retries_exhausted(self):
+        retries = settings.TRANSACTION_RETRIES
+        func, calls = self.failing(*[error(DEADLOCK)] * (retries + 1))
+
+        with self.assertRaises(ServiceBusy):
+            func()
+
+        self.assertEqual(len(calls), retries + 1)
+        self.assertEqual(metrics.snapshot()["transactions.retries_exhausted"], 1)
+
+    def test_backoff(self):
+        with mock.patch.object(transactions.random, "uniform", lambda a, b: b):
+            caps = [backoff(attempt) for attempt in range(30)]
+
+        self.assertEqual(caps[0], settings.TRANSACTION_BACKOFF_BASE)
+        self.assertEqual(caps[1], 2 * settings.TRANSACTION_BACKOFF_BASE)
+        self.assertEqual(max(caps), settings.TRANSACTION_BACKOFF_MAX)
+
+        for attempt in range(10):
+            self.assertLessEqual(backoff(attempt), caps[attempt])
+
+
+if __name__ == "__main__":
+    unittest.main()
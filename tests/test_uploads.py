@@ -0,0 +1,135 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import NotFound
+
+from complex_rest_dtcd_supergraph.uploads import ChunkError, Upload, UploadStore
+from complex_rest_dtcd_supergraph.views import uploads as views
+
+
+class TestUploadStore(SimpleTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = UploadStore(self.directory.name, ttl=60)
+        self.upload = self.store.create(Upload(root="r", chunks=3))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def put(self, index: int, data: bytes, **kwargs) -> int:
+        return self.store.put_chunk(
+            self.upload, index, io.BytesIO(data), max_size=100, **kwargs
+        )
+
+    def test_get(self):
+        self.assertEqual(self.store.get(self.upload.uid), self.upload)
+        self.assertIsNone(self.store.get("missing"))
+
+    def test_received_and_missing(self):
+        self.assertEqual(self.put(2, b"c"), 1)
+        self.put(0, b"a")
+        self.assertEqual(self.store.received(self.upload), [0, 2])
+        self.assertEqual(self.store.missing(self.upload), [1])
+
+    def test_chunk_is_replaced(self):
+        self.put(0, b"old")
+        self.put(0, b"new")
+
+        self.upload.chunks = 1
+
+        with self.store.open(self.upload) as f:
+            self.assertEqual(f.read(), "new")
+
+    def test_too_large(self):
+        with self.assertRaises(ChunkError):
+            self.put(0, b"x" * 101)
+
+        self.assertEqual(self.store.received(self.upload), [])
+
+    def test_cut_short(self):
+        self.put(0, b"old")
+
+        with self.assertRaises(ChunkError):
+            self.put(0, b"ne", length=3)
+
+        # the previous chunk is kept, no temporary files are left
+        with self.store.open(Upload(root="r", uid=self.upload.uid)) as f:
+            self.assertEqual(f.read(), "old")
+
+        self.assertEqual(len(os.listdir(self.store.path / self.upload.uid)), 2)
+
+    def test_open_joins_chunks(self):
+        data = '{"nodes": [{"primitiveID": "ключ"}]}'.encode()
+
+        # a multi-byte character is split between chunks
+        split = data.index("ключ".encode()) + 1
+
+        for i, part in enumerate((data[:split], data[split:-3], data[-3:])):
+            self.put(i, part)
+
+        with self.store.open(self.upload) as f:
+            self.assertEqual(f.read(), data.decode())
+
+    def test_delete(self):
+        self.put(0, b"a")
+        self.store.delete(self.upload.uid)
+        self.assertIsNone(self.store.get(self.upload.uid))
+
+    def test_expire(self):
+        directory = self.store.path / self.upload.uid
+        past = time.time() - 120
+        os.utime(directory, (past, past))
+        other = self.store.create(Upload(root="r"))
+
+        self.assertIsNone(self.store.get(self.upload.uid))
+        self.assertEqual(self.store.get(other.uid), other)
+
+
+class TestUploadViews(SimpleTestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = UploadStore(directory.name, ttl=60)
+        self.writer = mock.Mock()
+
+        for name, value in (
+            ("get_upload_store", self.store),
+            ("get_write_queue", self.writer),
+        ):
+            patcher = mock.patch.object(views, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_status_removes_expired(self):
+        upload = self.store.create(Upload(root="r"))
+        past = time.time() - 120
+        os.utime(self.store.path / upload.uid, (past, past))
+
+        with self.assertRaises(NotFound):
+            views.UploadDetailView().get(None, uuid.UUID(upload.uid))
+
+        self.assertEqual(list(self.store.path.iterdir()), [])
+
+    def test_commit_has_own_key(self):
+        upload = self.store.create(Upload(root="r", fragment="f"))
+        self.store.put_chunk(upload, 0, io.BytesIO(b"{}"), max_size=100)
+        self.writer.get.return_value = None
+
+        response = views.UploadCommitView().post(None, uuid.UUID(upload.uid))
+
+        # later writes to the fragment do not supersede the commit
+        key = self.writer.submit.call_args.args[0]
+        self.assertNotEqual(key, "f")
+        job = self.writer.submit.call_args.kwargs["job"]
+        self.assertEqual(job.container, "f")
+        self.assertEqual(response.data["job"]["uid"], job.uid)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from complex_rest_dtcd_supergraph.utils import (
+    batched,
     homogeneous,
     savable_as_property,
     valid_property,
@@ -73,3 +74,7 @@ class TestUtils(unittest.TestCase):
         # list of bad types
         value = [{"age": 42}, {"age": 17}]
         self.assertFalse(savable_as_property(value))
+
+    def test_batched(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(batched([], 2)), [])
@@ -1,7 +1,9 @@
+import json
 import unittest
 from pathlib import Path
 from pprint import pformat
 from types import SimpleNamespace
+from unittest import mock
 
 import dictdiffer
 import neomodel
@@ -130,6 +132,43 @@ class TestRootListView(Neo4jTestCaseMixin, APITestCaseMixin, APISimpleTestCase):
         data = response.data
         objects = data["roots"]
         self.assertEqual({item["name"] for item in objects}, names)
+        self.assertIsNone(data["next"])
+
+    def test_get_pages(self):
+        names = ["c", "a", "b"]
+        for name in names:
+            self.post(data={"name": name})
+
+        pages = []
+        params = {"sort": "-name", "limit": 2}
+        while True:
+            data = self.client.get(self.url, params).data
+            pages.append([item["name"] for item in data["roots"]])
+            if data["next"] is None:
+                break
+            params["cursor"] = data["next"]
+
+        self.assertEqual(pages, [["c", "b"], ["a"]])
+
+    def test_get_counts(self):
+        root = self.create({"name": "sales"})
+        url = reverse("supergraph:root-fragments", kwargs={"pk": root["id"]})
+        CLIENT.post(url, data={"name": "q1"}, format="json")
+
+        data = self.client.get(self.url, {"counts": "true"}).data
+        (obj,) = data["roots"]
+        self.assertEqual(obj["vertices"], 0)
+        self.assertEqual(obj["fragments"][0]["name"], "q1")
+        self.assertEqual(obj["fragments"][0]["vertices"], 0)
+
+        obj = self.get().data["roots"][0]
+        self.assertNotIn("vertices", obj)
+        self.assertNotIn("vertices", obj["fragments"][0])
+
+    def test_get_invalid(self):
+        for params in ({"sort": "size"}, {"cursor": "bad"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     @classmethod
     def create(cls, data: dict) -> dict:
@@ -142,6 +181,9 @@ class TestRootListView(Neo4jTestCaseMixin, APITestCaseMixin, APISimpleTestCase):
 @tag("neo4j")
 class TestRootDetailView(Neo4jTestCaseMixin, APITestCaseMixin, APISimpleTestCase):
     root_name = "sales"
+    expected_status = SimpleNamespace(
+        **dict(vars(APITestCaseMixin.expected_status), delete=status.HTTP_202_ACCEPTED)
+    )
 
     def setUp(self) -> None:
         """Create a root object to work with using the given name.
@@ -209,6 +251,7 @@ class TestRootFragmentDetailView(
 ):
     root_name = "parent"
     fragment_name = "child"
+    expected_status = TestRootDetailView.expected_status
 
     def setUp(self) -> None:
         """Create a root and a fragment for it using given names.
@@ -322,7 +365,7 @@ class TestFragmentDetailView(Neo4jTestCaseMixin, APISimpleTestCase):
 
     def test_delete(self):
         response = self.client.delete(self.url)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
@@ -515,6 +558,26 @@ class TestRootGraphView(
         # make sure 2 vertices with ports are merged, the edge is removed
         self.assert_merge_retrieve_eq(new, self.url)
 
+    def test_put_ndjson(self):
+        data = load_data(DATA_DIR / "sample.json")
+        lines = [
+            json.dumps({key: obj}) + "\n"
+            for key in ("nodes", "edges")
+            for obj in data[key]
+        ]
+        response = self.client.put(
+            self.url, data="".join(lines), content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assert_graph_eq(self.retrieve(self.url), data)
+
+        # edges must come after their nodes
+        response = self.client.put(
+            self.url, data="".join(lines[::-1]), content_type="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assert_graph_eq(self.retrieve(self.url), data)
+
     @tag("slow")
     def test_n25_then_n50(self):
         # first merge
@@ -526,6 +589,49 @@ class TestRootGraphView(
         self.assert_merge_retrieve_eq_from_json(new_path)
 
 
+@tag("neo4j")
+class TestPlanCache(
+    GraphEndpointTestCaseMixin,
+    Neo4jTestCaseMixin,
+    APISimpleTestCase,
+):
+    """Graph operations must issue the same query texts regardless of
+    the container and its content, so that Neo4j re-uses cached plans.
+    """
+
+    def setUp(self) -> None:
+        self.urls = [
+            reverse("supergraph:root-graph", args=(root["id"],))
+            for root in map(TestRootListView.create, ({"name": "a"}, {"name": "b"}))
+        ]
+
+    def merge_retrieve_replace(self, url):
+        self.merge(load_data(DATA_DIR / "n50_e25.json"), url)
+        self.retrieve(url)
+        self.merge(load_data(DATA_DIR / "n25_e25.json"), url)
+
+    def record_queries(self, func, *args) -> list:
+        """Call the function and return the texts of issued queries."""
+
+        with mock.patch.object(
+            neomodel.db, "cypher_query", wraps=neomodel.db.cypher_query
+        ) as cypher_query:
+            func(*args)
+
+        return [
+            c.kwargs["query"] if "query" in c.kwargs else c.args[0]
+            for c in cypher_query.call_args_list
+        ]
+
+    def test_hit_rate(self):
+        cold = set(self.record_queries(self.merge_retrieve_replace, self.urls[0]))
+        warm = self.record_queries(self.merge_retrieve_replace, self.urls[1])
+        misses = [query for query in warm if query not in cold]
+        hit_rate = 1 - len(misses) / len(warm)
+
+        self.assertEqual(hit_rate, 1, msg="New query texts:\n" + "\n".join(set(misses)))
+
+
 @tag("neo4j")
 class TestRootFragmentGraphView(
     GraphEndpointTestCaseMixin,
@@ -580,5 +686,81 @@ class TestRootFragmentGraphView(
         self.assertNotEqual(fromdb_as_fragment, data)
 
 
+@tag("neo4j")
+class TestGraphUploads(
+    GraphEndpointTestCaseMixin,
+    Neo4jTestCaseMixin,
+    APISimpleTestCase,
+):
+    def setUp(self) -> None:
+        pk = TestRootListView.create({"name": "sales"})["id"]
+        self.url = reverse("supergraph:root-graph", args=(pk,))
+        self.uploads_url = reverse("supergraph:root-graph-uploads", args=(pk,))
+
+    def test_upload(self):
+        data = load_data(DATA_DIR / "sample.json")
+        body = json.dumps({"graph": data}).encode()
+        size = len(body) // 3 + 1
+
+        response = self.client.post(self.uploads_url, data={"chunks": 3}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload = response.data["upload"]
+        detail_url = reverse("supergraph:upload-detail", args=(upload["uid"],))
+
+        # chunks in any order, the last one is missing
+        for index in (1, 0):
+            url = reverse("supergraph:upload-chunk", args=(upload["uid"], index))
+            chunk = body[index * size : (index + 1) * size]
+            response = self.client.put(
+                url, data=chunk, content_type="application/octet-stream"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(detail_url).data["upload"]["missing"], [2])
+
+        commit_url = reverse("supergraph:upload-commit", args=(upload["uid"],))
+        response = self.client.post(commit_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = reverse("supergraph:upload-chunk", args=(upload["uid"], 2))
+        self.client.put(
+            url, data=body[2 * size :], content_type="application/octet-stream"
+        )
+        response = self.client.post(commit_url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        from complex_rest_dtcd_supergraph.jobs import get_write_queue
+
+        get_write_queue().join(timeout=60)
+        job = get_write_queue().get(response.data["job"]["uid"])
+        self.assertEqual(job.status, "done", job.error)
+        self.assert_graph_eq(self.retrieve(self.url), data)
+
+        # committed uploads are deleted
+        self.assertEqual(
+            self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND
+        )
+
+
+@tag("neo4j")
+class TestGraphStats(GraphEndpointTestCaseMixin, Neo4jTestCaseMixin, APISimpleTestCase):
+    def setUp(self) -> None:
+        pk = TestRootListView.create({"name": "sales"})["id"]
+        self.url = reverse("supergraph:root-graph", args=(pk,))
+        self.stats_url = reverse("supergraph:root-graph-stats", args=(pk,))
+
+    def test_get(self):
+        stats = self.client.get(self.stats_url).data["stats"]
+        self.assertEqual(stats["vertices"], 0)
+
+        data = load_data(DATA_DIR / "2v-1e.json")
+        self.client.put(self.url, data={"graph": data}, format="json")
+
+        stats = self.client.get(self.stats_url).data["stats"]
+        self.assertEqual(stats["vertices"], 2)
+        self.assertEqual(stats["edges"], 1)
+        self.assertEqual(stats["max_degree"], 1)
+
+
 if __name__ == "__main__":
     unittest.main()